@@ -0,0 +1,99 @@
+"""文件名相似度内核的速度与校准基准测试
+
+对同一组合成文件名对分别用原有的 difflib.SequenceMatcher、纯 Python 位并行内核和 rapidfuzz 后端（已安装时）
+计算相似度，报告每次调用的耗时，以及按 0.9/0.7 两档阈值分类时与 SequenceMatcher 不一致的比例。
+评分时内核带 0.7 的下限调用（低于下限提前结束），这里同时测量带下限和不带下限的耗时。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_filename_similarity --pairs 200000
+"""
+import sys
+import time
+import random
+import argparse
+from difflib import SequenceMatcher
+from typing import Callable, List, Tuple
+
+from file import file_similarity
+from file.file_similarity import (FILENAME_HIGH_SIMILARITY, FILENAME_MODERATE_SIMILARITY, filename_similarity,
+                                  normalize_filename)
+
+WORDS = ("holiday", "beach", "family", "birthday", "concert", "wedding", "trip", "report", "final", "draft",
+         "movie", "episode", "season", "scan", "invoice", "photo", "video", "music", "backup", "project")
+COPY_SUFFIXES = (" (1)", "_copy", " - 副本", "_2", "-final", "")
+
+
+def _random_name(rng: random.Random) -> str:
+    kind = rng.random()
+    if kind < 0.3:
+        return f"IMG_{rng.randrange(10000):04d}.jpg"
+    if kind < 0.5:
+        return f"VID_2024{rng.randrange(1, 13):02d}{rng.randrange(1, 29):02d}_{rng.randrange(1000000):06d}.mp4"
+    words = rng.sample(WORDS, rng.randrange(1, 4))
+    return f"{' '.join(words)} {rng.randrange(100)}.{rng.choice(('mkv', 'pdf', 'docx', 'png'))}"
+
+
+def _synthetic_pairs(count: int, seed: int = 0) -> List[Tuple[str, str]]:
+    """一半为同一个文件名的变体（复制标记、改动个别字符），一半为无关的文件名"""
+    rng = random.Random(seed)
+    pairs = []
+    for _ in range(count):
+        name = _random_name(rng)
+        if rng.random() < 0.5:
+            stem, _, ext = name.rpartition('.')
+            chars = list(stem)
+            for _ in range(rng.randrange(3)):
+                chars[rng.randrange(len(chars))] = rng.choice("abcdefghij0123456789")
+            other = f"{''.join(chars)}{rng.choice(COPY_SUFFIXES)}.{ext}"
+        else:
+            other = _random_name(rng)
+        pairs.append((normalize_filename(name), normalize_filename(other)))
+    return pairs
+
+
+def _classify(similarity: float) -> int:
+    if similarity >= FILENAME_HIGH_SIMILARITY:
+        return 2
+    return 1 if similarity >= FILENAME_MODERATE_SIMILARITY else 0
+
+
+def _sequence_matcher(norm1: str, norm2: str, score_cutoff: float = 0.0) -> float:
+    return 1.0 if norm1 == norm2 else SequenceMatcher(None, norm1, norm2).ratio()
+
+
+def _time(func: Callable[[str, str], float], pairs: List[Tuple[str, str]]) -> Tuple[float, List[float]]:
+    start = time.perf_counter()
+    results = [func(a, b) for a, b in pairs]
+    return time.perf_counter() - start, results
+
+
+def _main(argv: List[str]):
+    parser = argparse.ArgumentParser(description="文件名相似度内核基准测试")
+    parser.add_argument("--pairs", type=int, default=200000, help="文件名对数，默认 200000")
+    args = parser.parse_args(argv)
+
+    pairs = _synthetic_pairs(args.pairs)
+    accelerated = file_similarity.Indel
+    backends = [("difflib.SequenceMatcher", _sequence_matcher, None)]
+    if accelerated is not None:
+        backends.append(("rapidfuzz", filename_similarity, accelerated))
+    backends.append(("纯 Python 位并行", filename_similarity, None))
+
+    baseline_seconds, baseline = _time(_sequence_matcher, pairs)
+    baseline_classes = [_classify(value) for value in baseline]
+    print(f"文件名对: {len(pairs)}")
+    for name, func, backend in backends:
+        # 切换模块使用的后端，分别测量 C 实现和纯 Python 实现
+        file_similarity.Indel = backend
+        try:
+            seconds, results = _time(func, pairs)
+            cutoff_seconds, cutoff_results = _time(lambda a, b: func(a, b, FILENAME_MODERATE_SIMILARITY), pairs)
+        finally:
+            file_similarity.Indel = accelerated
+        changed = sum(_classify(value) != expected for value, expected in zip(cutoff_results, baseline_classes))
+        print(f"{name:<24} {seconds / len(pairs) * 1e6:7.2f} µs/次  带 0.7 下限 {cutoff_seconds / len(pairs) * 1e6:7.2f} µs/次  "
+              f"({baseline_seconds / cutoff_seconds:.1f}x)  分档与 SequenceMatcher 不同 {changed / len(pairs):.2%}")
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
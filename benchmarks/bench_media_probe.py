@@ -0,0 +1,83 @@
+"""批量读取视频时长（ffprobe）的并发加速比基准测试
+
+对一个文件夹中的全部视频，先用原有方式逐个 subprocess.run 调用 ffprobe，
+再用 MediaProbeRunner 以不同的并发数读取，报告耗时、每秒文件数和相对逐个调用的加速比，并检查读到的时长与逐个调用相同。
+需要真实的视频文件和 ffprobe；第二次读取时文件头通常已在系统缓存中，可先单独运行一次预热。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_media_probe D:/videos --ffprobe D:/ffmpeg/bin/ffprobe.exe
+    python -m benchmarks.bench_media_probe /data/videos --concurrency 1 8 16 32 --timeout 30
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import subprocess
+from pathlib import Path
+from typing import List, Optional
+
+from file.file_media_probe import (DEFAULT_PROBE_TIMEOUT, DURATION_ARGS, MediaProbeRunner,
+                                   no_window_kwargs)
+
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.m4v', '.3gp', '.webm'}
+
+
+def _find_videos(folder: str, limit: Optional[int]) -> List[str]:
+    videos = []
+    for root, _, files in os.walk(folder):
+        for name in sorted(files):
+            if Path(name).suffix.lower() in VIDEO_EXTENSIONS:
+                videos.append(os.path.join(root, name))
+                if limit and len(videos) >= limit:
+                    return videos
+    return videos
+
+
+def _serial_durations(ffprobe_path: str, videos: List[str]) -> List[Optional[float]]:
+    """原有实现：逐个 subprocess.run，没有超时"""
+    durations = []
+    for path in videos:
+        result = subprocess.run([ffprobe_path, *DURATION_ARGS, path], stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, text=True, **no_window_kwargs())
+        try:
+            durations.append(float(result.stdout.strip()) if result.returncode == 0 else None)
+        except ValueError:
+            durations.append(None)
+    return durations
+
+
+def _main(argv: List[str]):
+    parser = argparse.ArgumentParser(description="ffprobe 并发读取基准测试")
+    parser.add_argument("folder", help="包含视频的文件夹")
+    parser.add_argument("--ffprobe", default=shutil.which("ffprobe"), help="ffprobe 路径，默认在 PATH 中查找")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16], help="要测试的并发数，可指定多个")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_PROBE_TIMEOUT, help="单个进程的超时时间（秒）")
+    parser.add_argument("--limit", type=int, help="最多读取的视频数")
+    args = parser.parse_args(argv)
+    if not args.ffprobe:
+        parser.error("未找到 ffprobe，请用 --ffprobe 指定路径")
+
+    videos = _find_videos(args.folder, args.limit)
+    if not videos:
+        parser.error(f"{args.folder} 中没有视频文件")
+    print(f"视频: {len(videos)}，CPU 核心: {os.cpu_count()}，ffprobe: {args.ffprobe}")
+
+    start = time.perf_counter()
+    expected = _serial_durations(args.ffprobe, videos)
+    serial_seconds = time.perf_counter() - start
+    print(f"{'逐个 subprocess.run':<20} {serial_seconds:8.2f} 秒  {len(videos) / serial_seconds:>8.1f} 个/秒")
+
+    for concurrency in args.concurrency:
+        runner = MediaProbeRunner(args.ffprobe, concurrency=concurrency, timeout=args.timeout)
+        start = time.perf_counter()
+        results = runner.probe_many(videos)
+        seconds = time.perf_counter() - start
+        mismatched = sum(result.duration != duration for result, duration in zip(results, expected))
+        timeouts = sum(result.timed_out for result in results)
+        print(f"{f'并发 {concurrency}':<20} {seconds:8.2f} 秒  {len(videos) / seconds:>8.1f} 个/秒  "
+              f"加速比 {serial_seconds / seconds:.2f}x  超时 {timeouts}  时长与逐个调用不同 {mismatched}")
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
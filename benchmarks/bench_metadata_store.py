@@ -0,0 +1,97 @@
+"""文件元数据存储的内存基准测试
+
+比较 FileMetadata 对象列表与按列存储 (FileMetadataStore) 保存同样的合成元数据时占用的内存。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_metadata_store --entries 1000000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+from typing import Callable, Iterator, List, Tuple
+
+from file.file_hashing import FALLBACK_HASH_ALGORITHM, new_hasher
+from file.file_metadata_store import FileMetadata, FileMetadataStore
+
+FILES_PER_DIRECTORY = 200
+
+
+def _synthetic_entries(count: int, seed: int = 0) -> Iterator[FileMetadata]:
+    """生成合成元数据：三分之一图片（感知哈希）、三分之一视频（时长、采样哈希）、其余为普通文件（内容哈希）"""
+    rng = random.Random(seed)
+    digest_size = new_hasher(FALLBACK_HASH_ALGORITHM).digest_size
+    for i in range(count):
+        directory = os.path.join("/data", f"library{i // 100000}", f"album{i // FILES_PER_DIRECTORY}")
+        kind = i % 3
+        metadata = FileMetadata(
+            path=os.path.join(directory, f"file_{i:08d}" + (".jpg", ".mp4", ".dat")[kind]),
+            size=rng.randrange(1, 1 << 32),
+            device=2049,
+            inode=1000000 + i,
+            mtime_ns=1700000000000000000 + rng.randrange(1 << 40),
+            hash_algorithm=FALLBACK_HASH_ALGORITHM,
+        )
+        if kind == 0:
+            metadata.perceptual_hash = format(rng.getrandbits(64), '016x')
+        elif kind == 1:
+            metadata.duration = rng.uniform(1, 7200)
+            metadata.sample_hash = rng.randbytes(digest_size).hex()
+        else:
+            metadata.content_hash = rng.randbytes(digest_size).hex()
+        yield metadata
+
+
+def _build_list(count: int):
+    return list(_synthetic_entries(count))
+
+
+def _build_store(count: int):
+    return FileMetadataStore.from_metadata(_synthetic_entries(count), FALLBACK_HASH_ALGORITHM)
+
+
+def _measure(builder: Callable[[int], object], count: int) -> Tuple[int, float, object]:
+    """返回 (构建完成后仍占用的字节数, 构建耗时秒数, 结果)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = builder(count)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, elapsed, result
+
+
+def run_benchmark(count: int) -> List[Tuple[str, int, float]]:
+    """返回 [(存储方式, 占用字节数, 构建耗时), ...]"""
+    results = []
+    list_bytes, list_seconds, items = _measure(_build_list, count)
+    results.append(("FileMetadata 列表", list_bytes, list_seconds))
+    del items
+    store_bytes, store_seconds, store = _measure(_build_store, count)
+    results.append(("FileMetadataStore", store_bytes, store_seconds))
+
+    # 抽查视图与原始数据一致
+    for index, expected in enumerate(_synthetic_entries(min(count, 1000))):
+        expected.filename_normalized = store[index].filename_normalized
+        if store[index] != expected:
+            raise RuntimeError(f"第 {index} 行的视图与原始数据不一致")
+    return results
+
+
+def _main(argv: List[str]):
+    parser = argparse.ArgumentParser(description="文件元数据存储内存基准测试")
+    parser.add_argument("--entries", type=int, default=1000000, help="合成记录数，默认 1000000")
+    args = parser.parse_args(argv)
+
+    print(f"记录数: {args.entries}")
+    results = run_benchmark(args.entries)
+    baseline = results[0][1]
+    for name, num_bytes, seconds in results:
+        print(f"{name:<20} {num_bytes / 1024 / 1024:>9.1f} MB  "
+              f"{num_bytes / args.entries:>7.1f} 字节/条  构建 {seconds:.1f} 秒  ({num_bytes / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
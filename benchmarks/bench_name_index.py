@@ -0,0 +1,89 @@
+"""文件名 MinHash LSH 索引的规模与召回率基准测试
+
+生成合成的标准化文件名（约一半有改名后的副本：加复制标记、改动个别字符、增删单词），
+报告建立索引和产生候选对的耗时、候选对数量，以及在文件名相似度不低于 0.7 / 0.9 的文件对中索引找到的比例
+（召回率用两两比较计算，只在 --recall-sample 个文件上统计）。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_name_index --names 10000 100000 1000000
+"""
+import sys
+import time
+import random
+import argparse
+from typing import List, Set, Tuple
+
+from file.file_similarity import (FILENAME_HIGH_SIMILARITY, FILENAME_MODERATE_SIMILARITY, filename_similarity,
+                                  normalize_filename)
+from file.file_similarity_index import MinHashLSHIndex
+
+SYLLABLES = ("ka", "to", "ri", "ne", "sa", "mo", "lu", "pe", "di", "va", "chi", "ron", "tel", "mar", "bo",
+             "gen", "fi", "shu", "la", "xe")
+VOCABULARY_SIZE = 3000
+COPY_SUFFIXES = (" (1)", "_copy", " - 副本", " copy 2", "")
+
+
+def _synthetic_names(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    # 由音节组成的合成词表，文件名由 2-4 个词和编号组成
+    vocabulary = sorted({''.join(rng.choice(SYLLABLES) for _ in range(rng.randrange(2, 4)))
+                         for _ in range(VOCABULARY_SIZE)})
+    names = []
+    while len(names) < count:
+        words = rng.sample(vocabulary, rng.randrange(2, 5))
+        name = f"{' '.join(words)} {rng.randrange(10000)}"
+        names.append(normalize_filename(f"{name}.mkv"))
+        if rng.random() < 0.5:
+            # 改名后的副本
+            variant = list(name)
+            for _ in range(rng.randrange(3)):
+                variant[rng.randrange(len(variant))] = rng.choice("abcdefghijklmnopqrstuvwxyz")
+            variant = ''.join(variant)
+            if rng.random() < 0.3:
+                variant = f"{variant} {rng.choice(vocabulary)}"
+            names.append(normalize_filename(f"{variant}{rng.choice(COPY_SUFFIXES)}.mkv"))
+    return names[:count]
+
+
+def _index_pairs(names: List[str]) -> Tuple[Set[Tuple[int, int]], float, int]:
+    """返回 (候选对集合, 耗时秒数, 过大的桶数)"""
+    start = time.perf_counter()
+    index = MinHashLSHIndex()
+    for item_id, name in enumerate(names):
+        index.add(item_id, name)
+    pairs = set(index.iter_pairs())
+    return pairs, time.perf_counter() - start, index.oversized_buckets
+
+
+def _recall(names: List[str], pairs: Set[Tuple[int, int]], cutoff: float) -> Tuple[int, float]:
+    """两两比较，返回 (相似度不低于 cutoff 的文件对数, 其中被索引找到的比例)"""
+    similar = found = 0
+    for i in range(len(names)):
+        for j in range(i + 1, len(names)):
+            if filename_similarity(names[i], names[j], cutoff) >= cutoff:
+                similar += 1
+                found += (i, j) in pairs
+    return similar, found / similar if similar else 1.0
+
+
+def _main(argv: List[str]):
+    parser = argparse.ArgumentParser(description="文件名 MinHash LSH 索引基准测试")
+    parser.add_argument("--names", type=int, nargs="+", default=[10000, 100000], help="文件名数，可指定多个")
+    parser.add_argument("--recall-sample", type=int, default=3000, help="计算召回率时两两比较的文件名数，默认 3000")
+    args = parser.parse_args(argv)
+
+    for count in args.names:
+        names = _synthetic_names(count)
+        pairs, seconds, oversized = _index_pairs(names)
+        print(f"{count:>9} 个文件名  {seconds:8.2f} 秒  {count / seconds:>9.0f} 个/秒  候选对 {len(pairs)} "
+              f"（两两比较需要 {count * (count - 1) // 2}），过大的桶 {oversized}")
+
+    sample = _synthetic_names(args.recall_sample)
+    sample_pairs, _, _ = _index_pairs(sample)
+    for cutoff in (FILENAME_MODERATE_SIMILARITY, FILENAME_HIGH_SIMILARITY):
+        similar, recall = _recall(sample, sample_pairs, cutoff)
+        print(f"相似度 >= {cutoff}: {similar} 对，索引召回率 {recall:.1%}（样本 {len(sample)} 个文件名）")
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
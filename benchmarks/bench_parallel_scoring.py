@@ -0,0 +1,80 @@
+"""比较阶段并行评分的加速比基准测试
+
+合成一个最坏情况：数千张同样大小的相机照片（同一个大小分块，候选对数为 n(n-1)/2），
+分别用 1、2、4……个工作进程对全部候选对评分，报告耗时和相对串行的加速比，并检查结果与串行完全相同。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_parallel_scoring --images 3000
+    python -m benchmarks.bench_parallel_scoring --images 3000 --workers 1 4 8 16
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from typing import List, Tuple
+
+from file.file_find_duplicates_enhanced import EnhancedDuplicateFinder
+from file.file_similarity import FileFeatures
+
+IMAGE_SIZE = 4 * 1024 * 1024
+
+
+def _synthetic_features(count: int, seed: int = 0) -> List[FileFeatures]:
+    """同样大小的照片：感知哈希随机，约 5% 是前一张的近似副本；文件名为相机式的连续编号"""
+    rng = random.Random(seed)
+    features = []
+    for i in range(count):
+        if features and rng.random() < 0.05:
+            phash = features[-1].phash ^ (1 << rng.randrange(64))
+            name = f"{features[-1].name}_edit"
+        else:
+            phash = rng.getrandbits(64)
+            name = f"img_{rng.randrange(10000):04d}"
+        features.append(FileFeatures(size=IMAGE_SIZE, phash=phash, name=name, copy_pattern=rng.random() < 0.02))
+    return features
+
+
+def _score_all(features: List[FileFeatures], workers: int) -> Tuple[float, int, list]:
+    """返回 (耗时秒数, 候选对数, 达到重复等级的文件对)"""
+    finder = EnhancedDuplicateFinder(log_callback=lambda message, level: None, workers=workers)
+    is_image = [True] * len(features)
+    matches = []
+    pair_count = 0
+    start = time.perf_counter()
+    for pair_count, chunk_matches in finder._score_pair_chunks(features, is_image):
+        matches.extend(chunk_matches)
+    return time.perf_counter() - start, pair_count, matches
+
+
+def _main(argv: List[str]):
+    parser = argparse.ArgumentParser(description="比较阶段并行评分基准测试")
+    parser.add_argument("--images", type=int, default=3000, help="同样大小的照片数，默认 3000")
+    parser.add_argument("--workers", type=int, nargs="+",
+                        help="要测试的工作进程数，默认为 1、2、4…… 直到 CPU 核心数")
+    args = parser.parse_args(argv)
+
+    worker_counts = args.workers
+    if not worker_counts:
+        cpu_count = os.cpu_count() or 1
+        worker_counts = [1]
+        while worker_counts[-1] * 2 <= cpu_count:
+            worker_counts.append(worker_counts[-1] * 2)
+        if worker_counts[-1] != cpu_count:
+            worker_counts.append(cpu_count)
+
+    features = _synthetic_features(args.images)
+    print(f"照片: {args.images}，CPU 核心: {os.cpu_count()}")
+    serial_seconds, serial_matches = None, None
+    for workers in worker_counts:
+        seconds, pair_count, matches = _score_all(features, workers)
+        if serial_matches is None:
+            serial_seconds, serial_matches = seconds, matches
+        elif matches != serial_matches:
+            raise RuntimeError(f"{workers} 个工作进程的评分结果与串行不同")
+        print(f"{workers:>3} 个工作进程  {seconds:8.2f} 秒  {pair_count / seconds:>10.0f} 对/秒  "
+              f"加速比 {serial_seconds / seconds:.2f}x  (候选对 {pair_count}，重复对 {len(matches)})")
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
@@ -0,0 +1,131 @@
+"""感知哈希快速路径的速度与精度基准测试
+
+对同一组图片分别用原有实现（完整解码 + LANCZOS）和快速路径（EXIF 缩略图 / JPEG 按比例解码 + BOX）
+计算感知哈希，报告每张图片的耗时以及两者之间的汉明距离分布。
+距离不超过 2 时两种实现的判定结果相同（"非常相似"），不超过 5 时仍会被判为相似。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_perceptual_hash --count 20 --megapixels 24
+    python -m benchmarks.bench_perceptual_hash --directory /path/to/photos
+
+不指定目录时生成合成 JPEG 参考集，其中一半内嵌 EXIF 缩略图。
+"""
+import io
+import os
+import sys
+import time
+import random
+import struct
+import argparse
+import tempfile
+from typing import List, Tuple
+
+from PIL import Image, ImageDraw, ImageFilter
+import imagehash
+
+from file.file_image_hashing import perceptual_hash
+from file.file_similarity import PERCEPTUAL_HASH_MAX_DISTANCE
+
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff', '.webp'}
+THUMBNAIL_SIZE = (160, 160)
+
+
+def _exif_with_thumbnail(thumbnail_jpeg: bytes) -> bytes:
+    """构造只含 IFD1 缩略图的最小 EXIF 数据（小端 TIFF）"""
+    ifd0_offset = 8
+    ifd1_offset = ifd0_offset + 2 + 4
+    data_offset = ifd1_offset + 2 + 2 * 12 + 4
+    tiff = b'II*\x00' + struct.pack('<I', ifd0_offset)
+    tiff += struct.pack('<HI', 0, ifd1_offset)  # IFD0: 没有条目，指向 IFD1
+    tiff += struct.pack('<H', 2)
+    tiff += struct.pack('<HHII', 0x0201, 4, 1, data_offset)
+    tiff += struct.pack('<HHII', 0x0202, 4, 1, len(thumbnail_jpeg))
+    tiff += struct.pack('<I', 0)
+    return b'Exif\x00\x00' + tiff + thumbnail_jpeg
+
+
+def _synthetic_photo(rng: random.Random, width: int, height: int) -> Image.Image:
+    """随机色块模糊后放大，近似照片的低频结构"""
+    small = Image.new('RGB', (max(1, width // 8), max(1, height // 8)), tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(small)
+    for _ in range(40):
+        x, y = rng.randrange(small.width), rng.randrange(small.height)
+        w, h = rng.randrange(10, max(11, small.width // 3)), rng.randrange(10, max(11, small.height // 3))
+        draw.ellipse([x, y, x + w, y + h], fill=tuple(rng.randrange(256) for _ in range(3)))
+    return small.filter(ImageFilter.GaussianBlur(3)).resize((width, height), Image.Resampling.BICUBIC)
+
+
+def _create_reference_set(directory: str, count: int, megapixels: float, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = width * 3 // 4
+    paths = []
+    for i in range(count):
+        photo = _synthetic_photo(rng, width, height)
+        exif = b''
+        if i % 2:
+            thumbnail = photo.copy()
+            thumbnail.thumbnail(THUMBNAIL_SIZE)
+            buffer = io.BytesIO()
+            thumbnail.save(buffer, 'JPEG')
+            exif = _exif_with_thumbnail(buffer.getvalue())
+        path = os.path.join(directory, f"photo_{i:03d}.jpg")
+        photo.save(path, 'JPEG', quality=90, exif=exif)
+        paths.append(path)
+    return paths
+
+
+def _timed_hash(path: str, pre_size: int, fast: bool) -> Tuple[float, str]:
+    start = time.perf_counter()
+    digest = perceptual_hash(path, pre_size=pre_size, fast=fast)
+    return time.perf_counter() - start, digest
+
+
+def run_benchmark(paths: List[str], pre_size: int) -> Tuple[float, float, List[int]]:
+    """返回 (原有实现平均耗时, 快速路径平均耗时, 每张图片的汉明距离)"""
+    exact_seconds = fast_seconds = 0.0
+    distances = []
+    for path in paths:
+        seconds, exact = _timed_hash(path, pre_size, fast=False)
+        exact_seconds += seconds
+        seconds, fast = _timed_hash(path, pre_size, fast=True)
+        fast_seconds += seconds
+        distances.append(imagehash.hex_to_hash(exact) - imagehash.hex_to_hash(fast))
+    return exact_seconds / len(paths), fast_seconds / len(paths), distances
+
+
+def _report(paths: List[str]):
+    # 32: 增强版查找器；16: 旧版 hash_image
+    for pre_size in (32, 16):
+        exact, fast, distances = run_benchmark(paths, pre_size)
+        print(f"预缩放 {pre_size}x{pre_size}: 原有实现 {exact * 1000:.1f} ms/张，快速路径 {fast * 1000:.1f} ms/张 "
+              f"({exact / fast:.1f}x)")
+        print(f"    汉明距离 最大 {max(distances)}，平均 {sum(distances) / len(distances):.2f}，"
+              f"超过 2 的 {sum(d > 2 for d in distances)} 张，"
+              f"超过 {PERCEPTUAL_HASH_MAX_DISTANCE} 的 {sum(d > PERCEPTUAL_HASH_MAX_DISTANCE for d in distances)} 张")
+
+
+def _main(argv: List[str]):
+    parser = argparse.ArgumentParser(description="感知哈希快速路径基准测试")
+    parser.add_argument("--directory", help="使用该目录下的图片作为参考集，不指定时生成合成 JPEG")
+    parser.add_argument("--count", type=int, default=20, help="合成图片数量，默认 20")
+    parser.add_argument("--megapixels", type=float, default=24, help="合成图片的像素数（百万），默认 24")
+    args = parser.parse_args(argv)
+
+    if args.directory:
+        paths = [os.path.join(root, name) for root, _, names in os.walk(args.directory) for name in names
+                 if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS]
+        if not paths:
+            parser.error(f"目录中没有图片: {args.directory}")
+        print(f"参考集: {args.directory} ({len(paths)} 张)")
+        _report(paths)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"生成 {args.count} 张 {args.megapixels:g} MP 合成 JPEG...")
+        paths = _create_reference_set(tmp, args.count, args.megapixels)
+        _report(paths)
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
@@ -0,0 +1,195 @@
+"""file/ 模块的端到端基准测试
+
+在确定性的合成语料（见 benchmarks/corpus.py）上依次运行:
+    duplicates     EnhancedDuplicateFinder.find_duplicates（各阶段耗时取自 finder.stats）
+    folder_stats   folder_size_report.get_subfolder_stats
+    rename_plan    file_rename.generate_rename_plan（对每个叶子目录生成计划）
+    clean_names    file_clean_useless_name.clean_directory_filenames（会重命名文件，最后运行）
+每项测试在独立的子进程中运行，报告耗时、吞吐量（文件/秒）和该进程的峰值 RSS。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_suite --files 10000 100000 --json results.json
+    python -m benchmarks.bench_suite --files 1000000 --workdir /mnt/scratch --baseline results.json
+
+--json 把结果（含参数、语料统计、Python 版本和 git 提交）写成 JSON，--baseline 与之前保存的结果对比。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+from dataclasses import asdict
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from benchmarks.corpus import add_corpus_arguments, generate_corpus, spec_from_arguments
+
+BENCHMARKS = ("duplicates", "folder_stats", "rename_plan", "clean_names")
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Linux 以 KB 为单位
+
+
+def _bench_duplicates(corpus: str, workers: int) -> Dict:
+    from file.file_find_duplicates_enhanced import EnhancedDuplicateFinder
+    finder = EnhancedDuplicateFinder(log_callback=lambda message, level: None, workers=workers)
+    start = time.perf_counter()
+    results = finder.find_duplicates([corpus])
+    seconds = time.perf_counter() - start
+    snapshot = finder.stats.snapshot()
+    return {'seconds': seconds, 'items': snapshot['files_walked'], 'stages': snapshot['stage_seconds'],
+            'bytes_read': snapshot['bytes_read'], 'pairs_scored': snapshot['pairs_scored'],
+            'ffprobe': snapshot['ffprobe'], 'groups': sum(len(groups) for groups in results.values())}
+
+
+def _bench_folder_stats(corpus: str, workers: int) -> Dict:
+    from file.folder_size_report import get_subfolder_stats
+    start = time.perf_counter()
+    _, _, errors = get_subfolder_stats(corpus)
+    seconds = time.perf_counter() - start
+    items = sum(len(names) for _, _, names in os.walk(corpus))
+    return {'seconds': seconds, 'items': items, 'errors': len(errors)}
+
+
+def _bench_rename_plan(corpus: str, workers: int) -> Dict:
+    from file.file_rename import generate_rename_plan
+    leaf_dirs = [root for root, dirs, _ in os.walk(corpus) if not dirs]
+    planned = 0
+    start = time.perf_counter()
+    for directory in leaf_dirs:
+        success, plan, _ = generate_rename_plan(directory, "{{name}}_{{num}}.{{ext}}")
+        if success:
+            planned += len(plan)
+    return {'seconds': time.perf_counter() - start, 'items': planned}
+
+
+def _bench_clean_names(corpus: str, workers: int) -> Dict:
+    from file.file_clean_useless_name import clean_directory_filenames
+    start = time.perf_counter()
+    _, cleaned, skipped, errors = clean_directory_filenames(corpus)
+    return {'seconds': time.perf_counter() - start, 'items': cleaned + skipped + errors, 'cleaned': cleaned}
+
+
+BENCHMARK_FUNCTIONS: Dict[str, Callable[[str, int], Dict]] = {
+    'duplicates': _bench_duplicates,
+    'folder_stats': _bench_folder_stats,
+    'rename_plan': _bench_rename_plan,
+    'clean_names': _bench_clean_names,
+}
+
+
+def _run_in_child(name: str, corpus: str, workers: int, queue):
+    result = BENCHMARK_FUNCTIONS[name](corpus, workers)
+    result['peak_rss_bytes'] = _peak_rss_bytes()
+    queue.put(result)
+
+
+def run_benchmark(name: str, corpus: str, workers: int) -> Dict:
+    """在新的子进程中运行一项测试，使峰值 RSS 只反映这一项"""
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_run_in_child, args=(name, corpus, workers, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    result['items_per_second'] = result['items'] / result['seconds'] if result['seconds'] else None
+    return result
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _format_rss(num_bytes: Optional[int]) -> str:
+    return "-" if num_bytes is None else f"{num_bytes / 1024 / 1024:.0f} MB"
+
+
+def _report(run: Dict, baseline: Optional[Dict]):
+    corpus = run['corpus']
+    print(f"\n== {corpus['files']} 个文件（{corpus['bytes'] / 1024 / 1024:.1f} MB，副本 {corpus['duplicates']}，"
+          f"图片 {corpus['images']}，视频 {corpus['videos']}），生成耗时 {run['corpus_seconds']:.1f} s ==")
+    for name, result in run['benchmarks'].items():
+        line = (f"{name:<13} {result['seconds']:8.2f} s  {result['items_per_second'] or 0:10.0f} 文件/s  "
+                f"峰值 RSS {_format_rss(result['peak_rss_bytes'])}")
+        previous = (baseline or {}).get(name)
+        if previous and result['seconds']:
+            line += f"  (基准 {previous['seconds']:.2f} s，{previous['seconds'] / result['seconds']:.2f}x)"
+        print(line)
+        for stage, seconds in result.get('stages', {}).items():
+            print(f"    {stage:<13} {seconds:8.2f} s")
+
+
+def _baseline_for(baseline_data: Optional[Dict], files: int) -> Optional[Dict]:
+    for run in (baseline_data or {}).get('runs', []):
+        if run['corpus']['files'] == files:
+            return run['benchmarks']
+    return None
+
+
+def _main(argv: List[str]):
+    parser = argparse.ArgumentParser(description="file/ 模块端到端基准测试")
+    parser.add_argument("--files", type=int, nargs="+", default=[10000],
+                        help="语料文件数，可指定多个（如 10000 100000 1000000），默认 10000")
+    parser.add_argument("--benchmarks", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS), help="要运行的测试")
+    parser.add_argument("--workers", type=int, default=1, help="重复文件查找的并行工作数，默认 1")
+    parser.add_argument("--workdir", help="生成语料的目录，默认使用系统临时目录（每个规模测试完即删除）")
+    parser.add_argument("--json", help="把结果写入该 JSON 文件")
+    parser.add_argument("--baseline", help="与之前 --json 保存的结果对比")
+    add_corpus_arguments(parser)
+    args = parser.parse_args(argv)
+
+    baseline_data = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline_data = json.load(f)
+
+    # clean_names 会重命名语料中的文件，总是放在最后
+    selected = [name for name in BENCHMARKS if name in args.benchmarks]
+    output = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'workers': args.workers,
+        'runs': [],
+    }
+    for files in args.files:
+        spec = spec_from_arguments(args, files)
+        corpus = tempfile.mkdtemp(prefix=f"toolbox_bench_{files}_", dir=args.workdir)
+        try:
+            start = time.perf_counter()
+            corpus_stats = generate_corpus(corpus, spec)
+            run = {'spec': asdict(spec), 'corpus': corpus_stats, 'corpus_seconds': time.perf_counter() - start,
+                   'benchmarks': {}}
+            for name in selected:
+                run['benchmarks'][name] = run_benchmark(name, corpus, args.workers)
+        finally:
+            shutil.rmtree(corpus, ignore_errors=True)
+        output['runs'].append(run)
+        _report(run, _baseline_for(baseline_data, files))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(output, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
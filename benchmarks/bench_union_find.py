@@ -0,0 +1,95 @@
+"""重复组合并（并查集）的吞吐量与内存基准测试
+
+把合成的重复文件对逐个交给查找器的分组器（与扫描的比较阶段相同，每 4096 对取出一次变化的组），
+报告每秒处理的文件对数，以及处理到 10%、50%、100% 时进程的峰值 RSS：内存只应随文件数增长，不随文件对数增长。
+
+用法（在项目根目录执行）:
+    python -m benchmarks.bench_union_find --pairs 10000000 --files 1000000
+
+文件对大多落在 --cluster-size 个文件的小簇内，另有 --link-ratio 比例的文件对随机连接两个簇，
+使部分组合并成很长的链，检验按秩合并与迭代查找。
+"""
+import sys
+import time
+import random
+import argparse
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from file.file_find_duplicates_enhanced import _GroupTracker
+
+# 与评分函数产生的原因文本形式相同，数值部分有限的几种取值
+REASON_TEMPLATES = ("文件大小相同", "文件名包含复制标记", "文件名高度相似({:.2f})", "图片感知哈希相似(距离:{})",
+                    "视频时长相近(差异:{:.1f}秒)")
+FLUSH_INTERVAL = 4096
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Linux 以 KB 为单位
+
+
+def _synthetic_pairs(pairs: int, files: int, cluster_size: int, link_ratio: float,
+                     seed: int = 0) -> Iterator[Tuple[int, int, float, List[str]]]:
+    rng = random.Random(seed)
+    reasons = [
+        [REASON_TEMPLATES[0], REASON_TEMPLATES[2].format(rng.uniform(0.9, 1.0))],
+        [REASON_TEMPLATES[0], REASON_TEMPLATES[1]],
+        [REASON_TEMPLATES[3].format(rng.randrange(6))],
+        [REASON_TEMPLATES[4].format(rng.uniform(0, 2)), REASON_TEMPLATES[2].format(rng.uniform(0.9, 1.0))],
+    ]
+    for i in range(32):
+        reasons.append([REASON_TEMPLATES[2].format(0.9 + i / 320), REASON_TEMPLATES[3].format(i % 6)])
+    produced = 0
+    while produced < pairs:
+        item1 = rng.randrange(files)
+        if rng.random() < link_ratio:
+            item2 = rng.randrange(files)
+        else:
+            item2 = min(files - 1, item1 - item1 % cluster_size + rng.randrange(cluster_size))
+        if item1 != item2:
+            produced += 1
+            yield item1, item2, rng.uniform(40, 100), rng.choice(reasons)
+
+
+def run_benchmark(pairs: int, files: int, cluster_size: int, link_ratio: float) -> List[Tuple[int, float, Optional[int]]]:
+    """返回 [(已处理文件对数, 累计耗时秒数, 峰值 RSS), ...]，依次为 10%、50%、100% 处"""
+    tracker = _GroupTracker()
+    marks = {max(1, pairs // 10), max(1, pairs // 2), pairs}
+    results = []
+    start = time.perf_counter()
+    for count, (item1, item2, score, reasons) in enumerate(
+            _synthetic_pairs(pairs, files, cluster_size, link_ratio), 1):
+        tracker.add_pair(item1, item2, score, reasons)
+        if count % FLUSH_INTERVAL == 0:
+            tracker.take_dirty()
+        if count in marks:
+            results.append((count, time.perf_counter() - start, _peak_rss_bytes()))
+    tracker.take_dirty()
+    largest = max((len(members) for members in tracker.members.values()), default=0)
+    print(f"共 {len(tracker.members)} 组，最大的组 {largest} 个文件，{len(tracker.reason_flags)} 种原因")
+    return results
+
+
+def _main(argv: List[str]):
+    parser = argparse.ArgumentParser(description="重复组合并（并查集）基准测试")
+    parser.add_argument("--pairs", type=int, default=10000000, help="文件对数，默认 10000000")
+    parser.add_argument("--files", type=int, default=1000000, help="文件数，默认 1000000")
+    parser.add_argument("--cluster-size", type=int, default=8, help="大多数文件对所在簇的文件数，默认 8")
+    parser.add_argument("--link-ratio", type=float, default=0.01, help="随机连接两个簇的文件对比例，默认 0.01")
+    args = parser.parse_args(argv)
+
+    print(f"文件对: {args.pairs}，文件: {args.files}，簇大小: {args.cluster_size}，跨簇比例: {args.link_ratio}")
+    for count, seconds, peak in run_benchmark(args.pairs, args.files, args.cluster_size, args.link_ratio):
+        rss = "-" if peak is None else f"{peak / 1024 / 1024:.0f} MB"
+        print(f"{count:>12} 对  {seconds:8.1f} 秒  {count / seconds:>10.0f} 对/秒  峰值 RSS {rss}")
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
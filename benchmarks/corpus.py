@@ -0,0 +1,157 @@
+"""确定性的合成文件语料生成器
+
+按给定的文件数、重复比例、大小分布和图片/视频比例生成目录树，相同参数（含 seed）总是生成相同的文件。
+供基准测试使用，也可以单独生成语料:
+    python -m benchmarks.corpus /tmp/corpus --files 10000 --duplicate-ratio 0.2
+"""
+import io
+import os
+import sys
+import math
+import random
+import shutil
+import struct
+import argparse
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Tuple
+
+from PIL import Image, ImageDraw
+
+GENERIC_EXTENSIONS = ('.dat', '.txt', '.bin', '.log')
+# 副本的命名方式，覆盖查找器识别的复制标记
+COPY_NAME_PATTERNS = ("{stem} (1){ext}", "{stem}_copy{ext}", "{stem} - 副本{ext}", "{stem}{ext}")
+# 文件名清理工具默认模式能去掉的无用片段
+JUNK_NAME_PATTERNS = ("www.zxit8.com_{stem}{ext}", "{stem} - Copy{ext}", "{stem} 2024-01-15{ext}")
+JUNK_NAME_RATIO = 0.1
+TOP_LEVEL_FOLDERS = 16
+
+
+@dataclass
+class CorpusSpec:
+    """语料参数；大小服从以 median_size 为中位数的对数正态分布，截断到 [1, max_size]"""
+    files: int = 10000
+    duplicate_ratio: float = 0.2
+    image_ratio: float = 0.05
+    video_ratio: float = 0.02
+    median_size: int = 8 * 1024
+    size_sigma: float = 1.0
+    max_size: int = 4 * 1024 * 1024
+    files_per_directory: int = 500
+    seed: int = 0
+
+
+def _fake_mp4(rng: random.Random, size: int) -> bytes:
+    """只有 ftyp 和 mdat 盒子的 MP4 头，ffprobe 能识别格式但读不出时长"""
+    ftyp = struct.pack('>I4s4sI', 24, b'ftyp', b'isom', 0x200) + b'isomiso2'
+    payload = rng.randbytes(max(0, size - len(ftyp) - 8))
+    return ftyp + struct.pack('>I4s', len(payload) + 8, b'mdat') + payload
+
+
+def _png(rng: random.Random) -> bytes:
+    width, height = rng.randrange(32, 257), rng.randrange(32, 257)
+    img = Image.new('RGB', (width, height), tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(8):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.rectangle([x, y, x + rng.randrange(8, width), y + rng.randrange(8, height)],
+                       fill=tuple(rng.randrange(256) for _ in range(3)))
+    buffer = io.BytesIO()
+    img.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def _directory(root: str, index: int, spec: CorpusSpec) -> str:
+    folder = index // spec.files_per_directory
+    return os.path.join(root, f"part_{folder % TOP_LEVEL_FOLDERS:02d}", f"dir_{folder:05d}")
+
+
+def generate_corpus(root: str, spec: CorpusSpec) -> Dict[str, int]:
+    """在 root 下生成语料，返回统计信息（文件数、总字节数、重复文件数、图片数、视频数、目录数）"""
+    rng = random.Random(spec.seed)
+    originals: List[Tuple[str, str]] = []  # (路径, 类型)
+    stats = {'files': 0, 'bytes': 0, 'duplicates': 0, 'images': 0, 'videos': 0, 'directories': 0}
+    directories = set()
+
+    for i in range(spec.files):
+        directory = _directory(root, i, spec)
+        if directory not in directories:
+            os.makedirs(directory, exist_ok=True)
+            directories.add(directory)
+
+        if originals and rng.random() < spec.duplicate_ratio:
+            source, kind = originals[rng.randrange(len(originals))]
+            stem, ext = os.path.splitext(os.path.basename(source))
+            path = os.path.join(directory, rng.choice(COPY_NAME_PATTERNS).format(stem=stem, ext=ext))
+            if os.path.exists(path):
+                path = os.path.join(directory, f"{stem}_{i}{ext}")
+            if kind == 'image' and rng.random() < 0.5:
+                # 一半的图片副本重新缩放编码，只能靠感知哈希找到
+                with Image.open(source) as img:
+                    img.resize((max(1, img.width // 2), max(1, img.height // 2))).save(path, 'PNG')
+            else:
+                shutil.copyfile(source, path)
+            stats['duplicates'] += 1
+        else:
+            roll = rng.random()
+            stem = f"file_{i:07d}"
+            if roll < spec.image_ratio:
+                kind, ext = 'image', '.png'
+                data = _png(rng)
+                stats['images'] += 1
+            elif roll < spec.image_ratio + spec.video_ratio:
+                kind, ext = 'video', '.mp4'
+                size = int(min(spec.max_size, rng.lognormvariate(math.log(spec.median_size * 16), spec.size_sigma)))
+                data = _fake_mp4(rng, size)
+                stats['videos'] += 1
+            else:
+                kind, ext = 'generic', rng.choice(GENERIC_EXTENSIONS)
+                size = int(min(spec.max_size, max(1, rng.lognormvariate(math.log(spec.median_size), spec.size_sigma))))
+                data = rng.randbytes(size)
+            name = f"{stem}{ext}"
+            if rng.random() < JUNK_NAME_RATIO:
+                name = rng.choice(JUNK_NAME_PATTERNS).format(stem=stem, ext=ext)
+            path = os.path.join(directory, name)
+            with open(path, 'wb') as f:
+                f.write(data)
+            originals.append((path, kind))
+
+        stats['files'] += 1
+        stats['bytes'] += os.path.getsize(path)
+
+    stats['directories'] = len(directories)
+    return stats
+
+
+def add_corpus_arguments(parser: argparse.ArgumentParser):
+    defaults = CorpusSpec()
+    parser.add_argument("--duplicate-ratio", type=float, default=defaults.duplicate_ratio, help="副本占全部文件的比例")
+    parser.add_argument("--image-ratio", type=float, default=defaults.image_ratio, help="原始文件中 PNG 图片的比例")
+    parser.add_argument("--video-ratio", type=float, default=defaults.video_ratio, help="原始文件中伪 MP4 的比例")
+    parser.add_argument("--median-size", type=int, default=defaults.median_size, help="普通文件大小的中位数（字节）")
+    parser.add_argument("--size-sigma", type=float, default=defaults.size_sigma, help="对数正态大小分布的 sigma")
+    parser.add_argument("--max-size", type=int, default=defaults.max_size, help="单个文件的最大字节数")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="随机种子")
+
+
+def spec_from_arguments(args: argparse.Namespace, files: int) -> CorpusSpec:
+    return CorpusSpec(files=files, duplicate_ratio=args.duplicate_ratio, image_ratio=args.image_ratio,
+                      video_ratio=args.video_ratio, median_size=args.median_size, size_sigma=args.size_sigma,
+                      max_size=args.max_size, seed=args.seed)
+
+
+def _main(argv: List[str]):
+    parser = argparse.ArgumentParser(description="生成确定性的合成文件语料")
+    parser.add_argument("directory", help="输出目录（应为空目录）")
+    parser.add_argument("--files", type=int, default=CorpusSpec.files, help="文件数，默认 10000")
+    add_corpus_arguments(parser)
+    args = parser.parse_args(argv)
+
+    spec = spec_from_arguments(args, args.files)
+    stats = generate_corpus(args.directory, spec)
+    print(f"参数: {asdict(spec)}")
+    print(f"已生成 {stats['files']} 个文件（{stats['bytes'] / 1024 / 1024:.1f} MB，{stats['directories']} 个目录），"
+          f"其中副本 {stats['duplicates']} 个，图片 {stats['images']} 张，视频 {stats['videos']} 个")
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
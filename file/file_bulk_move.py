@@ -0,0 +1,381 @@
+import os
+import sys
+import json
+import time
+import errno
+import shutil
+import filecmp
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .folder_size_report import human_readable_size
+
+# 移动方式：同一设备上直接 os.rename（只修改目录项），跨设备时复制后删除源文件
+STRATEGY_RENAME = "rename"
+STRATEGY_COPY = "copy"
+
+JOURNAL_FILE_NAME = ".move_journal.jsonl"
+# 跨设备复制受磁盘带宽限制，少量线程即可让读写重叠
+DEFAULT_COPY_WORKERS = 4
+# 每记录多少条结果刷新一次日志文件；崩溃丢失的结果记录在继续时会按文件系统的实际状态补齐
+JOURNAL_FLUSH_INTERVAL = 256
+
+# 日志记录类型
+OP_PLAN = "plan"
+OP_DONE = "done"
+OP_FAILED = "failed"
+OP_UNDONE = "undone"
+
+
+@dataclass
+class MoveTask:
+    """把 source 移动到 destination（destination 已解决重名）"""
+    task_id: int
+    source: str
+    destination: str
+    strategy: str
+    size: int = 0
+
+
+@dataclass
+class MoveResult:
+    """一次移动、继续或撤销的结果"""
+    moved: List[MoveTask] = field(default_factory=list)
+    skipped: List[Tuple[str, str]] = field(default_factory=list)  # (路径, 原因)
+    errors: List[Tuple[str, str]] = field(default_factory=list)  # (路径, 错误信息)
+
+    @property
+    def bytes_moved(self) -> int:
+        return sum(task.size for task in self.moved)
+
+
+class MoveJournal:
+    """批量移动的日志文件 (JSON Lines，只追加)
+
+    执行前先写入全部计划记录 (plan) 并落盘，之后每个文件完成、失败或被撤销时追加一条结果记录。
+    日志中断在任何位置都能读取：没有结果记录的计划就是尚未完成的移动。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+        self._unflushed = 0
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+
+    def load(self) -> Tuple[Dict[int, MoveTask], Dict[int, str]]:
+        """返回 (计划编号 -> 任务, 计划编号 -> 最后状态)；最后一行写到一半时忽略该行"""
+        tasks: Dict[int, MoveTask] = {}
+        status: Dict[int, str] = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    task_id = record.get('id')
+                    if record.get('op') == OP_PLAN:
+                        tasks[task_id] = MoveTask(task_id, record['src'], record['dst'], record['strategy'],
+                                                  record.get('size', 0))
+                    elif task_id in tasks:
+                        status[task_id] = record.get('op')
+        except FileNotFoundError:
+            pass
+        return tasks, status
+
+    def append(self, records: Iterable[dict], sync: bool = False):
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            for record in records:
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._unflushed += 1
+            if sync:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._unflushed = 0
+            elif self._unflushed >= JOURNAL_FLUSH_INTERVAL:
+                self._file.flush()
+                self._unflushed = 0
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+                self._unflushed = 0
+
+    def archive(self) -> str:
+        """一批移动全部执行过后把日志改名保存（供撤销使用），返回保存的路径
+
+        self.path 保持不变，同一个对象之后的移动从原路径上的新日志开始，不会与已保存的一批混在一起。
+        """
+        self.close()
+        root, ext = os.path.splitext(self.path)
+        archived_path = f"{root}-{time.strftime('%Y%m%d-%H%M%S')}{ext}"
+        counter = 1
+        while os.path.exists(archived_path):
+            archived_path = f"{root}-{time.strftime('%Y%m%d-%H%M%S')}_{counter}{ext}"
+            counter += 1
+        os.replace(self.path, archived_path)
+        return archived_path
+
+
+def _nearest_existing_dir(path: str) -> str:
+    while path and not os.path.isdir(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+class BulkMover:
+    """带日志的批量文件移动
+
+    计划阶段每个目标文件夹只列一次目录，在内存中解决重名；同一设备上的文件用 os.rename，
+    跨设备的文件由线程池并行复制（先复制到临时文件再原子改名，最后删除源文件）。
+    每个移动都记录在日志文件中，中断后可以继续 (resume)，完成后可以按日志撤销 (undo)。
+    """
+
+    def __init__(self, journal_path: str, workers: int = DEFAULT_COPY_WORKERS,
+                 log_callback: Optional[callable] = None, stop_event: Optional[threading.Event] = None):
+        self.journal = MoveJournal(journal_path)
+        self.workers = max(1, workers)
+        self.log_callback = log_callback
+        self.stop_event = stop_event or threading.Event()
+
+    def _log(self, message: str, level: str = "INFO"):
+        if self.log_callback:
+            self.log_callback(message, level)
+        elif level == "ERROR":
+            logging.error(message)
+        elif level == "WARNING":
+            logging.warning(message)
+        else:
+            logging.info(message)
+
+    def _check_stop_event(self):
+        if self.stop_event.is_set():
+            self._log("收到停止信号，移动操作已中止，可稍后继续。", "WARNING")
+            raise InterruptedError("操作被用户中止")
+
+    def has_pending(self) -> bool:
+        """日志中是否有尚未完成的移动（上次被中断）"""
+        tasks, status = self.journal.load()
+        return any(task_id not in status for task_id in tasks)
+
+    def plan(self, moves: Iterable[Tuple[str, str]]) -> Tuple[List[MoveTask], List[Tuple[str, str]]]:
+        """为 (源文件, 目标文件夹) 生成移动任务，返回 (任务, 跳过的文件)
+
+        重名按 "名称_1.扩展名"、"名称_2.扩展名" 依次编号，与目标文件夹中已有的文件和本批其他文件都不冲突。
+        """
+        tasks: List[MoveTask] = []
+        skipped: List[Tuple[str, str]] = []
+        listings: Dict[str, Set[str]] = {}
+        devices: Dict[str, int] = {}
+        existing_tasks, _ = self.journal.load()
+        next_id = max(existing_tasks, default=-1) + 1
+
+        for source, target_dir in moves:
+            try:
+                st = os.stat(source)
+            except OSError as e:
+                skipped.append((source, f"文件不存在或无法访问: {e}"))
+                continue
+
+            target_dir = os.path.abspath(target_dir)
+            names = listings.get(target_dir)
+            if names is None:
+                try:
+                    names = {os.path.normcase(name) for name in os.listdir(target_dir)}
+                except FileNotFoundError:
+                    names = set()
+                listings[target_dir] = names
+                devices[target_dir] = os.stat(_nearest_existing_dir(target_dir)).st_dev
+
+            filename = os.path.basename(source)
+            name, ext = os.path.splitext(filename)
+            candidate = filename
+            counter = 1
+            while os.path.normcase(candidate) in names:
+                candidate = f"{name}_{counter}{ext}"
+                counter += 1
+            names.add(os.path.normcase(candidate))
+
+            strategy = STRATEGY_RENAME if st.st_dev == devices[target_dir] else STRATEGY_COPY
+            tasks.append(MoveTask(next_id, source, os.path.join(target_dir, candidate), strategy, st.st_size))
+            next_id += 1
+        return tasks, skipped
+
+    def move(self, moves: Iterable[Tuple[str, str]]) -> MoveResult:
+        """规划并执行一批移动，执行完毕后归档日志"""
+        tasks, skipped = self.plan(moves)
+        renames = sum(task.strategy == STRATEGY_RENAME for task in tasks)
+        self._log(f"计划移动 {len(tasks)} 个文件（{renames} 个同设备改名，{len(tasks) - renames} 个跨设备复制，"
+                  f"共 {human_readable_size(sum(task.size for task in tasks))}），日志: {self.journal.path}", "INFO")
+        self.journal.append(({'op': OP_PLAN, 'id': task.task_id, 'src': task.source, 'dst': task.destination,
+                              'strategy': task.strategy, 'size': task.size} for task in tasks), sync=True)
+        result = self._execute(tasks, resuming=False)
+        result.skipped[:0] = skipped
+        return result
+
+    def resume(self) -> MoveResult:
+        """继续执行日志中尚未完成的移动"""
+        tasks, status = self.journal.load()
+        pending = [task for task_id, task in sorted(tasks.items()) if task_id not in status]
+        self._log(f"从日志继续移动 {len(pending)} 个文件（已完成 {len(tasks) - len(pending)} 个）。", "INFO")
+        return self._execute(pending, resuming=True)
+
+    def undo(self) -> MoveResult:
+        """按相反顺序把日志中已完成的移动移回原位置"""
+        tasks, status = self.journal.load()
+        done = [task for task_id, task in sorted(tasks.items(), reverse=True) if status.get(task_id) == OP_DONE]
+        self._log(f"撤销 {len(done)} 个已完成的移动，日志: {self.journal.path}", "INFO")
+        result = MoveResult()
+        try:
+            for task in done:
+                self._check_stop_event()
+                reverse = MoveTask(task.task_id, task.destination, task.source, STRATEGY_RENAME, task.size)
+                try:
+                    if os.path.lexists(reverse.destination):
+                        result.skipped.append((task.source, "原位置已存在同名文件"))
+                        continue
+                    if not os.path.lexists(reverse.source):
+                        result.skipped.append((task.destination, "移动后的文件已不存在"))
+                        continue
+                    os.makedirs(os.path.dirname(reverse.destination), exist_ok=True)
+                    self._move_one(reverse)
+                    result.moved.append(reverse)
+                    self.journal.append([{'op': OP_UNDONE, 'id': task.task_id}])
+                except OSError as e:
+                    result.errors.append((task.destination, str(e)))
+                    self._log(f"撤销失败 {task.destination}: {e}", "ERROR")
+        finally:
+            self.journal.close()
+        self._log(f"撤销完成：移回 {len(result.moved)} 个文件，跳过 {len(result.skipped)} 个，"
+                  f"失败 {len(result.errors)} 个。", "INFO")
+        return result
+
+    def _move_one(self, task: MoveTask):
+        if task.strategy == STRATEGY_RENAME:
+            try:
+                os.rename(task.source, task.destination)
+                return
+            except OSError as e:
+                # 目标在绑定挂载等特殊位置时 st_dev 相同也可能跨设备，退回到复制
+                if e.errno != errno.EXDEV:
+                    raise
+        directory, filename = os.path.split(task.destination)
+        tmp_path = os.path.join(directory, f".{filename}.move-{os.getpid()}.part")
+        try:
+            shutil.copy2(task.source, tmp_path)
+            os.replace(tmp_path, task.destination)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        os.remove(task.source)
+
+    def _reconcile(self, task: MoveTask) -> Optional[str]:
+        """继续时检查上次中断留下的状态：返回 "done" 表示已完成，返回其他字符串表示无法继续的原因"""
+        source_exists = os.path.lexists(task.source)
+        destination_exists = os.path.lexists(task.destination)
+        if not source_exists and destination_exists:
+            return OP_DONE
+        if not source_exists:
+            return "源文件已不存在"
+        if destination_exists:
+            # 复制已原子地完成、只差删除源文件；目标也可能是之后放入的同名文件，只有内容逐字节相同才删除源文件
+            if task.strategy == STRATEGY_COPY and filecmp.cmp(task.source, task.destination, shallow=False):
+                os.remove(task.source)
+                return OP_DONE
+            return "目标位置已存在同名文件"
+        return None
+
+    def _run_task(self, task: MoveTask, resuming: bool) -> Tuple[MoveTask, Optional[str]]:
+        """执行一个移动，返回 (任务, 错误信息或 None)"""
+        try:
+            if resuming:
+                state = self._reconcile(task)
+                if state == OP_DONE:
+                    return task, None
+                if state is not None:
+                    return task, state
+            self._move_one(task)
+            return task, None
+        except OSError as e:
+            return task, str(e)
+
+    def _record(self, result: MoveResult, task: MoveTask, error: Optional[str]):
+        if error is None:
+            result.moved.append(task)
+            self.journal.append([{'op': OP_DONE, 'id': task.task_id}])
+            self._log(f"已移动: {task.source} -> {task.destination}", "DEBUG")
+        else:
+            result.errors.append((task.source, error))
+            self.journal.append([{'op': OP_FAILED, 'id': task.task_id, 'error': error}])
+            self._log(f"移动失败 {task.source}: {error}", "ERROR")
+
+    def _execute(self, tasks: List[MoveTask], resuming: bool) -> MoveResult:
+        result = MoveResult()
+        # 计划时已确认目标文件夹中没有同名文件，首次执行不再逐个检查；继续时按实际状态核对
+        for directory in {os.path.dirname(task.destination) for task in tasks}:
+            os.makedirs(directory, exist_ok=True)
+
+        copies = [task for task in tasks if task.strategy == STRATEGY_COPY]
+        renames = [task for task in tasks if task.strategy == STRATEGY_RENAME]
+        executor = ThreadPoolExecutor(max_workers=self.workers) if copies else None
+        try:
+            futures = [executor.submit(self._run_task, task, resuming) for task in copies] if executor else []
+            # 复制在后台进行，同时在当前线程完成所有改名
+            for task in renames:
+                self._check_stop_event()
+                self._record(result, *self._run_task(task, resuming))
+            for future in as_completed(futures):
+                self._record(result, *future.result())
+                # 中止时取消尚未开始的复制；正在进行的复制完成后没有结果记录，继续时会按实际状态补齐
+                self._check_stop_event()
+        finally:
+            if executor:
+                executor.shutdown(wait=True, cancel_futures=True)
+            self.journal.close()
+
+        self._log(f"移动完成：已移动 {len(result.moved)} 个文件（{human_readable_size(result.bytes_moved)}），"
+                  f"失败 {len(result.errors)} 个。", "INFO")
+        if self.journal.exists():
+            archived = self.journal.archive()
+            self._log(f"移动日志已保存到 {archived}，可用于撤销。", "INFO")
+        return result
+
+
+def _main(argv: List[str]):
+    parser = argparse.ArgumentParser(description="按移动日志继续或撤销批量移动")
+    parser.add_argument("action", choices=("resume", "undo"), help="resume: 继续未完成的移动；undo: 撤销已完成的移动")
+    parser.add_argument("journal", help=f"移动日志文件（目标文件夹下的 {JOURNAL_FILE_NAME} 或归档后的日志）")
+    parser.add_argument("--workers", type=int, default=DEFAULT_COPY_WORKERS, help="跨设备复制的线程数")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    mover = BulkMover(args.journal, workers=args.workers)
+    result = mover.resume() if args.action == "resume" else mover.undo()
+    for path, reason in result.skipped:
+        print(f"跳过: {path} ({reason})")
+    for path, error in result.errors:
+        print(f"失败: {path} ({error})")
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
@@ -0,0 +1,334 @@
+import os
+import sys
+import errno
+import shutil
+import logging
+import argparse
+import threading
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from .folder_size_report import human_readable_size
+from .file_find_duplicates_enhanced import DuplicateGroup, DuplicateLevel, EnhancedDuplicateFinder
+
+# 替换方式：硬链接（所有文件系统）或写时复制的 reflink（Btrfs、XFS 等支持 FICLONE 的文件系统）
+LINK_HARDLINK = "hardlink"
+LINK_REFLINK = "reflink"
+LINK_MODES = (LINK_HARDLINK, LINK_REFLINK)
+
+# 每组保留哪个文件
+KEEP_OLDEST = "oldest"  # 修改时间最早的文件
+KEEP_SHORTEST_PATH = "shortest_path"  # 路径最短的文件
+KEEP_PREFERRED_ROOT = "preferred_root"  # 位于优先目录中的文件（按优先目录顺序），没有时取最早的文件
+KEEP_POLICIES = (KEEP_OLDEST, KEEP_SHORTEST_PATH, KEEP_PREFERRED_ROOT)
+
+# Linux FICLONE ioctl: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+VERIFY_BLOCK_SIZE = 1024 * 1024
+# 每批先逐字节校验再统一替换，批与批之间检查停止信号并报告进度
+DEFAULT_BATCH_SIZE = 64
+
+
+@dataclass
+class DedupAction:
+    """把 target 替换为指向 keep 的链接"""
+    keep: str
+    target: str
+    size: int
+    reclaimable: int = 0  # 替换后可释放的字节数；target 还有其他硬链接时数据仍被占用，为 0
+    # 逐字节校验前两个文件的 (device, inode, 大小, mtime_ns)，未校验时为 None；apply 据此确认文件没有再被修改
+    target_signature: Optional[Tuple[int, int, int, int]] = None
+    keep_signature: Optional[Tuple[int, int, int, int]] = None
+
+
+@dataclass
+class DedupResult:
+    """一次去重（或演练）的结果"""
+    dry_run: bool
+    mode: str
+    replaced: List[DedupAction] = field(default_factory=list)  # 演练时为校验通过、将会替换的文件，可交给 apply 执行
+    skipped: List[Tuple[str, str]] = field(default_factory=list)  # (路径, 原因)
+    errors: List[Tuple[str, str]] = field(default_factory=list)  # (路径, 错误信息)
+
+    @property
+    def bytes_reclaimed(self) -> int:
+        return sum(action.reclaimable for action in self.replaced)
+
+
+def reflink_file(source: str, destination: str):
+    """用 FICLONE 创建 source 的写时复制副本 destination（两者共享数据块），不支持时抛出 OSError"""
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "当前平台不支持 reflink")
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+
+
+def files_identical(path1: str, path2: str, block_size: int = VERIFY_BLOCK_SIZE,
+                    stop_event: Optional[threading.Event] = None) -> bool:
+    """逐字节比较两个文件的内容"""
+    with open(path1, 'rb', buffering=0) as f1, open(path2, 'rb', buffering=0) as f2:
+        if os.fstat(f1.fileno()).st_size != os.fstat(f2.fileno()).st_size:
+            return False
+        while True:
+            if stop_event and stop_event.is_set():
+                raise InterruptedError("操作被用户中止")
+            chunk1 = f1.read(block_size)
+            chunk2 = f2.read(block_size)
+            if chunk1 != chunk2:
+                return False
+            if not chunk1:
+                return True
+
+
+def _stat_signature(st: os.stat_result) -> Tuple[int, int, int, int]:
+    return st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns
+
+
+def _is_under(path: str, root: str) -> bool:
+    path, root = os.path.normcase(os.path.abspath(path)), os.path.normcase(os.path.abspath(root))
+    try:
+        return os.path.commonpath([path, root]) == root
+    except ValueError:
+        return False
+
+
+class DedupEngine:
+    """用硬链接或 reflink 替换确定重复的文件以释放空间
+
+    只处理 CERTAIN 等级的组：每组按保留策略选出一个文件，其余文件在逐字节校验一致后，
+    先在同一目录下创建指向保留文件的临时链接，再原子地替换原文件，任何一步失败都不会丢失数据。
+    演练 (dry_run) 同样会校验内容，报告可释放的空间，但不修改任何文件；演练结果可交给 apply 执行，
+    apply 只确认文件信息自校验后没有变化，不再重新读取内容。
+    """
+
+    def __init__(self, mode: str = LINK_HARDLINK, keep_policy: str = KEEP_OLDEST,
+                 preferred_roots: Optional[Sequence[str]] = None, batch_size: int = DEFAULT_BATCH_SIZE,
+                 log_callback: Optional[callable] = None, stop_event: Optional[threading.Event] = None):
+        if mode not in LINK_MODES:
+            raise ValueError(f"不支持的替换方式: {mode}，可选: {', '.join(LINK_MODES)}")
+        if keep_policy not in KEEP_POLICIES:
+            raise ValueError(f"不支持的保留策略: {keep_policy}，可选: {', '.join(KEEP_POLICIES)}")
+        self.mode = mode
+        self.keep_policy = keep_policy
+        self.preferred_roots = list(preferred_roots or [])
+        self.batch_size = max(1, batch_size)
+        self.log_callback = log_callback
+        self.stop_event = stop_event or threading.Event()
+
+    def _log(self, message: str, level: str = "INFO"):
+        if self.log_callback:
+            self.log_callback(message, level)
+        elif level == "ERROR":
+            logging.error(message)
+        elif level == "WARNING":
+            logging.warning(message)
+        else:
+            logging.info(message)
+
+    def _check_stop_event(self):
+        if self.stop_event.is_set():
+            self._log("收到停止信号，去重操作已中止。", "WARNING")
+            raise InterruptedError("操作被用户中止")
+
+    def choose_keeper(self, paths: List[str]) -> str:
+        """按保留策略选出组内保留的文件"""
+        def oldest_key(path):
+            try:
+                return os.stat(path).st_mtime_ns, path
+            except OSError:
+                return float('inf'), path
+
+        if self.keep_policy == KEEP_SHORTEST_PATH:
+            return min(paths, key=lambda path: (len(path), path))
+        if self.keep_policy == KEEP_PREFERRED_ROOT:
+            for root in self.preferred_roots:
+                preferred = [path for path in paths if _is_under(path, root)]
+                if preferred:
+                    return min(preferred, key=oldest_key)
+        return min(paths, key=oldest_key)
+
+    def plan(self, groups: Iterable[DuplicateGroup]) -> Tuple[List[DedupAction], List[Tuple[str, str]]]:
+        """为 CERTAIN 组生成替换计划（只检查文件信息，不读取内容）
+
+        组内文件先按 (大小, 内容哈希) 细分：相似度合并出的组可能包含几份彼此不同的内容，
+        每份内容各自保留一个文件。
+
+        Returns:
+            (替换动作, [(跳过的路径, 原因), ...])
+        """
+        actions: List[DedupAction] = []
+        skipped: List[Tuple[str, str]] = []
+        for group in groups:
+            if group.level != DuplicateLevel.CERTAIN:
+                continue
+            partitions = defaultdict(list)
+            for file_meta in group.files:
+                if os.path.isfile(file_meta.path):
+                    partitions[(file_meta.size, file_meta.content_hash)].append(file_meta.path)
+                else:
+                    skipped.append((file_meta.path, "文件已不存在"))
+            for existing in partitions.values():
+                if len(existing) > 1:
+                    self._plan_partition(existing, actions, skipped)
+        return actions, skipped
+
+    def _plan_partition(self, existing: List[str], actions: List[DedupAction], skipped: List[Tuple[str, str]]):
+        """为内容应当相同的一组文件选出保留文件，并为其余文件生成替换动作"""
+        keep = self.choose_keeper(existing)
+        try:
+            keep_stat = os.stat(keep)
+        except OSError as e:
+            skipped.extend((path, f"无法读取保留文件 {keep}: {e}") for path in existing if path != keep)
+            return
+        for path in existing:
+            if path == keep:
+                continue
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                skipped.append((path, str(e)))
+                continue
+            if st.st_size != keep_stat.st_size:
+                skipped.append((path, "与保留文件大小不同"))
+            elif (st.st_dev, st.st_ino) == (keep_stat.st_dev, keep_stat.st_ino):
+                skipped.append((path, "已是保留文件的硬链接"))
+            elif st.st_dev != keep_stat.st_dev:
+                skipped.append((path, "与保留文件不在同一文件系统"))
+            else:
+                reclaimable = st.st_size if st.st_nlink <= 1 else 0
+                actions.append(DedupAction(keep=keep, target=path, size=st.st_size, reclaimable=reclaimable))
+
+    def _replace(self, action: DedupAction):
+        """在目标所在目录创建临时链接，再原子替换目标文件"""
+        directory, name = os.path.split(action.target)
+        tmp_path = os.path.join(directory, f".{name}.dedup-{os.getpid()}.tmp")
+        try:
+            if self.mode == LINK_HARDLINK:
+                os.link(action.keep, tmp_path)
+            else:
+                reflink_file(action.keep, tmp_path)
+                # reflink 是独立的文件，保留原文件的权限和时间
+                shutil.copystat(action.target, tmp_path)
+            os.replace(tmp_path, action.target)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _verify(self, batch: List[DedupAction], result: DedupResult) -> List[DedupAction]:
+        """逐字节校验一批动作，返回记录了校验时文件信息的动作"""
+        verified = []
+        for action in batch:
+            try:
+                # 先取文件信息再读取内容，校验期间的修改也会在替换前被发现
+                target_signature = _stat_signature(os.stat(action.target))
+                keep_signature = _stat_signature(os.stat(action.keep))
+                if not files_identical(action.keep, action.target, stop_event=self.stop_event):
+                    result.skipped.append((action.target, "内容与保留文件不一致"))
+                    continue
+                action.target_signature, action.keep_signature = target_signature, keep_signature
+                verified.append(action)
+            except InterruptedError:
+                raise
+            except OSError as e:
+                result.errors.append((action.target, str(e)))
+        return verified
+
+    def _apply_verified(self, batch: List[DedupAction], result: DedupResult):
+        """替换一批已校验的文件，替换前确认两个文件的信息与校验时相同"""
+        for action in batch:
+            try:
+                if (action.target_signature is None
+                        or _stat_signature(os.stat(action.target)) != action.target_signature
+                        or _stat_signature(os.stat(action.keep)) != action.keep_signature):
+                    result.skipped.append((action.target, "校验后文件已被修改"))
+                    continue
+                self._replace(action)
+                result.replaced.append(action)
+                self._log(f"已替换: {action.target} -> {action.keep}", "DEBUG")
+            except OSError as e:
+                if self.mode == LINK_REFLINK and e.errno in (errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV,
+                                                             errno.EINVAL):
+                    e = OSError(e.errno, f"文件系统不支持 reflink ({e.strerror})")
+                result.errors.append((action.target, str(e)))
+                self._log(f"替换失败 {action.target}: {e}", "ERROR")
+
+    def _log_summary(self, result: DedupResult):
+        dry_run = result.dry_run
+        self._log(f"{'[演练] ' if dry_run else ''}完成：{'将' if dry_run else '已'}替换 {len(result.replaced)} 个文件，"
+                  f"{'可' if dry_run else '已'}释放 {human_readable_size(result.bytes_reclaimed)}；"
+                  f"跳过 {len(result.skipped)} 个，失败 {len(result.errors)} 个。", "INFO")
+
+    def run(self, groups: Iterable[DuplicateGroup], dry_run: bool = True) -> DedupResult:
+        """执行（或演练）去重，返回结果"""
+        result = DedupResult(dry_run=dry_run, mode=self.mode)
+        actions, result.skipped = self.plan(groups)
+        mode_name = "硬链接" if self.mode == LINK_HARDLINK else "reflink"
+        self._log(f"{'[演练] ' if dry_run else ''}计划用{mode_name}替换 {len(actions)} 个文件，"
+                  f"跳过 {len(result.skipped)} 个。", "INFO")
+
+        for start in range(0, len(actions), self.batch_size):
+            self._check_stop_event()
+            # 先校验整批，再统一替换；校验与替换之间文件若被修改，替换前的 stat 检查会发现
+            verified = self._verify(actions[start:start + self.batch_size], result)
+            if dry_run:
+                result.replaced.extend(verified)
+            else:
+                self._apply_verified(verified, result)
+            self._log(f"{'[演练] ' if dry_run else ''}已处理 {min(start + self.batch_size, len(actions))}/{len(actions)} 个文件，"
+                      f"{'可' if dry_run else '已'}释放 {human_readable_size(result.bytes_reclaimed)}。", "INFO")
+
+        self._log_summary(result)
+        return result
+
+    def apply(self, preview: DedupResult) -> DedupResult:
+        """执行演练得到的替换计划：不再重新分组和逐字节校验，替换前只确认文件信息与校验时相同
+
+        Args:
+            preview: 同一替换方式下 run(groups, dry_run=True) 的结果
+        """
+        if not preview.dry_run or preview.mode != self.mode:
+            raise ValueError("只能执行同一替换方式下演练得到的计划")
+        result = DedupResult(dry_run=False, mode=self.mode, skipped=list(preview.skipped),
+                             errors=list(preview.errors))
+        actions = preview.replaced
+        for start in range(0, len(actions), self.batch_size):
+            self._check_stop_event()
+            self._apply_verified(actions[start:start + self.batch_size], result)
+            self._log(f"已处理 {min(start + self.batch_size, len(actions))}/{len(actions)} 个文件，"
+                      f"已释放 {human_readable_size(result.bytes_reclaimed)}。", "INFO")
+
+        self._log_summary(result)
+        return result
+
+
+def _main(argv: List[str]):
+    parser = argparse.ArgumentParser(description="查找确定重复的文件，并用硬链接或 reflink 替换以释放空间")
+    parser.add_argument("roots", nargs="+", help="要扫描的目录")
+    parser.add_argument("--mode", choices=LINK_MODES, default=LINK_HARDLINK, help="替换方式，默认 hardlink")
+    parser.add_argument("--keep", choices=KEEP_POLICIES, default=KEEP_OLDEST, help="每组保留哪个文件，默认 oldest")
+    parser.add_argument("--prefer", action="append", default=[], help="优先保留位于该目录中的文件，可多次指定")
+    parser.add_argument("--apply", action="store_true", help="实际替换文件；不指定时只演练并报告可释放的空间")
+    args = parser.parse_args(argv)
+
+    finder = EnhancedDuplicateFinder()
+    results = finder.find_duplicates(args.roots)
+    engine = DedupEngine(mode=args.mode, keep_policy=args.keep, preferred_roots=args.prefer)
+    result = engine.run(results.get(DuplicateLevel.CERTAIN, []), dry_run=not args.apply)
+    for path, reason in result.skipped:
+        print(f"跳过: {path} ({reason})")
+    for path, error in result.errors:
+        print(f"失败: {path} ({error})")
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
@@ -1,36 +1,35 @@
-import subprocess
 from datetime import timedelta
 from pathlib import Path
 import os
 
-def get_video_duration(file_path, ffprobe_path):
+from .file_media_probe import DEFAULT_PROBE_CONCURRENCY, DEFAULT_PROBE_TIMEOUT, MediaProbeRunner, ProbeResult
+
+def _duration_or_raise(result: ProbeResult):
+    name = os.path.basename(result.path)
+    if result.error:
+        raise Exception(f"Error running ffprobe for {name}: {result.error}")
+    # ffprobe 以 -v error 运行，只要输出了错误信息就视为失败，即使读到了时长
+    if result.stderr:
+        raise Exception(f"Error running ffprobe for {name}: ffprobe error for {name}: {result.stderr}")
+    return result.duration
+
+def get_video_duration(file_path, ffprobe_path, timeout=DEFAULT_PROBE_TIMEOUT):
     if not os.path.isfile(ffprobe_path):
         raise FileNotFoundError(f"ffprobe.exe not found at the specified path: {ffprobe_path}")
     if not os.path.isfile(file_path):
         raise FileNotFoundError(f"Video file not found: {file_path}")
-
-    try:
-        result = subprocess.run(
-            [ffprobe_path, "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", str(file_path)], 
-            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, creationflags=subprocess.CREATE_NO_WINDOW
-        )
-        if result.stderr:
-            raise Exception(f"ffprobe error for {os.path.basename(file_path)}: {result.stderr.strip()}")
-        duration = float(result.stdout.strip())
-        return duration
-    except ValueError as e:
-        raise ValueError(f"Could not convert duration to float for {os.path.basename(file_path)}: {result.stdout.strip()} ({e})")
-    except Exception as e_run:
-        raise Exception(f"Error running ffprobe for {os.path.basename(file_path)}: {e_run}")
+    return _duration_or_raise(MediaProbeRunner(ffprobe_path, concurrency=1, timeout=timeout).probe(file_path))
 
 def format_duration_to_hhmmss(seconds):
     if seconds < 0:
         seconds = 0
     return str(timedelta(seconds=seconds)).split(".")[0]
 
-def sum_mp4_durations_in_directory(directory_path, ffprobe_path):
+def sum_mp4_durations_in_directory(directory_path, ffprobe_path, concurrency=DEFAULT_PROBE_CONCURRENCY,
+                                   timeout=DEFAULT_PROBE_TIMEOUT):
     """
     计算目录及其子目录中所有 .mp4 文件的总时长。
+    同时运行最多 concurrency 个 ffprobe 进程，超过 timeout 秒未结束的文件计为错误。
     返回: (总时长_秒, 已处理文件数, 日志消息列表, 错误列表)
     """
     total_duration = 0.0
@@ -42,22 +41,27 @@ def sum_mp4_durations_in_directory(directory_path, ffprobe_path):
         log_messages.append(f"Error: Directory '{directory_path}' not found.")
         return total_duration, processed_files_count, log_messages, error_list
     
+    if not os.path.isfile(ffprobe_path):
+        log_messages.append(f"Error: ffprobe.exe not found at the specified path: {ffprobe_path}")
+        return total_duration, processed_files_count, log_messages, error_list
+
     log_messages.append(f"Starting duration scan in '{directory_path}' using ffprobe at '{ffprobe_path}'.")
 
-    for root, _, files in os.walk(directory_path):
-        for file in files:
-            if file.lower().endswith('.mp4'):
-                file_full_path = Path(root) / file
-                try:
-                    duration = get_video_duration(file_full_path, ffprobe_path)
-                    formatted_individual_duration = format_duration_to_hhmmss(duration)
-                    log_messages.append(f"  Processed '{file_full_path.name}': {formatted_individual_duration} ({duration:.2f}s)")
-                    total_duration += duration
-                    processed_files_count += 1
-                except Exception as e:
-                    err_msg = f"  Error processing '{file_full_path.name}': {e}"
-                    log_messages.append(err_msg)
-                    error_list.append(err_msg)
+    mp4_files = [Path(root) / file
+                 for root, _, files in os.walk(directory_path)
+                 for file in files if file.lower().endswith('.mp4')]
+    runner = MediaProbeRunner(ffprobe_path, concurrency=concurrency, timeout=timeout)
+    for file_full_path, result in zip(mp4_files, runner.probe_many(mp4_files)):
+        try:
+            duration = _duration_or_raise(result)
+            formatted_individual_duration = format_duration_to_hhmmss(duration)
+            log_messages.append(f"  Processed '{file_full_path.name}': {formatted_individual_duration} ({duration:.2f}s)")
+            total_duration += duration
+            processed_files_count += 1
+        except Exception as e:
+            err_msg = f"  Error processing '{file_full_path.name}': {e}"
+            log_messages.append(err_msg)
+            error_list.append(err_msg)
     
     formatted_total = format_duration_to_hhmmss(total_duration)
     summary_msg = f"Scan complete. Processed {processed_files_count} MP4 files. Total duration: {formatted_total}. Errors: {len(error_list)}."
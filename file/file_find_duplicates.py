@@ -1,22 +1,23 @@
 import os
-import shutil
-import hashlib
-from PIL import Image
-import imagehash
+import stat
+import threading
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
+from PIL import UnidentifiedImageError
+
+from .file_hashing import (ContentHashEngine, DEFAULT_HASH_WORKERS, DEFAULT_SAMPLE_SIZE_MB, hash_file,
+                           resolve_hash_algorithm, sample_hash_file)
+from .file_image_hashing import perceptual_hash
+from .file_metadata_cache import MetadataCache
+from .file_bulk_move import BulkMover, JOURNAL_FILE_NAME
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def hash_generic_file(filepath):
-    hasher = hashlib.sha256()
+def hash_generic_file(filepath, algorithm=None):
     try:
-        with open(filepath, 'rb') as f:
-            buf = f.read(65536)
-            while len(buf) > 0:
-                hasher.update(buf)
-                buf = f.read(65536)
-        return hasher.hexdigest()
+        return hash_file(filepath, resolve_hash_algorithm(algorithm))
     except FileNotFoundError:
         logging.error(f"File not found during generic hashing: {filepath}")
         return None
@@ -24,60 +25,55 @@ def hash_generic_file(filepath):
         logging.error(f"Could not hash generic file {filepath}: {e}")
         return None
 
-def get_file_hash(filepath):
+IMAGE_EXTENSIONS = ['png', 'jpg', 'jpeg', 'bmp', 'gif', 'tiff']
+VIDEO_EXTENSIONS = ['mp4', 'avi', 'mkv', 'mov', 'wmv', 'flv']
+
+def is_generic_file(filepath):
     ext = filepath.split('.')[-1].lower()
-    if ext in ['png', 'jpg', 'jpeg', 'bmp', 'gif', 'tiff']:
+    return ext not in IMAGE_EXTENSIONS and ext not in VIDEO_EXTENSIONS
+
+def get_file_hash(filepath, algorithm=None):
+    ext = filepath.split('.')[-1].lower()
+    if ext in IMAGE_EXTENSIONS:
         return hash_image(filepath)
-    elif ext in ['mp4', 'avi', 'mkv', 'mov', 'wmv', 'flv']:
-        return hash_video(filepath)
+    elif ext in VIDEO_EXTENSIONS:
+        return hash_video(filepath, algorithm=algorithm)
     else:
-        return hash_generic_file(filepath)
+        return hash_generic_file(filepath, algorithm)
 
 def hash_image(filepath):
     try:
-        with Image.open(filepath) as img:
-            img_hash = imagehash.average_hash(img.convert("L").resize((16, 16), Image.Resampling.LANCZOS))
-        return str(img_hash)
+        return perceptual_hash(filepath, pre_size=16)
     except Exception as e:
         return None
 
-def hash_video(filepath, sample_size_mb=5):
-    hasher = hashlib.sha256()
+def hash_video(filepath, sample_size_mb=DEFAULT_SAMPLE_SIZE_MB, algorithm=None):
+    # 与增强版查找器相同的采样方式（开头、中间、结尾），两者的采样哈希可以共用缓存
     try:
-        with open(filepath, 'rb') as f:
-            file_size = os.path.getsize(filepath)
-            chunk_size = 65536
-            sample_bytes = sample_size_mb * 1024 * 1024
-
-            if file_size <= sample_bytes:
-                buf = f.read(chunk_size)
-                while len(buf) > 0:
-                    hasher.update(buf)
-                    buf = f.read(chunk_size)
-            else:
-                for _ in range(sample_bytes // (3 * chunk_size) if sample_bytes // (3 * chunk_size) > 0 else 1):
-                    buf = f.read(chunk_size)
-                    if not buf: break
-                    hasher.update(buf)
-                
-                f.seek(file_size // 2 - (sample_bytes // (6 * chunk_size) * chunk_size) if file_size // 2 - (sample_bytes // (6 * chunk_size) * chunk_size) > 0 else file_size // 2 )
-                for _ in range(sample_bytes // (3 * chunk_size) if sample_bytes // (3 * chunk_size) > 0 else 1):
-                    buf = f.read(chunk_size)
-                    if not buf: break
-                    hasher.update(buf)
-
-                f.seek(file_size - (sample_bytes // (3 * chunk_size) * chunk_size) if file_size - (sample_bytes // (3 * chunk_size) * chunk_size) > sample_bytes else file_size - sample_bytes)
-                for _ in range(sample_bytes // (3 * chunk_size) if sample_bytes // (3 * chunk_size) > 0 else 1):
-                    buf = f.read(chunk_size)
-                    if not buf: break
-                    hasher.update(buf)
-        return hasher.hexdigest()
-    except FileNotFoundError:
-        return None
+        return sample_hash_file(filepath, resolve_hash_algorithm(algorithm), sample_size_mb)[0]
     except Exception as e:
         return None
 
-def collect_duplicate_files_info(directory_path):
+def _hash_media_file(path, st, algorithm, metadata_cache):
+    # 返回 (哈希, 是否为无法识别的图片格式)；视频的采样哈希读写元数据缓存
+    if path.split('.')[-1].lower() in IMAGE_EXTENSIONS:
+        try:
+            return perceptual_hash(path, pre_size=16), False
+        except UnidentifiedImageError:
+            return None, True
+        except Exception:
+            return None, False
+
+    cache_key = (os.path.abspath(path), st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, algorithm)
+    record = metadata_cache.get(*cache_key) if metadata_cache is not None else None
+    if record and record['sample_hash']:
+        return record['sample_hash'], False
+    file_hash = hash_video(path, algorithm=algorithm)
+    if file_hash and metadata_cache is not None:
+        metadata_cache.put(*cache_key, sample_hash=file_hash)
+    return file_hash, False
+
+def collect_duplicate_files_info(directory_path, hash_algorithm=None, workers=None, metadata_cache=None):
     hashes = defaultdict(list)
     logs = []
     processed_files = 0
@@ -88,27 +84,62 @@ def collect_duplicate_files_info(directory_path):
         logs.append(f"错误: 提供的路径不是一个有效的目录: {directory_path}")
         return {}, logs, processed_files, skipped_unsupported, skipped_hash_errors
 
+    algorithm = resolve_hash_algorithm(hash_algorithm, lambda message, level: logs.append(f"警告: {message}"))
+    workers = max(1, workers or DEFAULT_HASH_WORKERS)
     logs.append(f"开始扫描目录: {directory_path}")
+    logs.append(f"使用哈希算法: {algorithm}")
+    generic_files = []
+    media_files = []
     for root, _, files in os.walk(directory_path):
         for file in files:
             processed_files += 1
             path = os.path.join(root, file)
-            if os.path.isfile(path):
-                file_hash = get_file_hash(path)
-                if file_hash:
-                    hashes[file_hash].append(path)
-                elif file_hash is None and get_file_hash.__doc__.count(path.split('.')[-1].lower()) == 0:
-                    skipped_unsupported +=1
-                    logs.append(f"跳过不支持的文件类型: {path}")
-                else:
-                    skipped_hash_errors +=1
-                    logs.append(f"警告: 无法计算哈希值 {path}")
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                continue
+            if is_generic_file(path):
+                # 普通文件交给共享的哈希引擎：按大小分桶，再做首尾块/完整内容的分级哈希
+                generic_files.append((path, st.st_size, st.st_dev, st.st_ino, st.st_mtime_ns))
+            else:
+                media_files.append((path, st))
+
+    # 图片和视频的哈希互相独立，在线程池中并行计算，按遍历顺序汇总
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        media_hashes = executor.map(lambda item: _hash_media_file(item[0], item[1], algorithm, metadata_cache),
+                                    media_files)
+        for (path, _), (file_hash, unsupported) in zip(media_files, media_hashes):
+            if file_hash:
+                hashes[file_hash].append(path)
+            elif unsupported:
+                skipped_unsupported += 1
+                logs.append(f"跳过不支持的文件类型: {path}")
+            else:
+                skipped_hash_errors += 1
+                logs.append(f"警告: 无法计算哈希值 {path}")
+
+    # 哈希引擎在工作线程中回调
+    error_lock = threading.Lock()
+
+    def _log_hash_error(message, level="INFO"):
+        nonlocal skipped_hash_errors
+        if level == "ERROR":
+            with error_lock:
+                skipped_hash_errors += 1
+                logs.append(f"警告: {message}")
+
+    engine = ContentHashEngine(algorithm=algorithm, workers=workers, metadata_cache=metadata_cache,
+                               log_callback=_log_hash_error)
+    for path, file_hash in engine.hash_files(generic_files).items():
+        hashes[file_hash].append(path)
 
     duplicate_groups = {hash_val: paths for hash_val, paths in hashes.items() if len(paths) > 1}
     
     return duplicate_groups, logs, processed_files, skipped_unsupported, skipped_hash_errors
 
-def move_files_to_duplicate_folder(duplicate_groups, base_folder_for_duplicates_dir):
+def move_files_to_duplicate_folder(duplicate_groups, base_folder_for_duplicates_dir, stop_event=None):
     logs = []
     moved_files_count = 0
     if not duplicate_groups:
@@ -128,43 +159,38 @@ def move_files_to_duplicate_folder(duplicate_groups, base_folder_for_duplicates_
         else:
             logs.append(f"主重复文件夹已存在: {duplicates_main_folder}")
 
+        mover = BulkMover(os.path.join(duplicates_main_folder, JOURNAL_FILE_NAME),
+                          log_callback=lambda msg, lvl: lvl != "DEBUG" and logs.append(msg),
+                          stop_event=stop_event)
+        if mover.has_pending():
+            # 上次移动被中断，先按日志完成剩余部分
+            moved_files_count += len(mover.resume().moved)
+
+        moves = []
         for file_hash, paths in duplicate_groups.items():
             if len(paths) > 1:
                 group_folder_name = file_hash[:12].replace("/", "_").replace("\\", "_")
                 group_folder_path = os.path.join(duplicates_main_folder, group_folder_name)
-                
-                if not os.path.exists(group_folder_path):
-                    os.makedirs(group_folder_path)
-                    logs.append(f"  为哈希 {file_hash[:12]} 创建子文件夹: {group_folder_path}")
-
-                for path in paths:
-                    if os.path.exists(path):
-                        try:
-                            destination_filename = os.path.basename(path)
-                            destination_path = os.path.join(group_folder_path, destination_filename)
-                            
-                            counter = 1
-                            original_destination_path = destination_path
-                            while os.path.exists(destination_path):
-                                name, ext = os.path.splitext(destination_filename)
-                                destination_path = os.path.join(group_folder_path, f"{name}_{counter}{ext}")
-                                counter += 1
-                            if original_destination_path != destination_path:
-                                logs.append(f"    注意: 目标文件名冲突，'{os.path.basename(original_destination_path)}' 将作为 '{os.path.basename(destination_path)}' 保存。")
-
-                            shutil.move(path, destination_path)
-                            logs.append(f"    已移动: '{path}' 到 '{destination_path}'")
-                            moved_files_count += 1
-                        except Exception as e_move:
-                            logs.append(f"    错误: 移动文件 '{path}' 失败: {e_move}")
-                    else:
-                        logs.append(f"    警告: 文件 '{path}' 在尝试移动前未找到。可能已被删除或移动。")
+                moves.extend((path, group_folder_path) for path in paths)
+
+        result = mover.move(moves)
+        for task in result.moved:
+            if os.path.basename(task.destination) != os.path.basename(task.source):
+                logs.append(f"    注意: 目标文件名冲突，'{os.path.basename(task.source)}' 将作为 '{os.path.basename(task.destination)}' 保存。")
+            logs.append(f"    已移动: '{task.source}' 到 '{task.destination}'")
+        for path, reason in result.skipped:
+            logs.append(f"    警告: 文件 '{path}' 在尝试移动前未找到。可能已被删除或移动。({reason})")
+        for path, error in result.errors:
+            logs.append(f"    错误: 移动文件 '{path}' 失败: {error}")
+        moved_files_count += len(result.moved)
         
         if moved_files_count > 0:
             logs.append(f"文件移动完成。共移动 {moved_files_count} 个文件。")
         else:
             logs.append("没有文件被移动（可能所有文件都无法访问或移动过程中出错）。")
 
+    except InterruptedError:
+        logs.append(f"移动已中止，已移动 {moved_files_count} 个文件；再次执行时会按移动日志继续。")
     except Exception as e_main:
         logs.append(f"创建重复文件夹或移动文件时发生严重错误: {e_main}")
         
@@ -180,15 +206,26 @@ def find_duplicates_and_move(folders_to_scan, move_them=False):
 
     primary_scan_folder = folders_to_scan[0]
 
-    for folder_path in folders_to_scan:
-        all_logs.append(f"--- 开始处理文件夹: {folder_path} ---")
-        duplicate_groups, logs, _, _, _ = collect_duplicate_files_info(folder_path)
-        all_logs.extend(logs)
-        
-        for hash_val, paths in duplicate_groups.items():
-            if hash_val not in all_duplicate_groups:
-                all_duplicate_groups[hash_val] = []
-            all_duplicate_groups[hash_val].extend(paths)
+    # 与高级查找工具共用元数据缓存，未变化的文件不再读取内容
+    try:
+        metadata_cache = MetadataCache()
+    except Exception as e:
+        metadata_cache = None
+        all_logs.append(f"警告: 无法打开元数据缓存，将完整扫描: {e}")
+
+    try:
+        for folder_path in folders_to_scan:
+            all_logs.append(f"--- 开始处理文件夹: {folder_path} ---")
+            duplicate_groups, logs, _, _, _ = collect_duplicate_files_info(folder_path, metadata_cache=metadata_cache)
+            all_logs.extend(logs)
+
+            for hash_val, paths in duplicate_groups.items():
+                if hash_val not in all_duplicate_groups:
+                    all_duplicate_groups[hash_val] = []
+                all_duplicate_groups[hash_val].extend(paths)
+    finally:
+        if metadata_cache is not None:
+            metadata_cache.close()
 
     final_duplicate_groups = {
         hash_val: list(set(paths)) for hash_val, paths in all_duplicate_groups.items() if len(list(set(paths))) > 1
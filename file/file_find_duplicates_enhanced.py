@@ -1,21 +1,56 @@
 import os
+import time
 import shutil
 import hashlib
-import subprocess
 from pathlib import Path
-from PIL import Image
-import imagehash
-from collections import defaultdict
+from collections import defaultdict, deque
+from itertools import chain, islice
 import logging
-import re
-from difflib import SequenceMatcher
 from enum import Enum
-from dataclasses import dataclass
-from typing import Dict, List, Tuple, Optional, Set
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional, Set, Union
 import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+
+from .folder_size_report import human_readable_size
+from .file_hashing import (ContentHashEngine, DEFAULT_READ_BLOCK_SIZE, hash_file_range, new_hasher,
+                           resolve_hash_algorithm, sample_hash_file)
+from .file_image_hashing import perceptual_hash
+from .file_media_probe import DEFAULT_PROBE_CONCURRENCY, DEFAULT_PROBE_TIMEOUT, MediaProbeRunner, ProbeResult
+from .file_metadata_cache import MetadataCache
+from .file_metadata_store import FileMetadata, FileMetadataStore
+from .file_scan_checkpoint import ScanCheckpoint
+from .file_scan_stats import ScanStats
+from .file_similarity import (PERCEPTUAL_HASH_MAX_DISTANCE, FileFeatures, filename_similarity,
+                              has_copy_pattern, init_scoring_worker, normalize_filename, score_features,
+                              score_pairs, score_pairs_in_worker)
+from .file_similarity_index import BlockingIndex, MinHashLSHIndex, iter_similar_hash_pairs
+from .file_union_find import ReasonFlags, UnionFind
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# 候选对的分块键，按产生顺序排列；phash 为感知哈希近邻（BK 树），不是精确分块
+BLOCKING_KEYS = ('size', 'sample_hash', 'duration', 'name', 'phash')
+# 各分块键的分块大小上限：相机编号的文件名（IMG_0001 ... IMG_9999）标准化后全部相同，
+# 超过上限的文件名分块不产生候选对，其中的图片只通过大小和感知哈希近邻比较。大小分块不设上限，
+# 否则同样大小的完全重复文件可能漏掉
+MAX_BLOCK_SIZES = {'name': 1000}
+# 时长分块宽度（秒），相邻分块之间也会组成候选对，覆盖评分中 5 秒以内的时长差
+DURATION_BLOCK_SECONDS = 5.0
+
+# 每批提取元数据的候选文件数，提取结果写入按列存储后即释放视图对象
+EXTRACT_BATCH_SIZE = 8192
+
+# 比较阶段每批评分的候选对数；批结束时输出变化的组并保存断点，并行评分时每批是一个进程池任务
+SCORE_CHUNK_SIZE = 4096
+
+# 并行提取时等待单个任务结果期间检查停止信号的间隔（秒）
+STOP_POLL_INTERVAL = 0.2
+
+# 超过该大小的图片只用感知哈希，不计算内容哈希
+MAX_IMAGE_CONTENT_HASH_SIZE = 10 * 1024 * 1024
+
 class DuplicateLevel(Enum):
     """重复程度等级"""
     CERTAIN = "确定重复"
@@ -23,16 +58,24 @@ class DuplicateLevel(Enum):
     MODERATELY_SUSPECTED = "中度疑似"
     LOWLY_SUSPECTED = "低度疑似"
 
-@dataclass
-class FileMetadata:
-    """文件元数据"""
-    path: str
-    size: int
-    duration: Optional[float] = None  # 视频时长（秒）
-    content_hash: Optional[str] = None  # 内容哈希
-    sample_hash: Optional[str] = None  # 采样哈希（用于视频）
-    perceptual_hash: Optional[str] = None  # 感知哈希（用于图片）
-    filename_normalized: Optional[str] = None  # 标准化文件名
+def compute_perceptual_hash(filepath: str) -> str:
+    """计算图片感知哈希（模块级函数，可在子进程中执行），失败时抛出异常"""
+    # 先缩放到 32x32 再计算，JPEG 使用 EXIF 缩略图或按比例解码
+    return perceptual_hash(filepath, pre_size=32)
+
+def _perceptual_hash_worker(filepath: str) -> Tuple[Optional[str], Optional[str]]:
+    """进程池任务：返回 (感知哈希, 错误信息)，异常信息交给主进程记录日志"""
+    try:
+        return compute_perceptual_hash(filepath), None
+    except Exception as e:
+        return None, str(e)
+
+def _is_subpath(path: str, parent: str) -> bool:
+    """path 是否位于 parent 目录之内（两者都应是规范化后的绝对路径）"""
+    try:
+        return os.path.commonpath([path, parent]) == parent
+    except ValueError:  # Windows 上位于不同驱动器
+        return False
 
 @dataclass
 class DuplicateGroup:
@@ -41,18 +84,135 @@ class DuplicateGroup:
     score: float
     files: List[FileMetadata]
     reasons: List[str]  # 判定为重复的原因
+    # 组内文件指向同一 inode 的其他路径（文件路径 -> 其他硬链接路径），它们不占用额外空间
+    hardlinks: Dict[str, List[str]] = field(default_factory=dict)
+
+    @property
+    def reclaimable_size(self) -> int:
+        """保留组内最大的文件、删除其余文件（连同各自的硬链接）可释放的空间，每个 inode 只计一次"""
+        sizes = [f.size for f in self.files]
+        return sum(sizes) - max(sizes) if sizes else 0
+
+@dataclass
+class DuplicateGroupUpdate:
+    """流式扫描产生的分组事件
+
+    同一个 group_id 再次出现表示该组有新成员或评分、原因发生变化，应整体替换之前收到的内容；
+    merged_ids 中的组已经并入本组，应当删除。
+    """
+    group_id: int
+    group: DuplicateGroup
+    merged_ids: List[int] = field(default_factory=list)
+
+class _GroupTracker:
+    """增量合并重复文件对，记录自上次输出以来发生变化的组
+
+    文件对逐个登记（流式），不需要先收集全部文件对：并查集 (UnionFind) 只保存每个文件的父节点和秩，
+    每组只保存成员、最高分和原因位标记 (ReasonFlags)，内存与文件对的数量无关。
+    """
+
+    def __init__(self):
+        self.sets = UnionFind()
+        self.reason_flags = ReasonFlags()
+        self.scores: Dict[int, Tuple[float, int]] = {}  # 根 -> (组内最高分, 原因位标记)
+        self.members: Dict[int, List[int]] = {}  # 根 -> 组内元素
+        self.smallest: Dict[int, int] = {}  # 根 -> 组内最小元素，输出时按它排序
+        self.group_ids: Dict[int, int] = {}  # 根 -> 已输出的组编号
+        self.merged_ids: Dict[int, List[int]] = defaultdict(list)  # 根 -> 并入本组、尚未通知的旧组编号
+        self.dirty: Set[int] = set()
+        self._next_id = 1
+
+    def find(self, item: int) -> int:
+        return self.sets.find(item)
+
+    def add_pair(self, item1: int, item2: int, score: float, reasons: List[str]):
+        """登记一对重复文件，分数取组内最高分，原因取并集，结果与登记顺序无关"""
+        reason_mask = self.reason_flags.encode(reasons)
+        root1, root2 = self.sets.union(item1, item2)
+        if root1 != root2:
+            # root2 已并入 root1
+            score1, mask1 = self.scores.pop(root1, (0.0, 0))
+            score2, mask2 = self.scores.pop(root2, (0.0, 0))
+            self.scores[root1] = (max(score1, score2, score), mask1 | mask2 | reason_mask)
+            members = self.members.pop(root1, [root1])
+            others = self.members.pop(root2, [root2])
+            if len(members) < len(others):
+                members, others = others, members
+            members.extend(others)  # 把较小的组追加到较大的组，合并的总代价为 O(n log n)
+            self.members[root1] = members
+            self.smallest[root1] = min(self.smallest.pop(root1, root1), self.smallest.pop(root2, root2))
+
+            id1, id2 = self.group_ids.pop(root1, None), self.group_ids.pop(root2, None)
+            merged = self.merged_ids.pop(root2, [])
+            if id1 is not None and id2 is not None:
+                merged.append(max(id1, id2))
+            if id1 is not None or id2 is not None:
+                self.group_ids[root1] = min(i for i in (id1, id2) if i is not None)
+            if merged:
+                self.merged_ids[root1].extend(merged)
+            self.dirty.discard(root2)
+            self.dirty.add(root1)
+        else:
+            old_score, old_mask = self.scores[root1]
+            if score > old_score or reason_mask & ~old_mask:
+                self.scores[root1] = (max(old_score, score), old_mask | reason_mask)
+                self.dirty.add(root1)
+
+    def mark_all_dirty(self):
+        """把所有组标记为已变化（从断点恢复后重新输出全部组），未通知的合并记录不再需要"""
+        self.dirty = set(self.members)
+        self.merged_ids.clear()
+
+    def take_dirty(self) -> List[Tuple[int, int, List[int], float, List[str], List[int]]]:
+        """取出发生变化的组: [(组编号, 根, 元素, 分数, 原因, 已并入的旧组编号), ...]，按最小元素排序"""
+        changed = []
+        for root in sorted(self.dirty, key=self.smallest.__getitem__):
+            group_id = self.group_ids.get(root)
+            if group_id is None:
+                group_id = self.group_ids[root] = self._next_id
+                self._next_id += 1
+            score, reason_mask = self.scores[root]
+            changed.append((group_id, root, self.members[root], score, self.reason_flags.decode(reason_mask),
+                            self.merged_ids.pop(root, [])))
+        self.dirty.clear()
+        return changed
 
 class EnhancedDuplicateFinder:
     """增强版重复文件查找器"""
     
     def __init__(self, ffprobe_path: str = None, 
                  log_callback: Optional[callable] = None, 
-                 stop_event: Optional[threading.Event] = None):
+                 stop_event: Optional[threading.Event] = None,
+                 metadata_cache: Optional[MetadataCache] = None,
+                 workers: int = 1,
+                 cross_size_matching: bool = False,
+                 hash_algorithm: Optional[str] = None,
+                 checkpoint: Optional[ScanCheckpoint] = None,
+                 fuzzy_name_matching: bool = False,
+                 probe_concurrency: int = DEFAULT_PROBE_CONCURRENCY,
+                 probe_timeout: Optional[float] = DEFAULT_PROBE_TIMEOUT):
         self.ffprobe_path = ffprobe_path or self._find_ffprobe()
         self.video_extensions = {'.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.m4v', '.3gp', '.webm'}
         self.image_extensions = {'.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tiff', '.webp'}
         self.log_callback = log_callback
         self.stop_event = stop_event or threading.Event()
+        # 内容/采样哈希算法，默认 "auto"：优先使用已安装的 blake3/xxhash，否则使用标准库 blake2b
+        self.hash_algorithm = resolve_hash_algorithm(hash_algorithm, log_callback)
+        self.read_block_size = DEFAULT_READ_BLOCK_SIZE  # 哈希读取块大小 (1-8 MB)
+        self.metadata_cache = metadata_cache  # 可选的持久化元数据缓存
+        self.checkpoint = checkpoint  # 可选的扫描断点，用于中止后继续扫描
+        # 并行工作数：哈希和 ffprobe 等待使用线程，图片解码使用进程；为 1 时完全串行
+        self.workers = max(1, int(workers or 1))
+        # ffprobe 并发进程数和单个进程的超时时间（秒）；视频时长在每批提取前一次性并发读取
+        self.probe_concurrency = max(1, int(probe_concurrency or 1))
+        self.probe_timeout = probe_timeout
+        # 跨大小匹配：大小唯一的视频也提取时长，并按时长/文件名分块，用于查找重新编码或改名的副本
+        self.cross_size_matching = cross_size_matching
+        # 相似文件名匹配：所有文件都参与比较，并用文件名 MinHash LSH 索引找出名字相似（不必相同）的候选对
+        self.fuzzy_name_matching = fuzzy_name_matching
+        self.blocking_keys = BLOCKING_KEYS
+        self.stats = ScanStats()  # 各阶段耗时、读取字节数和进度，扫描过程中可从其他线程读取
+        self._reset_scan_stats()
         
         # 评分权重
         self.weights = {
@@ -107,81 +267,58 @@ class EnhancedDuplicateFinder:
                 return path
         return None
 
+    def _probe_runner(self) -> MediaProbeRunner:
+        return MediaProbeRunner(self.ffprobe_path, concurrency=self.probe_concurrency, timeout=self.probe_timeout,
+                                stop_check=self._check_stop_event)
+
+    def _record_probe(self, result: ProbeResult) -> Optional[float]:
+        """记录一次 ffprobe 的耗时，失败（包括超时）时记录日志，返回时长"""
+        self.stats.record_ffprobe(result.seconds, timed_out=result.timed_out)
+        if result.error:
+            self._log(f"无法获取视频时长 {result.path}: {result.error}", "WARNING")
+        return result.duration
+
     def get_video_duration(self, file_path: str) -> Optional[float]:
         """获取视频时长"""
         if not self.ffprobe_path:
             self._log(f"ffprobe路径未设置，无法获取视频时长: {file_path}", "WARNING")
             return None
-            
-        try:
-            result = subprocess.run(
-                [self.ffprobe_path, "-v", "error", "-show_entries", 
-                 "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", str(file_path)],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                return float(result.stdout.strip())
-        except Exception as e:
-            self._log(f"无法获取视频时长 {file_path}: {e}", "WARNING")
-        return None
+        return self._record_probe(self._probe_runner().probe(file_path))
+
+    def get_video_durations(self, file_paths: List[str]) -> List[Optional[float]]:
+        """并发获取多个视频的时长（同时最多 probe_concurrency 个 ffprobe 进程），按输入顺序返回"""
+        if not self.ffprobe_path:
+            for file_path in file_paths:
+                self._log(f"ffprobe路径未设置，无法获取视频时长: {file_path}", "WARNING")
+            return [None] * len(file_paths)
+        return [self._record_probe(result) for result in self._probe_runner().probe_many(file_paths)]
 
     def calculate_content_hash(self, filepath: str) -> Optional[str]:
         """计算文件完整内容哈希"""
-        hasher = hashlib.sha256()
         try:
-            with open(filepath, 'rb') as f:
-                while chunk := f.read(65536):
-                    self._check_stop_event()
-                    hasher.update(chunk)
-            return hasher.hexdigest()
+            with self.stats.timed('hash'):
+                hasher = new_hasher(self.hash_algorithm)
+                with open(filepath, 'rb', buffering=0) as f:
+                    self.stats.add_bytes_read(hash_file_range(hasher, f, block_size=self.read_block_size,
+                                                              stop_check=self._check_stop_event))
+                return hasher.hexdigest()
+        except InterruptedError:
+            raise
         except Exception as e:
             self._log(f"计算内容哈希失败 {filepath}: {e}", "ERROR")
             return None
 
     def calculate_sample_hash(self, filepath: str, sample_size_mb: int = 5) -> Optional[str]:
         """计算视频采样哈希"""
-        hasher = hashlib.sha256()
         try:
-            file_size = os.path.getsize(filepath)
-            sample_bytes = sample_size_mb * 1024 * 1024
-            chunk_size = 65536
-
-            with open(filepath, 'rb') as f:
-                if file_size <= sample_bytes:
-                    # 小文件，读取全部
-                    while chunk := f.read(chunk_size):
-                        self._check_stop_event()
-                        hasher.update(chunk)
-                else:
-                    # 大文件，采样读取：开头、中间、结尾
-                    # 开头
-                    for _ in range(sample_bytes // (3 * chunk_size)):
-                        self._check_stop_event()
-                        chunk = f.read(chunk_size)
-                        if not chunk:
-                            break
-                        hasher.update(chunk)
-                    
-                    # 中间
-                    f.seek(file_size // 2 - (sample_bytes // 6))
-                    for _ in range(sample_bytes // (3 * chunk_size)):
-                        self._check_stop_event()
-                        chunk = f.read(chunk_size)
-                        if not chunk:
-                            break
-                        hasher.update(chunk)
-                    
-                    # 结尾
-                    f.seek(max(0, file_size - (sample_bytes // 3)))
-                    for _ in range(sample_bytes // (3 * chunk_size)):
-                        self._check_stop_event()
-                        chunk = f.read(chunk_size)
-                        if not chunk:
-                            break
-                        hasher.update(chunk)
-            
-            return hasher.hexdigest()
+            with self.stats.timed('hash'):
+                digest, bytes_read = sample_hash_file(filepath, self.hash_algorithm, sample_size_mb,
+                                                      block_size=self.read_block_size,
+                                                      stop_check=self._check_stop_event)
+            self.stats.add_bytes_read(bytes_read)
+            return digest
+        except InterruptedError:
+            raise
         except Exception as e:
             self._log(f"计算采样哈希失败 {filepath}: {e}", "ERROR")
             return None
@@ -189,90 +326,60 @@ class EnhancedDuplicateFinder:
     def calculate_perceptual_hash(self, filepath: str) -> Optional[str]:
         """计算图片感知哈希"""
         try:
-            with Image.open(filepath) as img:
-                # 使用更高精度的感知哈希
-                img_hash = imagehash.average_hash(
-                    img.convert("L").resize((32, 32), Image.Resampling.LANCZOS)
-                )
-                return str(img_hash)
+            with self.stats.timed('phash'):
+                return compute_perceptual_hash(filepath)
         except Exception as e:
             self._log(f"计算感知哈希失败 {filepath}: {e}", "WARNING")
             return None
 
     def normalize_filename(self, filepath: str) -> str:
         """标准化文件名，移除常见的重复标记"""
-        filename = Path(filepath).stem.lower()
-        
-        # 移除常见的重复模式
-        patterns = [
-            r'[\s_-]*copy[\s_-]*\d*$',
-            r'[\s_-]*副本[\s_-]*\d*$',
-            r'[\s_-]*\(\d+\)$',
-            r'[\s_-]*\[\d+\]$',
-            r'[\s_-]*_\d+$',
-            r'[\s_-]*-\d+$',
-        ]
-        
-        for pattern in patterns:
-            filename = re.sub(pattern, '', filename, flags=re.IGNORECASE)
-        
-        # 移除多余的空格和特殊字符
-        filename = re.sub(r'[\s_-]+', '_', filename).strip('_')
-        
-        return filename
+        return normalize_filename(filepath)
 
     def calculate_filename_similarity(self, name1: str, name2: str) -> float:
         """计算文件名相似度"""
-        norm1 = self.normalize_filename(name1)
-        norm2 = self.normalize_filename(name2)
-        
-        # 标准化后完全相同
-        if norm1 == norm2:
-            return 1.0
-        
-        # 计算字符串相似度
-        similarity = SequenceMatcher(None, norm1, norm2).ratio()
-        return similarity
+        return filename_similarity(normalize_filename(name1), normalize_filename(name2))
 
     def has_copy_pattern(self, filepath: str) -> bool:
         """检查文件名是否包含复制模式"""
-        filename = Path(filepath).stem.lower()
-        patterns = [
-            r'copy\d*$', r'副本\d*$', r'\(\d+\)$', r'\[\d+\]$',
-            r'_\d+$', r'-\d+$', r'_copy$', r'-copy$'
-        ]
-        
-        for pattern in patterns:
-            if re.search(pattern, filename):
-                return True
-        return False
+        return has_copy_pattern(filepath)
+
+    def extract_file_metadata(self, filepath: str, file_size: Optional[int] = None,
+                              with_content_hash: bool = True, probe_duration: bool = True) -> FileMetadata:
+        """提取文件元数据
 
-    def extract_file_metadata(self, filepath: str) -> FileMetadata:
-        """提取文件元数据"""
+        Args:
+            file_size: 遍历阶段已取得的文件大小，提供时不再重复 stat
+            with_content_hash: 为 False 时跳过完整内容哈希（大小唯一的图片用不到它）
+            probe_duration: 为 False 时不读取视频时长（批量提取时已由 get_video_durations 并发读取）
+        """
         self._log(f"提取元数据: {filepath}", "DEBUG")
         try:
-            file_size = os.path.getsize(filepath)
+            if file_size is None:
+                file_size = os.path.getsize(filepath)
             ext = Path(filepath).suffix.lower()
             
             metadata = FileMetadata(
                 path=filepath,
                 size=file_size,
-                filename_normalized=self.normalize_filename(filepath)
+                filename_normalized=self.normalize_filename(filepath),
+                hash_algorithm=self.hash_algorithm
             )
             
             if ext in self.video_extensions:
                 # 视频文件
-                metadata.duration = self.get_video_duration(filepath)
+                if probe_duration:
+                    metadata.duration = self.get_video_duration(filepath)
                 metadata.sample_hash = self.calculate_sample_hash(filepath)
                 
             elif ext in self.image_extensions:
                 # 图片文件
                 metadata.perceptual_hash = self.calculate_perceptual_hash(filepath)
                 # 小图片文件也计算完整哈希
-                if file_size < 10 * 1024 * 1024:  # 小于10MB
+                if with_content_hash and file_size < MAX_IMAGE_CONTENT_HASH_SIZE:  # 小于10MB
                     metadata.content_hash = self.calculate_content_hash(filepath)
                     
-            else:
+            elif with_content_hash:
                 # 其他文件
                 metadata.content_hash = self.calculate_content_hash(filepath)
             
@@ -283,68 +390,11 @@ class EnhancedDuplicateFinder:
             return FileMetadata(path=filepath, size=0)
 
     def calculate_similarity_score(self, file1: FileMetadata, file2: FileMetadata) -> Tuple[float, List[str]]:
-        """计算两个文件的相似度分数"""
-        score = 0.0
-        reasons = []
-        
-        # 内容哈希匹配（最高优先级）
-        if file1.content_hash and file2.content_hash and file1.content_hash == file2.content_hash:
-            score += self.weights['content_hash_match']
-            reasons.append("内容哈希完全相同")
-            return score, reasons  # 内容哈希相同就是确定重复
-        
-        # 采样哈希匹配（视频）
-        if file1.sample_hash and file2.sample_hash and file1.sample_hash == file2.sample_hash:
-            score += self.weights['sample_hash_match']
-            reasons.append("视频采样哈希相同")
-        
-        # 感知哈希匹配（图片）
-        if file1.perceptual_hash and file2.perceptual_hash:
-            # 计算汉明距离
-            try:
-                hash1 = imagehash.hex_to_hash(file1.perceptual_hash)
-                hash2 = imagehash.hex_to_hash(file2.perceptual_hash)
-                hamming_distance = hash1 - hash2
-                
-                if hamming_distance <= 2:  # 非常相似
-                    score += self.weights['perceptual_hash_match']
-                    reasons.append(f"图片感知哈希相似(距离:{hamming_distance})")
-                elif hamming_distance <= 5:  # 比较相似
-                    score += self.weights['perceptual_hash_match'] * 0.7
-                    reasons.append(f"图片感知哈希较相似(距离:{hamming_distance})")
-            except:
-                pass
-        
-        # 文件大小匹配
-        if file1.size == file2.size and file1.size > 0:
-            score += self.weights['size_match']
-            reasons.append("文件大小相同")
-        
-        # 视频时长匹配
-        if file1.duration and file2.duration:
-            duration_diff = abs(file1.duration - file2.duration)
-            if duration_diff <= 2.0:  # 2秒误差内
-                score += self.weights['duration_match']
-                reasons.append(f"视频时长相近(差异:{duration_diff:.1f}秒)")
-            elif duration_diff <= 5.0:  # 5秒误差内
-                score += self.weights['duration_match'] * 0.7
-                reasons.append(f"视频时长较接近(差异:{duration_diff:.1f}秒)")
-        
-        # 文件名相似度
-        filename_similarity = self.calculate_filename_similarity(file1.path, file2.path)
-        if filename_similarity >= 0.9:
-            score += self.weights['filename_high_similarity']
-            reasons.append(f"文件名高度相似({filename_similarity:.2f})")
-        elif filename_similarity >= 0.7:
-            score += self.weights['filename_moderate_similarity']
-            reasons.append(f"文件名中度相似({filename_similarity:.2f})")
-        
-        # 复制模式检测
-        if self.has_copy_pattern(file1.path) or self.has_copy_pattern(file2.path):
-            score += self.weights['filename_copy_pattern']
-            reasons.append("文件名包含复制标记")
-        
-        return score, reasons
+        """计算两个文件的相似度分数
+
+        批量比较时应先为每个文件构造一次 FileFeatures，再直接调用 score_features。
+        """
+        return score_features(FileFeatures.from_metadata(file1), FileFeatures.from_metadata(file2), self.weights)
 
     def determine_duplicate_level(self, score: float) -> Optional[DuplicateLevel]:
         """根据分数确定重复等级"""
@@ -366,180 +416,780 @@ class EnhancedDuplicateFinder:
         # 只保留有多个文件的组
         return {k: v for k, v in groups.items() if len(v) > 1}
 
-    def find_duplicates_in_directory(self, directory_path: str) -> Dict[DuplicateLevel, List[DuplicateGroup]]:
-        """在指定目录中查找重复文件 (核心逻辑)"""
-        self._log(f"开始扫描目录: {directory_path}", "INFO")
-        all_files_metadata: List[FileMetadata] = []
-        
+    def _reset_scan_stats(self):
+        """重置单次扫描的统计信息"""
+        self.stats.reset()
+        self.scan_stats = {
+            'files_walked': 0,
+            'walk_errors': 0,  # 遍历时无法读取文件信息的文件数
+            'bytes_walked': 0,
+            'files_extracted': 0,
+            'bytes_avoided': defaultdict(int),  # 各阶段避免读取的字节数
+            'cache_hits': 0,
+            'cache_misses': 0,
+            'candidate_pairs': 0,  # 分块索引产生的候选对数
+            'oversized_blocks': 0,  # 超过大小上限、未产生候选对的分块数
+            'hardlink_paths': 0,  # 与已遍历文件指向同一 inode、不再单独处理的路径数
+            'hash_algorithm': self.hash_algorithm,
+        }
+        self._cached_hashes: Dict[str, Tuple[Optional[str], Optional[str]]] = {}  # 路径 -> (部分哈希, 完整哈希)
+        self.hardlink_sets: List[List[str]] = []  # 指向同一 inode 的路径集合，第一个路径代表该 inode 参与查找
+
+    def _record_bytes_avoided(self, stage: str, num_bytes: int):
+        """记录某一阶段避免读取的字节数"""
+        if num_bytes > 0:
+            self.scan_stats['bytes_avoided'][stage] += num_bytes
+
+    def _deduplicate_roots(self, roots: Iterable[str]) -> List[str]:
+        """去掉重复的扫描目录以及位于其他扫描目录之内的目录，避免同一文件被遍历两次
+
+        按真实路径（解析符号链接、统一大小写）判断包含关系，返回的仍是调用方给出的路径，保持原有顺序。
+        """
+        resolved = []
+        for root in roots:
+            real = os.path.normcase(os.path.realpath(root))
+            resolved.append((root, real))
+
+        unique_roots = []
+        seen = set()
+        for root, real in resolved:
+            if real in seen:
+                self._log(f"扫描目录重复，已忽略: {root}", "WARNING")
+                continue
+            seen.add(real)
+            parent = next((other for other, other_real in resolved
+                           if other_real != real and _is_subpath(real, other_real)), None)
+            if parent is not None:
+                self._log(f"扫描目录 {root} 位于 {parent} 之内，不再单独扫描。", "WARNING")
+                continue
+            unique_roots.append(root)
+        return unique_roots
+
+    def _walk_files(self, directory_path: str, entries: Optional[FileMetadataStore] = None,
+                    walked_dirs: Optional[Set[str]] = None, on_directory: Optional[callable] = None) -> FileMetadataStore:
+        """阶段一：只做 stat 的目录遍历，不读取任何文件内容，结果按列存储
+
+        Args:
+            entries: 追加到已有的存储中（扫描多个目录时），为 None 时新建
+            walked_dirs: 已经遍历过的目录（从断点恢复时），其中的文件已在 entries 中，不再 stat；
+                每遍历完一个目录就加入该集合
+            on_directory: 每遍历完一个目录后调用（用于保存断点）
+        """
+        if entries is None:
+            entries = FileMetadataStore(self.hash_algorithm)
+        if walked_dirs is None:
+            walked_dirs = set()
+        walk_start = time.perf_counter()
+        stat_seconds = 0.0
         for root, _, files in os.walk(directory_path):
             self._check_stop_event()
+            if root in walked_dirs:
+                continue
+            stat_start = time.perf_counter()
             for file in files:
-                self._check_stop_event()
                 filepath = os.path.join(root, file)
                 try:
-                    metadata = self.extract_file_metadata(filepath)
-                    if metadata:
-                        all_files_metadata.append(metadata)
-                except Exception as e:
-                    self._log(f"提取元数据失败 {filepath}: {e}", "ERROR")
-
-        self._log(f"共收集到 {len(all_files_metadata)} 个文件的元数据。", "INFO")
-        if not all_files_metadata:
-            return {}
-
-        # 预筛选和分组 (示例：按大小)
-        # self._log("按文件大小进行初步分组...", "DEBUG")
-        # files_by_size = defaultdict(list)
-        # for meta in all_files_metadata:
-        #     files_by_size[meta.size].append(meta)
-        
-        # potential_groups_after_size_filter = {k: v for k, v in files_by_size.items() if len(v) > 1}
-        # self._log(f"按大小筛选后，剩下 {len(potential_groups_after_size_filter)} 组，共 {sum(len(v) for v in potential_groups_after_size_filter.values())} 个文件需要进一步比较。", "DEBUG")
+                    st = os.stat(filepath)
+                except OSError as e:
+                    self._log(f"读取文件信息失败 {filepath}: {e}", "ERROR")
+                    self.scan_stats['walk_errors'] += 1
+                    continue
+                entries.append(filepath, st.st_size, st.st_dev, st.st_ino, st.st_mtime_ns)
+                self.scan_stats['bytes_walked'] += st.st_size
+            stat_seconds += time.perf_counter() - stat_start
+            walked_dirs.add(root)
+            self.scan_stats['files_walked'] = len(entries)
+            self.stats.set_files_walked(len(entries))
+            if on_directory:
+                on_directory()
+        self.scan_stats['files_walked'] = len(entries)
+        self.stats.set_files_walked(len(entries))
+        # 列目录的耗时 = 遍历总耗时 - 逐个 stat 的耗时
+        self.stats.add_time('stat', stat_seconds)
+        self.stats.add_time('walk', time.perf_counter() - walk_start - stat_seconds)
+        return entries
 
-        # 替换为更全面的预分组策略
-        # grouped_by_characteristics = self.group_files_by_characteristics(all_files_metadata)
-        # self._log(f"按特征（大小、短哈希等）分组后，有 {len(grouped_by_characteristics)} 个潜在重复特征组。", "DEBUG")
+    def _group_hardlinks(self, entries: FileMetadataStore) -> Tuple[Set[int], Dict[int, int]]:
+        """按 (st_dev, st_ino) 归并硬链接：每个 inode 只保留第一个遍历到的路径参与提取、哈希和比较
 
-        # 优化：直接进行两两比较，但只在有意义的子集上进行
-        # 实际的比较和分组逻辑
-        potential_duplicate_pairs: List[Tuple[FileMetadata, FileMetadata, float, List[str]]] = []
-        
-        # Create a copy for iteration while potentially modifying all_files_metadata or related structures
-        # For now, we iterate over a static list derived from initial scan.
-        # Optimization: Sort by size first to quickly rule out non-matches.
-        sorted_metadata = sorted(all_files_metadata, key=lambda m: m.size)
-        
-        num_files_to_compare = len(sorted_metadata)
-        self._log(f"开始比较 {num_files_to_compare} 个文件之间的相似性...", "INFO")
-        
-        processed_count = 0
-        for i in range(num_files_to_compare):
+        其余路径记录到 self.hardlink_sets，与真正的重复文件分开报告。
+        inode 为 0 的文件系统（如 FAT）不提供可靠的 inode，不做归并。
+
+        Returns:
+            (被归并、不再处理的遍历行号, 代表路径的遍历行号 -> hardlink_sets 下标)
+        """
+        first_row: Dict[Tuple[int, int], int] = {}
+        aliases: Dict[int, List[int]] = defaultdict(list)
+        for index in range(len(entries)):
+            inode = entries.inode(index)
+            if not inode:
+                continue
+            key = (entries.device(index), inode)
+            representative = first_row.setdefault(key, index)
+            if representative != index:
+                aliases[representative].append(index)
+
+        excluded: Set[int] = set()
+        set_index: Dict[int, int] = {}
+        for representative, rows in aliases.items():
+            set_index[representative] = len(self.hardlink_sets)
+            self.hardlink_sets.append([entries.path(representative)] + [entries.path(row) for row in rows])
+            excluded.update(rows)
+            self._record_bytes_avoided('hardlink', entries.sizes[representative] * len(rows))
+        self.scan_stats['hardlink_paths'] = len(excluded)
+        if excluded:
+            self._log(f"发现 {len(self.hardlink_sets)} 组硬链接（{len(excluded)} 个额外路径），每个 inode 只读取一次。", "INFO")
+        return excluded, set_index
+
+    def _needs_content_hash(self, ext: str, size: int) -> bool:
+        """同大小文件中哪些需要内容哈希：视频只用采样哈希，大图片只用感知哈希，与 extract_file_metadata 保持一致"""
+        if ext in self.video_extensions:
+            return False
+        return not (ext in self.image_extensions and size >= MAX_IMAGE_CONTENT_HASH_SIZE)
+
+    def _eliminate_unique_sizes(self, entries: FileMetadataStore, excluded: Optional[Set[int]] = None) -> List[int]:
+        """阶段二：按文件大小分桶，剔除不可能完全重复的文件
+
+        只有同大小的文件才会进入哈希和比较阶段；图片除外，因为感知哈希可以跨大小匹配。
+        扩展名不参与剔除：内容相同但扩展名不同的文件原本也会被比较。
+
+        Args:
+            excluded: 不参与分桶的行号（硬链接的额外路径）
+
+        Returns:
+            需要提取元数据的文件行号
+        """
+        excluded = excluded or set()
+        size_counts: Dict[int, int] = defaultdict(int)
+        for index, size in enumerate(entries.sizes):
+            if index not in excluded:
+                size_counts[size] += 1
+
+        candidates: List[int] = []
+        for index, size in enumerate(entries.sizes):
+            if index in excluded:
+                continue
+            if (size_counts[size] > 1 or self.cross_size_matching or self.fuzzy_name_matching
+                    or entries.extension(index) in self.image_extensions):
+                # 跨大小/相似文件名匹配时大小唯一的文件也参与比较；普通文件只需文件名，不会读取内容
+                candidates.append(index)
+            else:
+                self._record_bytes_avoided('size_bucket', size)
+
+        self._log(f"按大小分桶后，{len(candidates)}/{len(entries) - len(excluded)} 个文件需要进一步提取元数据。", "DEBUG")
+        return candidates
+
+    def _cache_key(self, meta: FileMetadata) -> tuple:
+        """缓存有效性键: (绝对路径, device, inode, size, mtime_ns, 哈希算法)"""
+        return os.path.abspath(meta.path), meta.device, meta.inode, meta.size, meta.mtime_ns, self.hash_algorithm
+
+    def _load_cached_metadata(self, entry: FileMetadata) -> Optional[FileMetadata]:
+        """从缓存中取回未变化文件的元数据，未命中时返回 None"""
+        if not self.metadata_cache or entry.mtime_ns is None:
+            return None
+        record = self.metadata_cache.get(*self._cache_key(entry))
+        if record is None:
+            self.scan_stats['cache_misses'] += 1
+            return None
+
+        self._cached_hashes[entry.path] = (record['partial_hash'], record['content_hash'])
+        if not record['extracted']:
+            # 只缓存过哈希，时长/感知哈希等仍需重新提取
+            self.scan_stats['cache_misses'] += 1
+            return None
+
+        self.scan_stats['cache_hits'] += 1
+        entry.duration = record['duration']
+        entry.sample_hash = record['sample_hash']
+        entry.perceptual_hash = record['perceptual_hash']
+        entry.filename_normalized = self.normalize_filename(entry.path)
+        entry.hash_algorithm = self.hash_algorithm
+
+        ext = Path(entry.path).suffix.lower()
+        if ext in self.video_extensions:
+            self._record_bytes_avoided('cache', min(entry.size, 5 * 1024 * 1024))
+        elif ext in self.image_extensions:
+            self._record_bytes_avoided('cache', entry.size)
+        return entry
+
+    def _store_cached_metadata(self, metadata: FileMetadata):
+        """把新提取的元数据写入缓存"""
+        if not self.metadata_cache or metadata.mtime_ns is None:
+            return
+        self.metadata_cache.put(*self._cache_key(metadata), extracted=True,
+                                duration=metadata.duration,
+                                sample_hash=metadata.sample_hash,
+                                perceptual_hash=metadata.perceptual_hash)
+
+    def _iter_ordered(self, executor, func, items: Iterable) -> Iterator:
+        """在线程/进程池中执行任务，按输入顺序逐个产生结果，保证结果与工作数无关
+
+        同时提交的任务不超过 workers * 2 个，取走一个结果再提交下一个，任务很多时内存也有界；
+        等待结果期间每隔 STOP_POLL_INTERVAL 秒检查一次停止信号，中止（或调用方不再迭代）时取消尚未开始的任务。
+        """
+        items = iter(items)
+        pending = deque(executor.submit(func, item) for item in islice(items, self.workers * 2))
+        try:
+            while pending:
+                future = pending.popleft()
+                while not wait([future], timeout=STOP_POLL_INTERVAL).done:
+                    self._check_stop_event()
+                self._check_stop_event()
+                pending.extend(executor.submit(func, item) for item in islice(items, 1))
+                yield future.result()
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            raise
+
+    def _run_ordered(self, executor, func, items: list) -> list:
+        """与 _iter_ordered 相同，但一次返回全部结果"""
+        return list(self._iter_ordered(executor, func, items))
+
+    def _extract_candidates(self, candidates: List[FileMetadata]) -> List[Optional[FileMetadata]]:
+        """阶段三：提取候选文件的元数据（未变化的文件直接使用缓存）
+
+        Returns:
+            与 candidates 一一对应的元数据，提取失败的位置为 None
+        """
+        pending: List[FileMetadata] = []
+        extracted: Dict[int, FileMetadata] = {}
+        for index, entry in enumerate(candidates):
             self._check_stop_event()
-            file1 = sorted_metadata[i]
-            # Only compare with subsequent files to avoid redundant comparisons (j > i)
-            # and files with the same size (optimization)
-            for j in range(i + 1, num_files_to_compare):
+            cached = self._load_cached_metadata(entry)
+            if cached is not None:
+                extracted[index] = cached
+            else:
+                pending.append(entry)
+
+        # 视频时长先一次性并发读取，不占用提取线程等待 ffprobe
+        videos = [entry for entry in pending if Path(entry.path).suffix.lower() in self.video_extensions]
+        if videos:
+            for entry, duration in zip(videos, self.get_video_durations([entry.path for entry in videos])):
+                entry.duration = duration
+
+        if self.workers > 1 and pending:
+            results = self._extract_parallel(pending)
+        else:
+            results = []
+            for entry in pending:
                 self._check_stop_event()
-                file2 = sorted_metadata[j]
+                results.append(self._extract_one(entry))
 
-                # Optimization: If sizes are different, they cannot be CERTAIN duplicates based on content hash or even sample hash.
-                # Perceptual hashes for images, or filename similarity for videos might still apply.
-                # For now, let's keep it simple: if size differs, assume they are less likely to be strong duplicates.
-                # A more robust approach would be to let calculate_similarity_score handle all checks.
-                if file1.size != file2.size and not (file1.perceptual_hash and file2.perceptual_hash): # Allow different size for images
-                    continue
+        pending_indexes = [index for index in range(len(candidates)) if index not in extracted]
+        for index, metadata in zip(pending_indexes, results):
+            extracted[index] = metadata
+        return [extracted[index] for index in range(len(candidates))]
 
-                score, reasons = self.calculate_similarity_score(file1, file2)
-                level = self.determine_duplicate_level(score)
-                
-                if level: # Only consider if a duplicate level is assigned
-                    potential_duplicate_pairs.append((file1, file2, score, reasons))
-            
-            processed_count +=1
-            if processed_count % 100 == 0 or processed_count == num_files_to_compare:
-                 self._log(f"已比较 {processed_count}/{num_files_to_compare} 个文件...", "DEBUG")
+    def _extract_one(self, entry: FileMetadata) -> Optional[FileMetadata]:
+        """提取单个文件的元数据并写入缓存"""
+        try:
+            metadata = self.extract_file_metadata(entry.path, file_size=entry.size, with_content_hash=False,
+                                                  probe_duration=False)
+        except InterruptedError:
+            raise
+        except Exception as e:
+            self._log(f"提取元数据失败 {entry.path}: {e}", "ERROR")
+            return None
+        metadata.duration = entry.duration  # _extract_candidates 已读取的视频时长
+        metadata.device, metadata.inode, metadata.mtime_ns = entry.device, entry.inode, entry.mtime_ns
+        # 提取失败时返回的是 size=0 的占位元数据；图片感知哈希失败、视频时长（ffprobe 出错、超时或未找到）
+        # 或采样哈希读取失败都可能是暂时的（文件被占用、尚未写完），这些情况都不缓存，下次扫描重新提取
+        ext = Path(entry.path).suffix.lower()
+        phash_failed = ext in self.image_extensions and metadata.perceptual_hash is None
+        video_failed = ext in self.video_extensions and (metadata.duration is None or metadata.sample_hash is None)
+        if metadata.size == entry.size and not phash_failed and not video_failed:
+            self._store_cached_metadata(metadata)
+        return metadata
 
+    def _extract_parallel(self, entries: List[FileMetadata]) -> List[Optional[FileMetadata]]:
+        """并行提取元数据：图片解码放到进程池，视频采样哈希和其他文件放到线程池"""
+        image_entries = [e for e in entries if Path(e.path).suffix.lower() in self.image_extensions]
+        other_entries = [e for e in entries if Path(e.path).suffix.lower() not in self.image_extensions]
+        results: Dict[str, Optional[FileMetadata]] = {}
 
-        self._log(f"初步找到 {len(potential_duplicate_pairs)} 对潜在重复文件。", "DEBUG")
-        if not potential_duplicate_pairs:
-            self._log("未发现任何潜在的重复文件对。", "INFO")
-            return {}
-
-        # 使用 Disjoint Set Union (DSU) 来合并重叠的重复组
-        parent = {meta.path: meta.path for meta in all_files_metadata}
-        group_scores = defaultdict(lambda: (0.0, [])) # Stores (max_score, reasons_list) for a group representative
-
-        def find(p_item):
-            if parent[p_item] == p_item:
-                return p_item
-            parent[p_item] = find(parent[p_item])
-            return parent[p_item]
-
-        def union(p_item1, p_item2, p_score, p_reasons):
-            root1 = find(p_item1)
-            root2 = find(p_item2)
-            if root1 != root2:
-                # Merge smaller tree into larger, or based on some other criteria if needed
-                parent[root2] = root1
-                # Update score for the new merged group representative (root1)
-                # We take the maximum score seen for any pair that formed this group
-                current_max_score_root1, current_reasons_root1 = group_scores[root1]
-                new_max_score = max(current_max_score_root1, p_score)
-                # Aggregate unique reasons
-                updated_reasons = list(set(current_reasons_root1 + p_reasons))
-                group_scores[root1] = (new_max_score, updated_reasons)
-                # Also update for root2 as it's now part of root1's group.
-                # This ensures if root2 was a representative, its score info is now under root1.
-                del group_scores[root2] # remove score for the merged root
-
-            else: # Already in the same group, just update score and reasons if this pair provides a higher score or new reasons
-                current_max_score_root, current_reasons_root = group_scores[root1]
-                new_max_score = max(current_max_score_root, p_score)
-                updated_reasons = list(set(current_reasons_root + p_reasons))
-                group_scores[root1] = (new_max_score, updated_reasons)
-
-
-        # Initialize scores for individual items before union operations
-        for meta in all_files_metadata:
-            group_scores[meta.path] = (0.0, []) # Default score, no reasons yet
-
-        for file1, file2, score, reasons in potential_duplicate_pairs:
-            union(file1.path, file2.path, score, reasons)
-            # Ensure both files are initially in group_scores if not already by individual init
-            if file1.path not in group_scores: group_scores[file1.path] = (0.0, [])
-            if file2.path not in group_scores: group_scores[file2.path] = (0.0, [])
-            
-            # Update scores for the representatives after union
-            # The score for the representative of the merged group should reflect the highest score
-            # and all reasons that led to this grouping.
-            rep1 = find(file1.path)
-            rep2 = find(file2.path) # Should be same as rep1 after union
-            
-            # Update score for the representative of the current pair's group
-            current_max_score, current_reasons = group_scores[rep1]
-            new_max_score = max(current_max_score, score)
-            updated_reasons = list(set(current_reasons + reasons))
-            group_scores[rep1] = (new_max_score, updated_reasons)
+        if image_entries:
+            with self.stats.timed('phash'), ProcessPoolExecutor(max_workers=self.workers) as executor:
+                hashes = self._run_ordered(executor, _perceptual_hash_worker, [e.path for e in image_entries])
+            for entry, (phash, error) in zip(image_entries, hashes):
+                entry.perceptual_hash = phash
+                entry.filename_normalized = self.normalize_filename(entry.path)
+                entry.hash_algorithm = self.hash_algorithm
+                if error:
+                    # 失败可能是暂时的，不写入缓存，下次扫描重新计算
+                    self._log(f"计算感知哈希失败 {entry.path}: {error}", "WARNING")
+                else:
+                    self._store_cached_metadata(entry)
+                results[entry.path] = entry
 
+        if other_entries:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for entry, metadata in zip(other_entries, self._run_ordered(executor, self._extract_one, other_entries)):
+                    results[entry.path] = metadata
 
-        # 构建最终的组
-        final_groups_map = defaultdict(list)
-        for meta in all_files_metadata:
-            root = find(meta.path)
-            final_groups_map[root].append(meta)
+        return [results[e.path] for e in entries]
 
-        self.duplicate_groups_categorized: Dict[DuplicateLevel, List[DuplicateGroup]] = defaultdict(list)
-        
-        final_group_objects: List[DuplicateGroup] = []
-        for representative_path, files_in_group_meta in final_groups_map.items():
-            if len(files_in_group_meta) > 1:
-                # Score and reasons are now stored against the representative path in group_scores
-                group_score, group_reasons = group_scores[representative_path]
-                
-                # Determine level based on the final aggregated score for the group
-                final_group_level = self.determine_duplicate_level(group_score)
-                if not final_group_level: # Should not happen if score > 0 and pairs were found
-                    final_group_level = DuplicateLevel.LOWLY_SUSPECTED # Fallback
-
-                group_obj = DuplicateGroup(
-                    level=final_group_level,
-                    score=group_score,
-                    files=files_in_group_meta,
-                    reasons=group_reasons if group_reasons else ["Unknown similarity"]
+    def _resolve_content_hashes(self, files: FileMetadataStore,
+                                rows: Iterable[int]) -> Iterator[Tuple[int, List[List[int]]]]:
+        """阶段四：对同大小候选文件做分级哈希（首尾块 -> 完整内容），结果写入 content_hash 列
+
+        部分哈希已经不同的文件内容必然不同，保持 content_hash 为空即可，不影响评分。
+        分桶哈希由与旧版查找模块共用的 ContentHashEngine 完成，工作数大于 1 时各桶并行处理；每个桶处理完立即产生结果。
+
+        Args:
+            rows: 参与哈希的行号，其中不需要内容哈希的文件（视频、大图片）会被忽略
+
+        Yields:
+            (文件大小, 该大小桶中内容完全相同的行号集合列表)
+        """
+        size_buckets: Dict[int, List[int]] = defaultdict(list)
+        for index in rows:
+            size = files.sizes[index]
+            if self._needs_content_hash(files.extension(index), size):
+                size_buckets[size].append(index)
+
+        known_partial = {path: hashes[0] for path, hashes in self._cached_hashes.items() if hashes[0]}
+        known_full = {path: hashes[1] for path, hashes in self._cached_hashes.items() if hashes[1]}
+
+        buckets = [item for item in size_buckets.items() if len(item[1]) > 1]
+        engine = ContentHashEngine(algorithm=self.hash_algorithm, workers=self.workers,
+                                   stop_check=self._check_stop_event, log_callback=self._log,
+                                   read_block_size=self.read_block_size)
+        bucket_results = engine.iter_buckets(((size, [files.path(index) for index in bucket]) for size, bucket in buckets),
+                                             known_partial=known_partial, known_full=known_full)
+
+        self.stats.begin_phase('hash', total=len(buckets))
+        try:
+            for size, bucket in buckets:
+                # 只计等待哈希结果的时间，不计调用方处理产生的分组的时间
+                with self.stats.timed('hash'):
+                    _, _, hasher, full_hashes = next(bucket_results)
+                self.stats.add_bytes_read(hasher.bytes_read)
+                self.stats.advance()
+                for stage, num_bytes in hasher.bytes_avoided.items():
+                    self._record_bytes_avoided(stage, num_bytes)
+                identical: Dict[str, List[int]] = defaultdict(list)
+                for index in bucket:
+                    path = files.path(index)
+                    digest = full_hashes.get(path)
+                    files.set_content_hash(index, digest)
+                    if digest:
+                        identical[digest].append(index)
+                    if self.metadata_cache and (path in hasher.computed_partial or path in hasher.computed_full):
+                        fields = {}
+                        if path in hasher.computed_partial:
+                            fields['partial_hash'] = hasher.computed_partial[path]
+                        if path in hasher.computed_full:
+                            fields['content_hash'] = hasher.computed_full[path]
+                        self.metadata_cache.put(*self._cache_key(files[index]), **fields)
+                yield size, list(identical.values())
+        finally:
+            bucket_results.close()
+
+    def _generate_candidate_pairs(self, features: List[FileFeatures],
+                                  is_image: List[bool]) -> Iterator[Tuple[int, int]]:
+        """比较阶段的候选对生成：只产生至少共享一个分块键的文件对（下标 i < j）
+
+        分块键: 文件大小、视频采样哈希、视频时长分段、标准化文件名、感知哈希近邻。
+        默认只有图片按文件名分块、不按时长分块，与只比较同大小文件和图片的原有范围一致；
+        开启 cross_size_matching 后所有文件都参与文件名和时长分块；
+        开启 fuzzy_name_matching 后另外用 MinHash LSH 索引产生标准化文件名相似的文件对。
+        """
+        index = BlockingIndex(self.blocking_keys, adjacent_keys=('duration',), max_block_sizes=MAX_BLOCK_SIZES)
+        phashes = {}
+        for item_id, feature in enumerate(features):
+            index.add(item_id, 'size', feature.size)
+            if 'sample_hash' in self.blocking_keys:
+                index.add(item_id, 'sample_hash', feature.sample_hash)
+            if 'duration' in self.blocking_keys and self.cross_size_matching and feature.duration:
+                index.add(item_id, 'duration', int(feature.duration // DURATION_BLOCK_SECONDS))
+            if 'name' in self.blocking_keys and (is_image[item_id] or self.cross_size_matching):
+                index.add(item_id, 'name', feature.name)
+            if 'phash' in self.blocking_keys and feature.phash is not None:
+                phashes[item_id] = feature.phash
+
+        extra_pairs = ((i, j) for i, j, _ in iter_similar_hash_pairs(phashes, PERCEPTUAL_HASH_MAX_DISTANCE))
+        if self.fuzzy_name_matching:
+            extra_pairs = chain(extra_pairs, self._iter_similar_name_pairs(features, phashes))
+        yield from index.iter_pairs(extra_pairs=extra_pairs)
+
+        self.scan_stats['oversized_blocks'] = index.oversized_blocks
+        if index.oversized_blocks:
+            self._log(f"有 {index.oversized_blocks} 个分块超过大小上限（{MAX_BLOCK_SIZES}），例如大量相机编号的文件名，"
+                      f"这些分块未产生候选对，其中的文件只通过其他分块键比较。", "INFO")
+
+    def _iter_similar_name_pairs(self, features: List[FileFeatures], phashes: Dict[int, int]) -> Iterator[Tuple[int, int]]:
+        """文件名 MinHash LSH 索引产生的候选对，跳过已经作为感知哈希近邻产生过的图片对"""
+        name_index = MinHashLSHIndex()
+        for item_id, feature in enumerate(features):
+            name_index.add(item_id, feature.name)
+        for i, j in name_index.iter_pairs():
+            if i in phashes and j in phashes and (phashes[i] ^ phashes[j]).bit_count() <= PERCEPTUAL_HASH_MAX_DISTANCE:
+                continue
+            yield i, j
+        if name_index.oversized_buckets:
+            self._log(f"文件名索引中有 {name_index.oversized_buckets} 个过大的桶（超过 {name_index.max_bucket_size} 个文件），"
+                      f"这些桶中的文件名过于常见，未产生候选对。", "DEBUG")
+
+    def _iter_pair_chunks(self, pairs: Iterable[Tuple[int, int]],
+                          skip: int) -> Iterator[Tuple[int, array, array]]:
+        """把候选对流切成批，批在累计对数为 SCORE_CHUNK_SIZE 的倍数处结束（最后一批可能不满）
+
+        Yields:
+            (批结束时的累计候选对数, 第一个文件下标, 第二个文件下标)；跳过前 skip 对
+        """
+        count = 0
+        first, second = array('q'), array('q')
+        for i, j in pairs:
+            count += 1
+            if count <= skip:
+                continue
+            first.append(i)
+            second.append(j)
+            if count % SCORE_CHUNK_SIZE == 0:
+                yield count, first, second
+                first, second = array('q'), array('q')
+        if first or count <= skip:
+            yield count, first, second
+
+    def _score_pair_chunks(self, features: List[FileFeatures], is_image: List[bool],
+                           skip: int = 0) -> Iterator[Tuple[int, List[Tuple[int, int, float, List[str]]]]]:
+        """比较阶段的评分：按批产生 (累计候选对数, [(i, j, 分数, 原因), ...])，只包含达到最低重复等级的文件对
+
+        候选对多于一批且工作数大于 1 时，各批交给进程池评分：批按候选对切分，同一个大分块
+        （例如数千张同样大小的照片）的文件对也会分散到各个工作进程。结果仍按批的顺序产生，与串行评分完全相同。
+        """
+        min_score = min(self.thresholds.values())
+        chunks = self._iter_pair_chunks(self._generate_candidate_pairs(features, is_image), skip)
+        lookahead = [chunk for chunk in (next(chunks, None), next(chunks, None) if self.workers > 1 else None) if chunk]
+
+        def with_pairs(first: array, second: array, matches: List[Tuple[int, float, List[str]]]):
+            return [(first[k], second[k], score, reasons) for k, score, reasons in matches]
+
+        if len(lookahead) < 2:
+            for count, first, second in chain(lookahead, chunks):
+                yield count, with_pairs(first, second, score_pairs(features, self.weights, min_score, first, second))
+            return
+
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=init_scoring_worker,
+                                 initargs=(features, self.weights, min_score)) as executor:
+            try:
+                for count, first, second in chain(lookahead, chunks):
+                    pending.append((count, first, second, executor.submit(score_pairs_in_worker, first, second)))
+                    # 同时提交的批数有上限，候选对流很长时内存也有界
+                    if len(pending) >= self.workers * 4:
+                        count, first, second, future = pending.popleft()
+                        yield count, with_pairs(first, second, future.result())
+                while pending:
+                    count, first, second, future = pending.popleft()
+                    yield count, with_pairs(first, second, future.result())
+            finally:
+                for _, _, _, future in pending:
+                    future.cancel()
+
+    def _log_bytes_avoided(self):
+        """输出各阶段避免读取的字节数"""
+        stage_names = {
+            'size_bucket': "按大小分桶",
+            'partial_hash': "首尾块部分哈希",
+            'lockstep': "同步完整哈希",
+            'cache': "元数据缓存",
+            'known_full_hash': "缓存的完整哈希",
+            'hardlink': "硬链接归并",
+        }
+        for stage, num_bytes in self.scan_stats['bytes_avoided'].items():
+            self._log(f"阶段「{stage_names.get(stage, stage)}」避免读取 {human_readable_size(num_bytes)}。", "INFO")
+
+    def _log_scan_timing(self):
+        """输出各阶段耗时和读取量"""
+        snapshot = self.stats.snapshot()
+        stages = "，".join(f"{stage} {seconds:.2f}s" for stage, seconds in snapshot['stage_seconds'].items() if seconds)
+        self._log(f"扫描耗时 {snapshot['elapsed_seconds']:.2f}s（{stages}），读取 {human_readable_size(snapshot['bytes_read'])}，"
+                  f"评分 {snapshot['pairs_scored']} 对候选文件。", "INFO")
+        ffprobe = snapshot['ffprobe']
+        if ffprobe['calls']:
+            timeouts = f"，{ffprobe['timeouts']} 次超时" if ffprobe['timeouts'] else ""
+            self._log(f"ffprobe 调用 {ffprobe['calls']} 次，耗时 p50 {ffprobe['p50_seconds'] * 1000:.0f} ms，"
+                      f"p90 {ffprobe['p90_seconds'] * 1000:.0f} ms，p99 {ffprobe['p99_seconds'] * 1000:.0f} ms{timeouts}。",
+                      "INFO")
+
+    def _checkpoint_fingerprint(self, roots: List[str]) -> Dict:
+        """影响扫描结果的设置，断点只在这些设置完全相同时才能恢复"""
+        return {
+            'roots': [os.path.normcase(os.path.realpath(root)) for root in roots],
+            'hash_algorithm': self.hash_algorithm,
+            'cross_size_matching': self.cross_size_matching,
+            'fuzzy_name_matching': self.fuzzy_name_matching,
+            'blocking_keys': tuple(self.blocking_keys),
+            'max_block_sizes': dict(MAX_BLOCK_SIZES),
+            'weights': dict(self.weights),
+            'thresholds': {level.name: value for level, value in self.thresholds.items()},
+            'video_extensions': sorted(self.video_extensions),
+            'image_extensions': sorted(self.image_extensions),
+        }
+
+    def _load_checkpoint(self, fingerprint: Dict) -> Optional[Dict]:
+        """读取断点并恢复统计信息，没有可用断点时返回 None"""
+        if not self.checkpoint:
+            return None
+        state = self.checkpoint.load(fingerprint)
+        if state is None:
+            if self.checkpoint.exists():
+                self._log("断点文件与当前扫描设置不一致或已损坏，将重新扫描。", "WARNING")
+            return None
+        self.scan_stats = state.pop('scan_stats')
+        self.hardlink_sets = state.pop('hardlink_sets')
+        self._cached_hashes = state.pop('cached_hashes')
+        state['tracker'].mark_all_dirty()
+        phase_names = {'walk': "遍历目录", 'extract': "提取元数据", 'compare': "比较文件"}
+        self._log(f"从断点继续扫描：{phase_names.get(state['phase'], state['phase'])}阶段，"
+                  f"已遍历 {self.scan_stats['files_walked']} 个文件，已提取 {state['extracted']} 个候选文件，"
+                  f"已比较 {state['pairs_done']} 对。", "INFO")
+        return state
+
+    def iter_duplicate_groups(self, roots: Union[str, Iterable[str]]) -> Iterator[DuplicateGroupUpdate]:
+        """流式查找重复文件，分组一经确认立即产生
+
+        内容哈希完全相同的组在对应大小桶哈希完成后立即产生（普通文件先于图片、视频提取），
+        相似度评分得到的组在比较阶段逐步产生。已经产生的组有新成员加入、评分或原因变化时，
+        会以相同的 group_id 再次产生；两个已产生的组合并时，被并入的组编号放在 merged_ids 中。
+
+        多个目录共用一次遍历、一个元数据池和一个比较阶段，因此可以找到跨目录的重复文件；
+        重复或相互嵌套的目录只扫描一次。
+
+        设置了 checkpoint 时定期保存扫描进度，中止后再次扫描同样的目录会从断点继续：
+        已遍历的目录、已提取的文件、已哈希的大小桶和已比较的文件对都不再重复处理，
+        之前已确认的组会在开始时重新产生一次。
+
+        Args:
+            roots: 一个或多个要扫描的目录
+        """
+        roots = [roots] if isinstance(roots, str) else list(roots)
+        self._reset_scan_stats()
+        roots = self._deduplicate_roots(roots)
+
+        fingerprint = self._checkpoint_fingerprint(roots)
+        state = self._load_checkpoint(fingerprint)
+        if state is None:
+            state = {
+                'phase': 'walk',
+                'roots': roots,
+                'entries': FileMetadataStore(self.hash_algorithm),
+                'walked_roots': [],
+                'walked_dirs': set(),
+                'files': FileMetadataStore(self.hash_algorithm),
+                'walk_rows': array('q'),  # 候选文件行号 -> 遍历行号，组内文件按遍历顺序排列
+                'extracted': 0,  # 已提取的候选文件数（普通文件在前，图片、视频在后）
+                'hashed_sizes': set(),  # 已完成内容哈希的大小桶
+                'tracker': _GroupTracker(),
+                'pairs_done': 0,  # 已评分的候选对数
+                'duplicate_pairs': 0,
+            }
+
+        def save_checkpoint(force: bool = False):
+            if not self.checkpoint:
+                return
+
+            def build_state():
+                # 断点引用的缓存记录必须先落盘，否则恢复后会重新读取这些文件
+                if self.metadata_cache:
+                    self.metadata_cache.flush()
+                return dict(state, scan_stats=self.scan_stats, hardlink_sets=self.hardlink_sets,
+                            cached_hashes=self._cached_hashes)
+
+            if self.checkpoint.save(fingerprint, build_state, force=force):
+                self._log(f"扫描进度已保存到断点 ({state['phase']})。", "DEBUG")
+
+        try:
+            yield from self._iter_duplicate_groups_from(state, save_checkpoint)
+        except (InterruptedError, GeneratorExit):
+            # 各阶段只在处理完一个单元后才更新状态，中止时的状态总是一致的
+            if self.checkpoint:
+                save_checkpoint(force=True)
+                self._log("扫描已中止，进度已保存，再次扫描相同目录时可以从断点继续。", "WARNING")
+            raise
+        finally:
+            self.stats.finish()
+        if self.checkpoint:
+            self.checkpoint.clear()
+        self._log_scan_timing()
+
+    def _iter_duplicate_groups_from(self, state: Dict, save_checkpoint) -> Iterator[DuplicateGroupUpdate]:
+        """iter_duplicate_groups 的主体，从 state 记录的阶段开始（或继续）扫描"""
+        tracker: _GroupTracker = state['tracker']
+        files: FileMetadataStore = state['files']
+        walk_rows = state['walk_rows']
+
+        if state['phase'] == 'walk':
+            self.stats.begin_phase('walk')
+            entries = state['entries']
+            # 使用断点中记录的目录写法，保证与已遍历目录的路径一致
+            for root in state['roots']:
+                if root in state['walked_roots']:
+                    continue
+                self._log(f"开始扫描目录: {root}", "INFO")
+                self._walk_files(root, entries, state['walked_dirs'], save_checkpoint)
+                state['walked_roots'].append(root)
+            excluded, state['hardlink_set_index'] = self._group_hardlinks(entries)
+            state['candidates'] = self._eliminate_unique_sizes(entries, excluded)
+            del excluded
+            state['phase'] = 'extract'
+            save_checkpoint(force=True)
+        hardlink_set_index: Dict[int, int] = state['hardlink_set_index']
+
+        def flush() -> Iterator[DuplicateGroupUpdate]:
+            for group_id, _, members, score, reasons, merged_ids in tracker.take_dirty():
+                level = self.determine_duplicate_level(score) or DuplicateLevel.LOWLY_SUSPECTED
+                members = sorted(members, key=walk_rows.__getitem__)
+                hardlinks = {}
+                for index in members:
+                    if walk_rows[index] in hardlink_set_index:
+                        representative, *others = self.hardlink_sets[hardlink_set_index[walk_rows[index]]]
+                        hardlinks[representative] = others
+                group = DuplicateGroup(
+                    level=level,
+                    score=score,
+                    files=[files[index] for index in members],
+                    reasons=reasons if reasons else ["Unknown similarity"],
+                    hardlinks=hardlinks,
                 )
-                final_group_objects.append(group_obj)
-        
-        # Merge overlapping groups based on shared files (though DSU should mostly handle this)
-        # merged_groups = self._merge_overlapping_groups(final_group_objects)
-        # For now, assume DSU has created distinct groups
-        merged_groups = final_group_objects
+                yield DuplicateGroupUpdate(group_id, group, merged_ids)
+
+        # 从断点恢复时先把之前已确认的组交给调用方
+        yield from flush()
 
+        if state['phase'] == 'extract':
+            entries, candidates = state['entries'], state['candidates']
 
-        for group_obj in merged_groups:
+            def exact_groups(rows: Iterable[int]) -> Iterator[DuplicateGroupUpdate]:
+                rows = (row for row in rows if files.sizes[row] not in state['hashed_sizes'])
+                for size, identical_sets in self._resolve_content_hashes(files, rows):
+                    for rows_with_same_hash in identical_sets:
+                        with self.stats.timed('union_find'):
+                            for index in rows_with_same_hash[1:]:
+                                tracker.add_pair(rows_with_same_hash[0], index,
+                                                 float(self.weights['content_hash_match']), ["内容哈希完全相同"])
+                    state['hashed_sizes'].add(size)
+                    yield from flush()
+                    save_checkpoint()
+
+            def extract_until(end: int):
+                self.stats.begin_phase('extract', total=len(extraction_order), done=state['extracted'])
+                # 候选文件的元数据也按列存储，分批提取，视图对象用完即释放
+                while state['extracted'] < end:
+                    batch_rows = extraction_order[state['extracted']:min(state['extracted'] + EXTRACT_BATCH_SIZE, end)]
+                    batch = [entries[index] for index in batch_rows]
+                    for walk_row, metadata in zip(batch_rows, self._extract_candidates(batch)):
+                        if metadata is not None:
+                            files.append_metadata(metadata)
+                            walk_rows.append(walk_row)
+                    state['extracted'] += len(batch_rows)
+                    self.stats.advance(len(batch_rows))
+                    save_checkpoint()
+
+            # 图片、视频的提取（解码、ffprobe）远慢于普通文件，先处理普通文件，使完全重复的组尽早产生；
+            # 与需要内容哈希的图片同大小的普通文件必须和这些图片一起哈希，推迟到图片提取之后
+            media_extensions = self.image_extensions | self.video_extensions
+            generic_candidates, media_candidates = [], []
+            for index in candidates:
+                (media_candidates if entries.extension(index) in media_extensions else generic_candidates).append(index)
+            deferred_sizes = {entries.sizes[index] for index in media_candidates
+                              if self._needs_content_hash(entries.extension(index), entries.sizes[index])}
+            generic_count = len(generic_candidates)
+            extraction_order = generic_candidates + media_candidates
+            del generic_candidates, media_candidates, candidates
+
+            try:
+                extract_until(generic_count)
+                yield from exact_groups(row for row in range(len(files)) if files.sizes[row] not in deferred_sizes)
+                extract_until(len(extraction_order))
+                yield from exact_groups(row for row in range(len(files)) if files.sizes[row] in deferred_sizes)
+            finally:
+                # 中止时也保存已经完成的部分，下次扫描可以直接复用
+                if self.metadata_cache:
+                    self.metadata_cache.flush()
+
+            self.scan_stats['files_extracted'] = len(files)
+            del entries, extraction_order
+            for key in ('entries', 'candidates', 'walked_dirs'):
+                state.pop(key, None)
+            state['phase'] = 'compare'
+            save_checkpoint(force=True)
+
+        self._log(f"共遍历 {self.scan_stats['files_walked']} 个文件，收集到 {len(files)} 个候选文件的元数据。", "INFO")
+        self._log_bytes_avoided()
+        if self.metadata_cache:
+            lookups = self.scan_stats['cache_hits'] + self.scan_stats['cache_misses']
+            hit_rate = self.scan_stats['cache_hits'] / lookups if lookups else 0.0
+            self._log(f"元数据缓存命中率: {hit_rate:.1%} ({self.scan_stats['cache_hits']}/{lookups})", "INFO")
+        if not len(files):
+            return
+
+        # 按大小排序后比较，同大小文件内保持遍历顺序
+        order = sorted(range(len(files)), key=lambda index: (files.sizes[index], walk_rows[index]))
+
+        num_files_to_compare = len(order)
+        self._log(f"开始比较 {num_files_to_compare} 个文件之间的相似性...", "INFO")
+        # 每个文件的评分特征只计算一次，逐对评分时不再重复标准化文件名和解析哈希
+        features = [FileFeatures.from_metadata(files[index]) for index in order]
+        is_image = [files.extension(index) in self.image_extensions for index in order]
+
+        # 候选对的产生顺序是确定的，从断点恢复时跳过已经评分过的前 pairs_done 对
+        pair_count = state['pairs_done']
+        self.stats.begin_phase('compare', done=pair_count)
+        scored_chunks = self._score_pair_chunks(features, is_image, skip=pair_count)
+        try:
+            while True:
+                # 比较耗时只计生成和评分候选对（并行时为等待评分结果）的时间，
+                # 不含合并分组 (union_find) 和调用方处理产生的分组的时间
+                with self.stats.timed('compare'):
+                    chunk = next(scored_chunks, None)
+                if chunk is None:
+                    break
+                pair_count, matches = chunk
+                # 按候选对的原有顺序合并，分组编号和原因顺序与串行评分完全相同
+                with self.stats.timed('union_find'):
+                    for i, j, score, reasons in matches:
+                        tracker.add_pair(order[i], order[j], score, reasons)
+                state['duplicate_pairs'] += len(matches)
+                state['pairs_done'] = pair_count
+                self.stats.set_pairs_scored(pair_count)
+                self._check_stop_event()
+                self._log(f"已比较 {pair_count} 对候选文件...", "DEBUG")
+                yield from flush()
+                save_checkpoint()
+        finally:
+            scored_chunks.close()
+
+        self.scan_stats['candidate_pairs'] = pair_count
+        self._log(f"分块索引共产生 {pair_count} 对候选文件（两两比较需要 {num_files_to_compare * (num_files_to_compare - 1) // 2} 对）。", "INFO")
+        self._log(f"初步找到 {state['duplicate_pairs']} 对潜在重复文件。", "DEBUG")
+        yield from flush()
+
+    def find_duplicates_in_directory(self, directory_path: str) -> Dict[DuplicateLevel, List[DuplicateGroup]]:
+        """在指定目录中查找重复文件 (核心逻辑)"""
+        return self.find_duplicates([directory_path])
+
+    def find_duplicates(self, roots: Union[str, Iterable[str]]) -> Dict[DuplicateLevel, List[DuplicateGroup]]:
+        """在一个或多个目录中查找重复文件（包括跨目录的重复）
+
+        一次性返回全部结果；需要边扫描边显示时使用 iter_duplicate_groups。
+        """
+        groups: Dict[int, DuplicateGroup] = {}
+        for update in self.iter_duplicate_groups(roots):
+            for merged_id in update.merged_ids:
+                groups.pop(merged_id, None)
+            groups[update.group_id] = update.group
+
+        if not groups:
+            self._log("未发现任何潜在的重复文件对。", "INFO")
+
+        self.duplicate_groups_categorized: Dict[DuplicateLevel, List[DuplicateGroup]] = defaultdict(list)
+        for group_id in sorted(groups):
+            group_obj = groups[group_id]
             if len(group_obj.files) > 1: # Only consider groups with more than one file as duplicates
                 self.duplicate_groups_categorized[group_obj.level].append(group_obj)
-            elif len(group_obj.files) == 1 and hasattr(self, 'include_single_files_in_results') and self.include_single_files_in_results: # For debugging
-                 self.duplicate_groups_categorized[DuplicateLevel.NOT_DUPLICATE].append(group_obj)
 
         # Log details of categorized duplicate groups before returning
         if self.log_callback:
@@ -612,28 +1262,15 @@ class EnhancedDuplicateFinder:
                     print()
 
     def _get_video_duration(self, file_path: str) -> Optional[float]:
-        """获取视频时长"""
-        if not self.ffprobe_path:
-            self._log(f"ffprobe路径未设置，无法获取视频时长: {file_path}", "WARNING")
-            return None
-            
-        try:
-            result = subprocess.run(
-                [self.ffprobe_path, "-v", "error", "-show_entries", 
-                 "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", str(file_path)],
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
-                creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0
-            )
-            if result.returncode == 0 and result.stdout.strip():
-                return float(result.stdout.strip())
-        except Exception as e:
-            self._log(f"无法获取视频时长 {file_path}: {e}", "WARNING")
-        return None
+        """获取视频时长（保留旧名称，与 get_video_duration 相同）"""
+        return self.get_video_duration(file_path)
 
 def find_duplicates_enhanced(folders_to_scan: List[str], move_them: bool = False, 
                             ffprobe_path: str = None, 
                             log_callback: Optional[callable] = None,
-                            stop_event: Optional[threading.Event] = None) -> Tuple[List[str], Dict]:
+                            stop_event: Optional[threading.Event] = None,
+                            hash_algorithm: Optional[str] = None,
+                            resume: bool = False) -> Tuple[List[str], Dict]:
     """
     增强版重复文件查找函数，与原版接口兼容
     
@@ -643,13 +1280,17 @@ def find_duplicates_enhanced(folders_to_scan: List[str], move_them: bool = False
         ffprobe_path: ffprobe路径（可选）
         log_callback: 实时日志回调 (新增)
         stop_event: 终止事件 (新增)
+        hash_algorithm: 哈希算法，默认 "auto" (新增)
+        resume: 保存扫描断点，中止后以相同参数再次调用时从断点继续 (新增)
     
     Returns:
         (日志列表, 重复文件组字典)
     """
     finder = EnhancedDuplicateFinder(ffprobe_path, 
                                      log_callback=log_callback, 
-                                     stop_event=stop_event)
+                                     stop_event=stop_event,
+                                     hash_algorithm=hash_algorithm,
+                                     checkpoint=ScanCheckpoint.for_roots(folders_to_scan) if resume and folders_to_scan else None)
     all_logs = []
     all_duplicate_groups = {}
     
@@ -665,38 +1306,47 @@ def find_duplicates_enhanced(folders_to_scan: List[str], move_them: bool = False
     
     primary_scan_folder = folders_to_scan[0]
     
-    # 扫描所有文件夹
-    for folder_path in folders_to_scan:
-        _local_log(f"--- 开始处理文件夹: {folder_path} ---", "INFO")
-        
-        try:
-            results = finder.find_duplicates_in_directory(folder_path)
-            
-            # 转换结果格式以兼容原版
-            for level, groups in results.items():
-                level_name = level.value
-                _local_log(f"【{level_name}】找到 {len(groups)} 组", "INFO")
-                
-                for group in groups:
-                    # 使用组的最高分数作为哈希键
-                    group_key = f"{level_name}_{group.score:.1f}_{len(group.files)}"
-                    file_paths = [f.path for f in group.files]
-                    
-                    all_duplicate_groups[group_key] = file_paths
-                    
-                    _local_log(f"  组 (评分: {group.score:.1f}):", "DETAIL")
-                    _local_log(f"    原因: {', '.join(set(group.reasons))}", "DETAIL")
-                    for file_meta in group.files:
-                        size_mb = file_meta.size / (1024 * 1024)
-                        duration_str = f", 时长: {file_meta.duration:.1f}s" if file_meta.duration else ""
-                        _local_log(f"    - {file_meta.path} ({size_mb:.1f}MB{duration_str})", "DETAIL")
-                        
-        except InterruptedError:
-            _local_log("查找操作被用户中止。", "WARNING")
-            return all_logs, {}
-        except Exception as e:
-            error_msg = f"处理文件夹 {folder_path} 时出错: {e}"
-            _local_log(error_msg, "ERROR")
+    # 所有文件夹在一次扫描中处理：共用元数据和比较阶段，跨文件夹的重复也能找到
+    _local_log(f"--- 开始处理文件夹: {', '.join(folders_to_scan)} ---", "INFO")
+
+    try:
+        results = finder.find_duplicates(folders_to_scan)
+
+        # 转换结果格式以兼容原版
+        for level, groups in results.items():
+            level_name = level.value
+            _local_log(f"【{level_name}】找到 {len(groups)} 组", "INFO")
+
+            for group in groups:
+                # 使用组的最高分数作为哈希键
+                group_key = f"{level_name}_{group.score:.1f}_{len(group.files)}"
+                file_paths = [f.path for f in group.files]
+
+                all_duplicate_groups[group_key] = file_paths
+
+                _local_log(f"  组 (评分: {group.score:.1f}):", "DETAIL")
+                _local_log(f"    原因: {', '.join(set(group.reasons))}", "DETAIL")
+                for file_meta in group.files:
+                    size_mb = file_meta.size / (1024 * 1024)
+                    duration_str = f", 时长: {file_meta.duration:.1f}s" if file_meta.duration else ""
+                    _local_log(f"    - {file_meta.path} ({size_mb:.1f}MB{duration_str})", "DETAIL")
+                    for link_path in group.hardlinks.get(file_meta.path, []):
+                        _local_log(f"      (硬链接) {link_path}", "DETAIL")
+
+        # 硬链接指向同一份数据，不占用额外空间，与真正的重复文件分开报告
+        if finder.hardlink_sets:
+            _local_log(f"【硬链接】{len(finder.hardlink_sets)} 组（不占用额外空间）", "INFO")
+            for link_paths in finder.hardlink_sets:
+                _local_log(f"  - {' = '.join(link_paths)}", "DETAIL")
+        reclaimable = sum(group.reclaimable_size for groups in results.values() for group in groups)
+        _local_log(f"删除重复文件（每组保留一个）可释放 {human_readable_size(reclaimable)}（按 inode 计算）。", "INFO")
+
+    except InterruptedError:
+        _local_log("查找操作被用户中止。", "WARNING")
+        return all_logs, {}
+    except Exception as e:
+        error_msg = f"处理文件夹时出错: {e}"
+        _local_log(error_msg, "ERROR")
     
     # 统计结果
     if not all_duplicate_groups:
@@ -732,20 +1382,26 @@ def find_duplicates_enhanced(folders_to_scan: List[str], move_them: bool = False
 def collect_duplicate_files_info_enhanced(directory_path: str, 
                                         ffprobe_path: str = None, 
                                         log_callback: Optional[callable] = None,
-                                        stop_event: Optional[threading.Event] = None) -> Tuple[Dict, List[str], int, int, int]:
+                                        stop_event: Optional[threading.Event] = None,
+                                        hash_algorithm: Optional[str] = None,
+                                        resume: bool = False) -> Tuple[Dict, List[str], int, int, int]:
     """
     增强版重复文件信息收集函数，与原版接口兼容
     
     Args:
         log_callback: 实时日志回调 (新增)
         stop_event: 终止事件 (新增)
+        hash_algorithm: 哈希算法，默认 "auto" (新增)
+        resume: 保存扫描断点，中止后以相同参数再次调用时从断点继续 (新增)
 
     Returns:
         (重复文件组字典, 日志列表, 处理文件数, 跳过不支持文件数, 哈希错误文件数)
     """
     finder = EnhancedDuplicateFinder(ffprobe_path, 
                                      log_callback=log_callback, 
-                                     stop_event=stop_event)
+                                     stop_event=stop_event,
+                                     hash_algorithm=hash_algorithm,
+                                     checkpoint=ScanCheckpoint.for_roots([directory_path]) if resume else None)
     logs = []
     processed_files = 0
     skipped_unsupported = 0
@@ -766,9 +1422,8 @@ def collect_duplicate_files_info_enhanced(directory_path: str,
     try:
         results = finder.find_duplicates_in_directory(directory_path)
         
-        # 统计处理的文件（可以从finder内部获取，或者保持外部统计）
-        for root, _, files_in_dir in os.walk(directory_path): # files_in_dir to avoid conflict
-            processed_files += len(files_in_dir)
+        # 处理的文件数在遍历时已经统计，不再重新遍历目录
+        processed_files = finder.scan_stats['files_walked']
         
         # 转换结果格式
         duplicate_groups = {}
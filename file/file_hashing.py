@@ -0,0 +1,588 @@
+import os
+import mmap
+import errno
+import hashlib
+import logging
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 查找重复文件不需要密码学强度，默认使用标准库的 blake2b；安装了更快的后端时 "auto" 会优先使用它们
+HASH_ALGORITHM_AUTO = "auto"
+DEFAULT_HASH_ALGORITHM = HASH_ALGORITHM_AUTO
+FALLBACK_HASH_ALGORITHM = "blake2b"
+
+_HASH_FACTORIES: Dict[str, Callable] = {
+    "blake2b": lambda: hashlib.blake2b(digest_size=32),
+    "sha256": hashlib.sha256,
+}
+if blake3 is not None:
+    _HASH_FACTORIES["blake3"] = blake3.blake3
+if xxhash is not None:
+    _HASH_FACTORIES["xxh3_128"] = xxhash.xxh3_128
+
+# "auto" 的选择顺序，越靠前越快
+_AUTO_PREFERENCE = ("blake3", "xxh3_128", "blake2b")
+
+# 部分哈希读取的首/尾块大小范围
+MIN_PARTIAL_BLOCK_SIZE = 4 * 1024
+MAX_PARTIAL_BLOCK_SIZE = 64 * 1024
+DEFAULT_PARTIAL_BLOCK_SIZE = 16 * 1024
+
+DEFAULT_CHUNK_SIZE = 65536
+
+# 同步比较时同时打开的文件数上限，超过后退回逐个计算完整哈希
+MAX_LOCKSTEP_FILES = 64
+# 所有并行处理的桶同步比较时合计打开的文件数上限，由各工作线程平分；进程文件描述符软限制较低时取其一半
+LOCKSTEP_HANDLE_BUDGET = 256
+
+# 完整读取文件时每次读入复用缓冲区的块大小，可在 1-8 MB 之间调整
+MIN_READ_BLOCK_SIZE = 1024 * 1024
+MAX_READ_BLOCK_SIZE = 8 * 1024 * 1024
+DEFAULT_READ_BLOCK_SIZE = MIN_READ_BLOCK_SIZE
+
+# 不小于该大小的文件使用 mmap 直接把映射内存交给哈希函数，不经过用户态缓冲区
+MMAP_THRESHOLD = 64 * 1024 * 1024
+
+# 每读取这么多字节检查一次停止信号，而不是每个块都检查
+STOP_CHECK_INTERVAL = 16 * 1024 * 1024
+
+# 视频采样哈希读取的总字节数（不超过该大小的文件读取全部）
+DEFAULT_SAMPLE_SIZE_MB = 5
+# 采样区域长度的对齐粒度，保证与已缓存的采样哈希一致
+SAMPLE_REGION_ALIGNMENT = 65536
+
+# 未指定工作数的调用方（旧版查找模块）默认使用的哈希线程数
+DEFAULT_HASH_WORKERS = min(8, os.cpu_count() or 1)
+
+_thread_buffers = threading.local()
+
+
+def available_hash_algorithms() -> List[str]:
+    """当前环境可用的哈希算法名称"""
+    return list(_HASH_FACTORIES)
+
+
+def resolve_hash_algorithm(name: Optional[str] = None,
+                           log_callback: Optional[Callable[[str, str], None]] = None) -> str:
+    """把算法设置解析为实际使用的算法名称
+
+    "auto" 选择已安装的最快后端；指定的算法不可用时退回 blake2b。
+    """
+    name = (name or DEFAULT_HASH_ALGORITHM).lower()
+    if name == HASH_ALGORITHM_AUTO:
+        return next(algo for algo in _AUTO_PREFERENCE if algo in _HASH_FACTORIES)
+    if name in _HASH_FACTORIES:
+        return name
+    message = f"哈希算法 '{name}' 不可用（未安装对应的库），改用 {FALLBACK_HASH_ALGORITHM}。"
+    if log_callback:
+        log_callback(message, "WARNING")
+    else:
+        logging.warning(message)
+    return FALLBACK_HASH_ALGORITHM
+
+
+def new_hasher(algorithm: str):
+    """创建指定算法的哈希对象（支持 update/hexdigest/copy）"""
+    return _HASH_FACTORIES[algorithm]()
+
+
+def clamp_read_block_size(block_size: Optional[int]) -> int:
+    """把读取块大小限制在 MIN_READ_BLOCK_SIZE 到 MAX_READ_BLOCK_SIZE 之间"""
+    return max(MIN_READ_BLOCK_SIZE, min(block_size or DEFAULT_READ_BLOCK_SIZE, MAX_READ_BLOCK_SIZE))
+
+
+def _read_buffer(block_size: int) -> memoryview:
+    """当前线程复用的读取缓冲区，避免每个块都分配新的 bytes 对象"""
+    buffer = getattr(_thread_buffers, 'buffer', None)
+    if buffer is None or len(buffer) < block_size:
+        buffer = bytearray(block_size)
+        _thread_buffers.buffer = buffer
+    return memoryview(buffer)[:block_size]
+
+
+def update_from_file(hasher, f: BinaryIO, length: Optional[int] = None,
+                     block_size: int = DEFAULT_READ_BLOCK_SIZE,
+                     stop_check: Optional[Callable[[], None]] = None) -> int:
+    """从文件当前位置读取最多 length 字节（None 表示读到末尾）并更新哈希
+
+    使用 readinto 读入线程复用的缓冲区，哈希计算期间不产生新的对象。
+
+    Returns:
+        实际读取的字节数
+    """
+    view = _read_buffer(clamp_read_block_size(block_size))
+    total = 0
+    next_check = STOP_CHECK_INTERVAL
+    while length is None or total < length:
+        target = view if length is None or length - total >= len(view) else view[:length - total]
+        n = f.readinto(target)
+        if not n:
+            break
+        hasher.update(target[:n])
+        total += n
+        if stop_check and total >= next_check:
+            stop_check()
+            next_check += STOP_CHECK_INTERVAL
+    return total
+
+
+def update_from_mmap(hasher, f: BinaryIO, offset: int = 0, length: Optional[int] = None,
+                     block_size: int = DEFAULT_READ_BLOCK_SIZE,
+                     stop_check: Optional[Callable[[], None]] = None) -> int:
+    """把文件映射到内存后直接更新哈希（零拷贝），按块分段以便检查停止信号
+
+    Returns:
+        实际哈希的字节数
+    """
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        end = len(mapped) if length is None else min(len(mapped), offset + length)
+        step = max(clamp_read_block_size(block_size), STOP_CHECK_INTERVAL)
+        with memoryview(mapped) as view:
+            position = offset
+            while position < end:
+                if stop_check:
+                    stop_check()
+                chunk_end = min(position + step, end)
+                hasher.update(view[position:chunk_end])
+                position = chunk_end
+        return max(0, end - offset)
+
+
+def lockstep_handle_budget() -> int:
+    """所有工作线程合计可用于同步比较的文件数，不超过进程文件描述符软限制的一半"""
+    budget = LOCKSTEP_HANDLE_BUDGET
+    if resource is not None:
+        soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != resource.RLIM_INFINITY:
+            budget = min(budget, soft // 2)
+    return max(1, budget)
+
+
+def hash_file_range(hasher, f: BinaryIO, offset: int = 0, length: Optional[int] = None,
+                    file_size: Optional[int] = None, block_size: int = DEFAULT_READ_BLOCK_SIZE,
+                    stop_check: Optional[Callable[[], None]] = None) -> int:
+    """用文件中 [offset, offset + length) 的内容更新哈希，大文件自动使用 mmap
+
+    Returns:
+        实际哈希的字节数
+    """
+    if file_size is None:
+        file_size = os.fstat(f.fileno()).st_size
+    span = file_size - offset if length is None else min(length, file_size - offset)
+    if span >= MMAP_THRESHOLD:
+        try:
+            return update_from_mmap(hasher, f, offset, span, block_size, stop_check)
+        except (OSError, ValueError):
+            pass  # 不支持映射的文件（管道、特殊文件系统等）退回普通读取
+    f.seek(offset)
+    return update_from_file(hasher, f, span, block_size, stop_check)
+
+
+def hash_file(filepath: str, algorithm: str, block_size: int = DEFAULT_READ_BLOCK_SIZE,
+              stop_check: Optional[Callable[[], None]] = None) -> str:
+    """计算文件完整内容哈希，读取失败时抛出 OSError"""
+    hasher = new_hasher(algorithm)
+    with open(filepath, 'rb', buffering=0) as f:
+        hash_file_range(hasher, f, block_size=block_size, stop_check=stop_check)
+    return hasher.hexdigest()
+
+
+def sample_hash_file(filepath: str, algorithm: str, sample_size_mb: int = DEFAULT_SAMPLE_SIZE_MB,
+                     block_size: int = DEFAULT_READ_BLOCK_SIZE,
+                     stop_check: Optional[Callable[[], None]] = None) -> Tuple[str, int]:
+    """计算视频采样哈希：小文件读取全部，大文件读取开头、中间、结尾三段，读取失败时抛出 OSError
+
+    Returns:
+        (采样哈希, 实际读取的字节数)
+    """
+    hasher = new_hasher(algorithm)
+    bytes_read = 0
+    with open(filepath, 'rb', buffering=0) as f:
+        file_size = os.fstat(f.fileno()).st_size
+        sample_bytes = sample_size_mb * 1024 * 1024
+        if file_size <= sample_bytes:
+            bytes_read += hash_file_range(hasher, f, file_size=file_size, block_size=block_size,
+                                          stop_check=stop_check)
+        else:
+            region_length = sample_bytes // (3 * SAMPLE_REGION_ALIGNMENT) * SAMPLE_REGION_ALIGNMENT
+            for offset in (0, file_size // 2 - (sample_bytes // 6), max(0, file_size - (sample_bytes // 3))):
+                if stop_check:
+                    stop_check()
+                bytes_read += hash_file_range(hasher, f, offset, region_length, file_size=file_size,
+                                              block_size=block_size)
+    return hasher.hexdigest(), bytes_read
+
+
+class TieredHasher:
+    """分级哈希器：先比较首尾块的部分哈希，只有部分哈希仍然碰撞的文件才计算完整哈希
+
+    同一大小桶内需要完整哈希的文件会被同步（lockstep）读取：每轮从每个文件读取一块，
+    内容分叉后唯一的文件立即停止读取，因此大部分不重复的文件不会被完整读取。
+    """
+
+    def __init__(self, partial_block_size: int = DEFAULT_PARTIAL_BLOCK_SIZE,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 stop_check: Optional[Callable[[], None]] = None,
+                 log_callback: Optional[Callable[[str, str], None]] = None,
+                 algorithm: Optional[str] = None,
+                 read_block_size: int = DEFAULT_READ_BLOCK_SIZE,
+                 max_lockstep_files: int = MAX_LOCKSTEP_FILES):
+        self.algorithm = resolve_hash_algorithm(algorithm, log_callback)
+        self.partial_block_size = max(MIN_PARTIAL_BLOCK_SIZE, min(partial_block_size, MAX_PARTIAL_BLOCK_SIZE))
+        self.chunk_size = chunk_size  # 同步比较时的块大小，较小的块能更早发现内容分叉
+        self.read_block_size = clamp_read_block_size(read_block_size)
+        # 同步比较时最多同时打开的文件数，超过时逐个计算完整哈希
+        self.max_lockstep_files = max(1, max_lockstep_files)
+        self.stop_check = stop_check
+        self.log_callback = log_callback
+        self.bytes_read = 0
+        self.bytes_avoided = defaultdict(int)  # 各级避免读取的字节数
+        # 本次新计算出的哈希，供调用方写回缓存
+        self.computed_partial: Dict[str, str] = {}
+        self.computed_full: Dict[str, str] = {}
+
+    def _log(self, message: str, level: str = "INFO"):
+        if self.log_callback:
+            self.log_callback(message, level)
+
+    def _check_stop(self):
+        if self.stop_check:
+            self.stop_check()
+
+    def calculate_full_hash(self, filepath: str) -> Optional[str]:
+        """计算文件完整内容哈希"""
+        hasher = new_hasher(self.algorithm)
+        try:
+            with open(filepath, 'rb', buffering=0) as f:
+                self.bytes_read += hash_file_range(hasher, f, block_size=self.read_block_size,
+                                                   stop_check=self.stop_check)
+            return hasher.hexdigest()
+        except (OSError, ValueError) as e:
+            self._log(f"计算内容哈希失败 {filepath}: {e}", "ERROR")
+            return None
+
+    def calculate_partial_hash(self, filepath: str, file_size: int) -> Optional[str]:
+        """计算文件首尾块的部分哈希
+
+        文件不超过两个块时直接读取全部内容，此时部分哈希就是完整哈希。
+        """
+        block = self.partial_block_size
+        if file_size <= 2 * block:
+            return self.calculate_full_hash(filepath)
+
+        hasher = new_hasher(self.algorithm)
+        hasher.update(file_size.to_bytes(8, 'little'))
+        try:
+            with open(filepath, 'rb', buffering=0) as f:
+                self.bytes_read += update_from_file(hasher, f, block, block)
+                f.seek(file_size - block)
+                self.bytes_read += update_from_file(hasher, f, block, block)
+            return hasher.hexdigest()
+        except (OSError, ValueError) as e:
+            self._log(f"计算部分哈希失败 {filepath}: {e}", "ERROR")
+            return None
+
+    def hash_bucket(self, paths: List[str], file_size: int,
+                    known_partial: Optional[Dict[str, str]] = None,
+                    known_full: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        """对同一大小桶内的文件做分级哈希
+
+        Args:
+            known_partial: 已知的部分哈希（例如来自缓存），这些文件不再读取首尾块
+            known_full: 已知的完整哈希，这些文件不再完整读取
+
+        Returns:
+            {路径: 完整哈希}，只包含确认与桶内其他文件内容完全相同的文件
+        """
+        if len(paths) < 2:
+            return {}
+        known_partial = known_partial or {}
+        known_full = known_full or {}
+
+        partial_groups: Dict[str, List[str]] = defaultdict(list)
+        for path in paths:
+            self._check_stop()
+            partial_hash = known_partial.get(path)
+            if partial_hash is None:
+                partial_hash = self.calculate_partial_hash(path, file_size)
+                if partial_hash:
+                    self.computed_partial[path] = partial_hash
+            if partial_hash:
+                partial_groups[partial_hash].append(path)
+
+        full_hashes: Dict[str, str] = {}
+        for partial_hash, members in partial_groups.items():
+            if len(members) < 2:
+                # 首尾块已经不同，完全不需要读取剩余部分
+                self.bytes_avoided['partial_hash'] += max(0, file_size - 2 * self.partial_block_size)
+                continue
+            if file_size <= 2 * self.partial_block_size:
+                # 小文件的部分哈希本身就是完整哈希
+                for path in members:
+                    full_hashes[path] = partial_hash
+                continue
+            full_hashes.update(self._resolve_full_hashes(members, file_size, known_full))
+        return full_hashes
+
+    def _resolve_full_hashes(self, members: List[str], file_size: int,
+                             known_full: Dict[str, str]) -> Dict[str, str]:
+        """为部分哈希相同的一组文件确认完整哈希，已知完整哈希的文件不再读取"""
+        resolved = {path: known_full[path] for path in members if path in known_full}
+        unknown = [path for path in members if path not in known_full]
+        representatives = {}
+
+        if unknown:
+            # 每个已知哈希只取一个代表文件参与同步读取，未知文件与代表文件相同即可确认
+            for path, digest in resolved.items():
+                representatives.setdefault(digest, path)
+            unknown_set = set(unknown)
+            lockstep_results = self._lockstep_full_hashes(unknown + list(representatives.values()), file_size)
+            computed = {path: digest for path, digest in lockstep_results.items() if path in unknown_set}
+            self.computed_full.update(computed)
+            resolved.update(computed)
+
+        skipped_known = len(members) - len(unknown) - len(representatives)
+        self.bytes_avoided['known_full_hash'] += skipped_known * file_size
+
+        counts: Dict[str, int] = defaultdict(int)
+        for digest in resolved.values():
+            counts[digest] += 1
+        return {path: digest for path, digest in resolved.items() if counts[digest] > 1}
+
+    def _lockstep_full_hashes(self, paths: List[str], file_size: int) -> Dict[str, str]:
+        """同步读取一组同大小文件，只为读到末尾仍内容相同的文件返回完整哈希
+
+        文件数超过 max_lockstep_files，或打开文件时进程的文件描述符已用完 (EMFILE/ENFILE) 时，
+        改为逐个计算完整哈希，结果相同，只是不能提前停止读取。
+        """
+        if len(paths) > self.max_lockstep_files:
+            return self._sequential_full_hashes(paths)
+
+        handles = {}
+        results: Dict[str, str] = {}
+        try:
+            for path in paths:
+                try:
+                    handles[path] = open(path, 'rb')
+                except OSError as e:
+                    if e.errno in (errno.EMFILE, errno.ENFILE):
+                        self._log(f"打开的文件过多，改为逐个计算完整哈希: {e}", "WARNING")
+                        for handle in handles.values():
+                            handle.close()
+                        handles = {}
+                        return self._sequential_full_hashes(paths)
+                    self._log(f"计算内容哈希失败 {path}: {e}", "ERROR")
+
+            # 每个文件一个预先分配的缓冲区，readinto 直接读入，比较和哈希都使用缓冲区的视图，不复制数据
+            buffers = {path: bytearray(self.chunk_size) for path in handles}
+            views = {path: memoryview(buffer) for path, buffer in buffers.items()}
+            # 同一组内的文件到目前为止内容完全相同，所以每组只需维护一个哈希状态
+            groups = [(list(handles), new_hasher(self.algorithm))]
+            position = 0
+            while groups:
+                self._check_stop()
+                next_groups = []
+                for members, hasher in groups:
+                    # [(代表文件, 读到的字节数, 本块内容与代表文件相同的文件)]
+                    chunks: List[Tuple[str, int, List[str]]] = []
+                    for path in members:
+                        try:
+                            length = handles[path].readinto(buffers[path])
+                        except OSError as e:
+                            self._log(f"计算内容哈希失败 {path}: {e}", "ERROR")
+                            continue
+                        self.bytes_read += length
+                        view = views[path]
+                        for representative, representative_length, same_members in chunks:
+                            # bytearray 与视图比较直接按内存比较；只有末尾不足一块时才复制这一小段
+                            if representative_length == length and (
+                                    buffers[representative] == view if length == self.chunk_size
+                                    else buffers[representative][:length] == view[:length]):
+                                same_members.append(path)
+                                break
+                        else:
+                            chunks.append((path, length, [path]))
+
+                    for representative, length, same_members in chunks:
+                        if len(same_members) < 2:
+                            self.bytes_avoided['lockstep'] += max(0, file_size - position - length)
+                            continue
+                        if not length:
+                            digest = hasher.hexdigest()
+                            for path in same_members:
+                                results[path] = digest
+                            continue
+                        sub_hasher = hasher.copy() if len(chunks) > 1 else hasher
+                        sub_hasher.update(views[representative][:length])
+                        next_groups.append((same_members, sub_hasher))
+                position += self.chunk_size
+                groups = next_groups
+        finally:
+            for handle in handles.values():
+                handle.close()
+        return results
+
+    def _sequential_full_hashes(self, paths: List[str]) -> Dict[str, str]:
+        """逐个计算完整哈希（同一时间只打开一个文件），只返回内容与其他文件相同的文件"""
+        digests: Dict[str, List[str]] = defaultdict(list)
+        for path in paths:
+            digest = self.calculate_full_hash(path)
+            if digest:
+                digests[digest].append(path)
+        return {path: digest for digest, members in digests.items() if len(members) > 1 for path in members}
+
+
+class ContentHashEngine:
+    """按大小分桶的分级内容哈希引擎，增强版查找器和旧版 file_find_duplicates 共用
+
+    每个大小桶交给一个 TieredHasher 处理（首尾块部分哈希 -> 同步完整哈希）。各桶互相独立，
+    workers 大于 1 时在线程池中并行处理，结果仍按输入顺序逐桶产生，与工作数无关。
+    提供 metadata_cache 时，hash_files 复用未变化文件已缓存的部分/完整哈希，并把新计算的哈希写回缓存。
+    """
+
+    def __init__(self, algorithm: Optional[str] = None, workers: int = 1, metadata_cache: Any = None,
+                 stop_check: Optional[Callable[[], None]] = None,
+                 log_callback: Optional[Callable[[str, str], None]] = None, **hasher_options):
+        self.algorithm = resolve_hash_algorithm(algorithm, log_callback)
+        self.workers = max(1, int(workers or 1))
+        self.metadata_cache = metadata_cache
+        self.stop_check = stop_check
+        self.log_callback = log_callback
+        self.hasher_options = hasher_options  # 传给 TieredHasher 的其他参数（块大小等）
+        # 同时处理的 workers 个桶平分同步比较的文件数预算，合计打开的文件数不超过 lockstep_handle_budget()
+        self.hasher_options.setdefault('max_lockstep_files',
+                                       min(MAX_LOCKSTEP_FILES, lockstep_handle_budget() // self.workers))
+        self.bytes_read = 0
+        self.bytes_avoided = defaultdict(int)
+
+    def _check_stop(self):
+        if self.stop_check:
+            self.stop_check()
+
+    def _hash_bucket(self, size: int, paths: List[str], known_partial: Dict[str, str],
+                     known_full: Dict[str, str]) -> Tuple[TieredHasher, Dict[str, str]]:
+        hasher = TieredHasher(stop_check=self.stop_check, log_callback=self.log_callback, algorithm=self.algorithm,
+                              **self.hasher_options)
+        return hasher, hasher.hash_bucket(paths, size, known_partial=known_partial, known_full=known_full)
+
+    def iter_buckets(self, buckets: Iterable[Tuple[int, List[str]]],
+                     known_partial: Optional[Dict[str, str]] = None,
+                     known_full: Optional[Dict[str, str]] = None
+                     ) -> Iterator[Tuple[int, List[str], TieredHasher, Dict[str, str]]]:
+        """逐桶哈希，只有一个文件的桶直接跳过
+
+        Yields:
+            (文件大小, 桶内路径, 处理该桶的 TieredHasher, {路径: 完整哈希})；
+            完整哈希只包含与桶内其他文件内容完全相同的文件，hasher 上有读取量和新计算的哈希
+        """
+        known_partial = known_partial or {}
+        known_full = known_full or {}
+        buckets = [(size, paths) for size, paths in buckets if len(paths) > 1]
+
+        executor = None
+        pending = deque()
+        if self.workers > 1 and len(buckets) > 1:
+            executor = ThreadPoolExecutor(max_workers=self.workers)
+        submitted = 0
+
+        def submit_next():
+            nonlocal submitted
+            size, paths = buckets[submitted]
+            pending.append(executor.submit(self._hash_bucket, size, paths, known_partial, known_full))
+            submitted += 1
+
+        try:
+            for size, paths in buckets:
+                self._check_stop()
+                if executor:
+                    # 最多领先调用方 workers * 2 个桶，已完成的结果不会在一个慢桶后面无限堆积
+                    while submitted < len(buckets) and len(pending) < self.workers * 2:
+                        submit_next()
+                    hasher, full_hashes = pending.popleft().result()
+                else:
+                    hasher, full_hashes = self._hash_bucket(size, paths, known_partial, known_full)
+                self.bytes_read += hasher.bytes_read
+                for stage, num_bytes in hasher.bytes_avoided.items():
+                    self.bytes_avoided[stage] += num_bytes
+                yield size, paths, hasher, full_hashes
+        finally:
+            # 中止或调用方不再迭代时取消尚未开始的桶
+            for future in pending:
+                future.cancel()
+            if executor:
+                executor.shutdown(wait=True)
+
+    def hash_files(self, entries: Iterable[tuple]) -> Dict[str, str]:
+        """对一批文件按大小分桶做分级哈希
+
+        Args:
+            entries: (路径, 大小) 或 (路径, 大小, device, inode, mtime_ns)；
+                提供后三项且设置了 metadata_cache 时才使用缓存
+
+        Returns:
+            {路径: 完整哈希}，只包含存在内容完全相同的其他文件的路径
+        """
+        buckets: Dict[int, List[str]] = defaultdict(list)
+        cache_keys: Dict[str, tuple] = {}
+        for entry in entries:
+            path, size = entry[0], entry[1]
+            buckets[size].append(path)
+            if self.metadata_cache is not None and len(entry) >= 5 and entry[4] is not None:
+                # 与增强版查找器的缓存键一致: (绝对路径, device, inode, size, mtime_ns, 哈希算法)
+                cache_keys[path] = (os.path.abspath(path), entry[2], entry[3], size, entry[4], self.algorithm)
+
+        known_partial: Dict[str, str] = {}
+        known_full: Dict[str, str] = {}
+        for paths in buckets.values():
+            if len(paths) < 2:
+                continue
+            for path in paths:
+                record = self.metadata_cache.get(*cache_keys[path]) if path in cache_keys else None
+                if record:
+                    if record['partial_hash']:
+                        known_partial[path] = record['partial_hash']
+                    if record['content_hash']:
+                        known_full[path] = record['content_hash']
+
+        full_hashes: Dict[str, str] = {}
+        for _, paths, hasher, bucket_hashes in self.iter_buckets(buckets.items(), known_partial, known_full):
+            full_hashes.update(bucket_hashes)
+            for path in paths:
+                fields = {}
+                if path in hasher.computed_partial:
+                    fields['partial_hash'] = hasher.computed_partial[path]
+                if path in hasher.computed_full:
+                    fields['content_hash'] = hasher.computed_full[path]
+                if fields and path in cache_keys:
+                    self.metadata_cache.put(*cache_keys[path], **fields)
+        return full_hashes
+
+
+def hash_files_tiered(paths_with_sizes: List[tuple], workers: int = 1, metadata_cache: Any = None,
+                      **hasher_kwargs) -> Dict[str, str]:
+    """按大小分桶后对文件做分级哈希（ContentHashEngine.hash_files 的简便写法）
+
+    Args:
+        paths_with_sizes: [(路径, 文件大小), ...]，也可以是带 device、inode、mtime_ns 的五元组
+
+    Returns:
+        {路径: 完整哈希}，只包含存在内容完全相同的其他文件的路径
+    """
+    return ContentHashEngine(workers=workers, metadata_cache=metadata_cache, **hasher_kwargs).hash_files(paths_with_sizes)
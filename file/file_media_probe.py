@@ -0,0 +1,131 @@
+import sys
+import time
+import asyncio
+import subprocess
+from typing import Callable, Iterable, List, NamedTuple, Optional
+
+# 同时运行的 ffprobe 进程数上限；ffprobe 大部分时间在等待读取文件头，并发数可以高于 CPU 核心数
+DEFAULT_PROBE_CONCURRENCY = 8
+# 单个 ffprobe 进程的超时时间（秒），损坏的文件可能使 ffprobe 长时间无响应
+DEFAULT_PROBE_TIMEOUT = 30.0
+# 批量探测时检查停止信号的间隔（秒）
+STOP_POLL_INTERVAL = 0.2
+
+DURATION_ARGS = ("-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1")
+
+
+def no_window_kwargs() -> dict:
+    """Windows 上不为子进程弹出控制台窗口；其他平台没有 CREATE_NO_WINDOW，返回空参数"""
+    if sys.platform == "win32":
+        return {"creationflags": subprocess.CREATE_NO_WINDOW}
+    return {}
+
+
+class ProbeResult(NamedTuple):
+    """一次 ffprobe 的结果：成功时 duration 为秒数，失败时 duration 为 None、error 为原因"""
+    path: str
+    duration: Optional[float]
+    error: Optional[str]
+    seconds: float  # 进程运行耗时，不含等待并发名额的时间
+    timed_out: bool = False
+    stderr: str = ""  # 成功时 ffprobe 仍可能输出的错误信息（例如文件部分损坏），由调用方决定是否视为失败
+
+
+class MediaProbeRunner:
+    """基于 asyncio 子进程的 ffprobe 执行器，用于批量读取视频时长
+
+    同时最多运行 concurrency 个 ffprobe 进程，超过 timeout 秒仍未结束的进程会被杀死并记为失败；
+    停止信号（stop_check 抛出的异常）中止批量探测或任务被取消时，正在运行的进程同样被杀死并回收。
+    每次调用 probe / probe_many 都在当前线程中运行一个独立的事件循环，可以在任意线程（包括线程池）中使用。
+    """
+
+    def __init__(self, ffprobe_path: str, concurrency: int = DEFAULT_PROBE_CONCURRENCY,
+                 timeout: Optional[float] = DEFAULT_PROBE_TIMEOUT,
+                 stop_check: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            concurrency: 同时运行的 ffprobe 进程数，为 1 时逐个探测
+            timeout: 单个进程的超时时间（秒），None 表示不限制
+            stop_check: 批量探测期间定期调用，抛出异常即中止（例如查找器的停止检查）
+        """
+        self.ffprobe_path = ffprobe_path
+        self.concurrency = max(1, int(concurrency or 1))
+        self.timeout = timeout
+        self.stop_check = stop_check
+
+    def probe(self, path: str) -> ProbeResult:
+        """读取单个文件的时长"""
+        return asyncio.run(self._probe(path))
+
+    def probe_many(self, paths: Iterable[str]) -> List[ProbeResult]:
+        """并发读取多个文件的时长，按输入顺序返回结果"""
+        paths = list(paths)
+        if not paths:
+            return []
+        return asyncio.run(self._probe_all(paths))
+
+    async def _probe_all(self, paths: List[str]) -> List[ProbeResult]:
+        results: List[Optional[ProbeResult]] = [None] * len(paths)
+        indexes = iter(range(len(paths)))
+
+        async def worker():
+            # 各工作协程共用一个下标迭代器，同时运行的进程数即为工作协程数
+            for index in indexes:
+                results[index] = await self._probe(paths[index])
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(min(self.concurrency, len(paths)))]
+        poll_interval = STOP_POLL_INTERVAL if self.stop_check else None
+        try:
+            pending = set(workers)
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=poll_interval,
+                                                   return_when=asyncio.FIRST_EXCEPTION)
+                for task in done:
+                    task.result()
+                if self.stop_check:
+                    self.stop_check()
+        finally:
+            # 中止或出错时取消其余工作协程，它们正在等待的进程在 _probe 中被杀死
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        return results
+
+    async def _probe(self, path: str) -> ProbeResult:
+        start = time.perf_counter()
+        try:
+            process = await asyncio.create_subprocess_exec(
+                self.ffprobe_path, *DURATION_ARGS, str(path),
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, **no_window_kwargs())
+        except OSError as e:
+            return ProbeResult(path, None, f"无法启动 ffprobe: {e}", time.perf_counter() - start)
+
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), self.timeout)
+        except asyncio.TimeoutError:
+            await self._kill(process)
+            return ProbeResult(path, None, f"ffprobe 超过 {self.timeout:g} 秒未结束，已终止",
+                               time.perf_counter() - start, timed_out=True)
+        except BaseException:
+            # 被取消（停止扫描）时不留下仍在运行的 ffprobe
+            await self._kill(process)
+            raise
+
+        seconds = time.perf_counter() - start
+        output = stdout.decode(errors='replace').strip()
+        if process.returncode != 0:
+            message = stderr.decode(errors='replace').strip() or f"退出码 {process.returncode}"
+            return ProbeResult(path, None, message, seconds)
+        try:
+            return ProbeResult(path, float(output), None, seconds, stderr=stderr.decode(errors='replace').strip())
+        except ValueError:
+            return ProbeResult(path, None, f"无法解析时长: {output!r}", seconds)
+
+    @staticmethod
+    async def _kill(process: asyncio.subprocess.Process):
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
@@ -0,0 +1,240 @@
+import os
+import sys
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+# 与 gui_app/config_manager.py 的配置文件放在同一目录下
+CACHE_DIR_NAME = ".ToolboxApp"
+CACHE_FILE_NAME = "metadata_cache.sqlite3"
+
+# 版本不同时清空重建：第 2 版按哈希算法区分记录，第 3 版起感知哈希改用快速路径计算，与旧记录不可比较
+SCHEMA_VERSION = 3
+
+# 内存中累积的写入达到该条数时自动提交，未配置断点的长时间扫描也不会无限占用内存
+AUTO_FLUSH_ROWS = 5000
+
+# 缓存的元数据字段，与 FileMetadata 中需要读取文件内容才能得到的字段对应
+CACHED_FIELDS = ('duration', 'content_hash', 'sample_hash', 'perceptual_hash', 'partial_hash')
+
+
+def default_cache_path() -> str:
+    """获取默认缓存文件路径 (~/.ToolboxApp/metadata_cache.sqlite3)"""
+    cache_dir = os.path.join(os.path.expanduser("~"), CACHE_DIR_NAME)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError:
+        cache_dir = os.path.join(os.getcwd(), CACHE_DIR_NAME)
+        os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, CACHE_FILE_NAME)
+
+
+class MetadataCache:
+    """基于 SQLite 的文件元数据缓存，用于增量重复扫描
+
+    以 (device, inode, path, size, mtime_ns) 作为有效性键：路径对应的文件只要这几项没变，
+    就直接返回上次计算的哈希和时长，不再读取文件内容。
+    每条记录同时保存计算哈希所用的算法，算法不同的记录视为未命中，避免比较不同算法的哈希。
+    """
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or default_cache_path()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._init_schema()
+        self._pending: Dict[str, tuple] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _init_schema(self):
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self._conn.execute("DROP TABLE IF EXISTS file_metadata")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS file_metadata (
+                path TEXT PRIMARY KEY,
+                device INTEGER NOT NULL,
+                inode INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                hash_algorithm TEXT NOT NULL,
+                extracted INTEGER NOT NULL DEFAULT 0,
+                duration REAL,
+                content_hash TEXT,
+                sample_hash TEXT,
+                perceptual_hash TEXT,
+                partial_hash TEXT,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._conn.commit()
+
+    @property
+    def hit_rate(self) -> float:
+        """本次会话的缓存命中率"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, path: str, device: int, inode: int, size: int, mtime_ns: int,
+            hash_algorithm: str) -> Optional[Dict]:
+        """查询缓存，文件已变化、哈希算法不同或没有记录时返回 None"""
+        with self._lock:
+            pending = self._pending.get(path)
+            if pending is not None:
+                row = pending
+            else:
+                row = self._conn.execute(
+                    "SELECT device, inode, size, mtime_ns, hash_algorithm, extracted, duration, content_hash, "
+                    "sample_hash, perceptual_hash, partial_hash FROM file_metadata WHERE path = ?",
+                    (path,)
+                ).fetchone()
+            if row is None or tuple(row[:5]) != (device, inode, size, mtime_ns, hash_algorithm):
+                self.misses += 1
+                return None
+            self.hits += 1
+        record = dict(zip(CACHED_FIELDS, row[6:]))
+        record['extracted'] = bool(row[5])
+        return record
+
+    def put(self, path: str, device: int, inode: int, size: int, mtime_ns: int,
+            hash_algorithm: str, extracted: Optional[bool] = None, **fields):
+        """写入或更新一条记录，未提供的字段保留原值（文件或哈希算法变化时清空）
+
+        写入先进入内存队列，累积到 AUTO_FLUSH_ROWS 条或调用 flush() 时批量落盘。
+        """
+        if device is None or mtime_ns is None:
+            return
+        unknown = set(fields) - set(CACHED_FIELDS)
+        if unknown:
+            raise ValueError(f"未知的缓存字段: {', '.join(sorted(unknown))}")
+
+        with self._lock:
+            current = self._pending.get(path)
+            if current is None:
+                current = self._conn.execute(
+                    "SELECT device, inode, size, mtime_ns, hash_algorithm, extracted, duration, content_hash, "
+                    "sample_hash, perceptual_hash, partial_hash FROM file_metadata WHERE path = ?",
+                    (path,)
+                ).fetchone()
+            key = (device, inode, size, mtime_ns, hash_algorithm)
+            if current is None or tuple(current[:5]) != key:
+                current = key + (0,) + (None,) * len(CACHED_FIELDS)
+
+            values = dict(zip(CACHED_FIELDS, current[6:]))
+            values.update(fields)
+            extracted_flag = current[5] if extracted is None else int(extracted)
+            self._pending[path] = key + (extracted_flag,) + tuple(
+                values[name] for name in CACHED_FIELDS)
+            if len(self._pending) >= AUTO_FLUSH_ROWS:
+                self._flush_pending()
+
+    def flush(self):
+        """把内存中的写入批量提交到数据库"""
+        with self._lock:
+            self._flush_pending()
+
+    def _flush_pending(self):
+        """提交内存队列中的写入，调用方需持有 self._lock"""
+        if not self._pending:
+            return
+        now = time.time()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO file_metadata (path, device, inode, size, mtime_ns, hash_algorithm, "
+            "extracted, duration, content_hash, sample_hash, perceptual_hash, partial_hash, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(path,) + row + (now,) for path, row in self._pending.items()]
+        )
+        self._conn.commit()
+        self._pending.clear()
+
+    def invalidate(self, path_prefix: Optional[str] = None) -> int:
+        """删除缓存记录，不提供前缀时清空全部
+
+        Returns:
+            删除的记录数
+        """
+        self.flush()
+        with self._lock:
+            if path_prefix is None:
+                cursor = self._conn.execute("DELETE FROM file_metadata")
+            else:
+                prefix = os.path.join(os.path.abspath(path_prefix), "")
+                escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                cursor = self._conn.execute(
+                    "DELETE FROM file_metadata WHERE path LIKE ? ESCAPE '\\'", (escaped + "%",))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def vacuum(self) -> int:
+        """清理已删除或已变化文件的记录，并压缩数据库文件
+
+        Returns:
+            清理掉的记录数
+        """
+        self.flush()
+        with self._lock:
+            stale = []
+            for path, device, inode, size, mtime_ns in self._conn.execute(
+                    "SELECT path, device, inode, size, mtime_ns FROM file_metadata"):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    stale.append((path,))
+                    continue
+                if (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns) != (device, inode, size, mtime_ns):
+                    stale.append((path,))
+            self._conn.executemany("DELETE FROM file_metadata WHERE path = ?", stale)
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+            return len(stale)
+
+    def count(self) -> int:
+        """缓存中的记录数"""
+        self.flush()
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM file_metadata").fetchone()[0]
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def _main(argv: Iterable[str]):
+    """命令行入口: python -m file.file_metadata_cache [stats|invalidate [路径前缀]|vacuum]"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="重复文件查找元数据缓存管理")
+    parser.add_argument("--db", help="缓存数据库路径，默认为 ~/.ToolboxApp/metadata_cache.sqlite3")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="显示缓存记录数和文件大小")
+    invalidate_parser = sub.add_parser("invalidate", help="删除缓存记录")
+    invalidate_parser.add_argument("prefix", nargs="?", help="只删除该目录下的记录")
+    sub.add_parser("vacuum", help="清理失效记录并压缩数据库")
+    args = parser.parse_args(list(argv))
+
+    with MetadataCache(args.db) as cache:
+        if args.command == "stats":
+            print(f"缓存文件: {cache.db_path}")
+            print(f"记录数: {cache.count()}")
+            print(f"文件大小: {os.path.getsize(cache.db_path)} bytes")
+        elif args.command == "invalidate":
+            removed = cache.invalidate(args.prefix)
+            print(f"已删除 {removed} 条缓存记录。")
+        elif args.command == "vacuum":
+            removed = cache.vacuum()
+            print(f"已清理 {removed} 条失效记录。")
+
+
+if __name__ == "__main__":
+    _main(sys.argv[1:])
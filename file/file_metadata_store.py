@@ -0,0 +1,191 @@
+import os
+import sys
+import math
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from .file_hashing import new_hasher
+from .file_similarity import normalize_filename
+
+# 感知哈希固定为 64 位（imagehash 默认 8x8），以 16 位十六进制字符串对外表示
+PHASH_HEX_DIGITS = 16
+
+# 每行的状态位
+_HAS_STAT = 1
+_HAS_DURATION = 2
+_HAS_CONTENT_HASH = 4
+_HAS_SAMPLE_HASH = 8
+_HAS_PERCEPTUAL_HASH = 16
+
+
+@dataclass
+class FileMetadata:
+    """文件元数据"""
+    path: str
+    size: int
+    duration: Optional[float] = None  # 视频时长（秒）
+    content_hash: Optional[str] = None  # 内容哈希
+    sample_hash: Optional[str] = None  # 采样哈希（用于视频）
+    perceptual_hash: Optional[str] = None  # 感知哈希（用于图片）
+    filename_normalized: Optional[str] = None  # 标准化文件名
+    device: Optional[int] = None  # 所在设备 (st_dev)
+    inode: Optional[int] = None  # inode 编号 (st_ino)
+    mtime_ns: Optional[int] = None  # 修改时间（纳秒）
+    hash_algorithm: Optional[str] = None  # 内容/采样哈希使用的算法
+
+
+class FileMetadataStore:
+    """按列存储的文件元数据，用于百万级文件的扫描
+
+    每个字段是一列紧凑数组：目录路径只保存一份（路径表），文件名以 UTF-8 连续存放，大小、inode 等使用 array，
+    内容/采样哈希保存为定长二进制摘要，感知哈希保存为 64 位整数。
+    通过下标访问时才按需创建 FileMetadata 视图对象；视图是副本，修改后需调用 update() 写回。
+    """
+
+    def __init__(self, hash_algorithm: str):
+        self.hash_algorithm = hash_algorithm
+        self.digest_size = new_hasher(hash_algorithm).digest_size
+        self._dir_ids: Dict[str, int] = {}
+        self._dirs: List[str] = []
+        self._dir_index = array('I')
+        # 文件名连续存放在一个字节数组中，第 i 个文件名为 _names[_name_offsets[i]:_name_offsets[i + 1]]
+        self._names = bytearray()
+        self._name_offsets = array('Q', [0])
+        self.sizes = array('q')
+        self._devices = array('Q')
+        self._inodes = array('Q')
+        self._mtimes = array('q')
+        self._durations = array('d')
+        self._phashes = array('Q')
+        self._content_hashes = bytearray()
+        self._sample_hashes = bytearray()
+        self._flags = bytearray()
+
+    def __len__(self) -> int:
+        return len(self._flags)
+
+    def __getitem__(self, index: int) -> FileMetadata:
+        """创建第 index 行的 FileMetadata 视图"""
+        flags = self._flags[index]
+        path = self.path(index)
+        has_stat = flags & _HAS_STAT
+        return FileMetadata(
+            path=path,
+            size=self.sizes[index],
+            duration=self._durations[index] if flags & _HAS_DURATION else None,
+            content_hash=self._digest_hex(self._content_hashes, index) if flags & _HAS_CONTENT_HASH else None,
+            sample_hash=self._digest_hex(self._sample_hashes, index) if flags & _HAS_SAMPLE_HASH else None,
+            perceptual_hash=(format(self._phashes[index], f'0{PHASH_HEX_DIGITS}x')
+                             if flags & _HAS_PERCEPTUAL_HASH else None),
+            filename_normalized=normalize_filename(path),
+            device=self._devices[index] if has_stat else None,
+            inode=self._inodes[index] if has_stat else None,
+            mtime_ns=self._mtimes[index] if has_stat else None,
+            hash_algorithm=self.hash_algorithm,
+        )
+
+    def __iter__(self) -> Iterator[FileMetadata]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def name(self, index: int) -> str:
+        """文件名（不含目录）"""
+        # surrogatepass 保证无法用 UTF-8 表示的文件名（surrogateescape 解码而来）也能原样还原
+        return self._names[self._name_offsets[index]:self._name_offsets[index + 1]].decode('utf-8', 'surrogatepass')
+
+    def path(self, index: int) -> str:
+        return os.path.join(self._dirs[self._dir_index[index]], self.name(index))
+
+    def device(self, index: int) -> Optional[int]:
+        return self._devices[index] if self._flags[index] & _HAS_STAT else None
+
+    def inode(self, index: int) -> Optional[int]:
+        return self._inodes[index] if self._flags[index] & _HAS_STAT else None
+
+    def extension(self, index: int) -> str:
+        """小写扩展名（含点），与 Path.suffix.lower() 一致"""
+        name = self.name(index)
+        dot = name.rfind('.')
+        return name[dot:].lower() if 0 < dot < len(name) - 1 else ''
+
+    def append(self, path: str, size: int, device: Optional[int] = None, inode: Optional[int] = None,
+               mtime_ns: Optional[int] = None) -> int:
+        """追加一行只含 stat 信息的记录，返回行号"""
+        directory, name = os.path.split(path)
+        dir_id = self._dir_ids.get(directory)
+        if dir_id is None:
+            dir_id = self._dir_ids[directory] = len(self._dirs)
+            self._dirs.append(sys.intern(directory))
+        self._dir_index.append(dir_id)
+        self._names.extend(name.encode('utf-8', 'surrogatepass'))
+        self._name_offsets.append(len(self._names))
+        self.sizes.append(size)
+        has_stat = device is not None and inode is not None and mtime_ns is not None
+        self._devices.append(device if has_stat else 0)
+        self._inodes.append(inode if has_stat else 0)
+        self._mtimes.append(mtime_ns if has_stat else 0)
+        self._durations.append(0.0)
+        self._phashes.append(0)
+        self._content_hashes.extend(bytes(self.digest_size))
+        self._sample_hashes.extend(bytes(self.digest_size))
+        self._flags.append(_HAS_STAT if has_stat else 0)
+        return len(self._flags) - 1
+
+    def append_metadata(self, metadata: FileMetadata) -> int:
+        """追加一个 FileMetadata，返回行号"""
+        index = self.append(metadata.path, metadata.size, metadata.device, metadata.inode, metadata.mtime_ns)
+        self.update(index, metadata)
+        return index
+
+    def update(self, index: int, metadata: FileMetadata):
+        """把视图上的时长和哈希写回第 index 行"""
+        flags = self._flags[index] & _HAS_STAT
+        if metadata.duration is not None and not math.isnan(metadata.duration):
+            self._durations[index] = metadata.duration
+            flags |= _HAS_DURATION
+        if metadata.content_hash:
+            self._set_digest(self._content_hashes, index, metadata.content_hash)
+            flags |= _HAS_CONTENT_HASH
+        if metadata.sample_hash:
+            self._set_digest(self._sample_hashes, index, metadata.sample_hash)
+            flags |= _HAS_SAMPLE_HASH
+        if metadata.perceptual_hash:
+            self._phashes[index] = int(metadata.perceptual_hash, 16)
+            flags |= _HAS_PERCEPTUAL_HASH
+        self._flags[index] = flags
+
+    def set_content_hash(self, index: int, hex_digest: Optional[str]):
+        if hex_digest:
+            self._set_digest(self._content_hashes, index, hex_digest)
+            self._flags[index] |= _HAS_CONTENT_HASH
+        else:
+            self._flags[index] &= ~_HAS_CONTENT_HASH & 0xFF
+
+    def _set_digest(self, column: bytearray, index: int, hex_digest: str):
+        digest = bytes.fromhex(hex_digest)
+        if len(digest) != self.digest_size:
+            raise ValueError(f"摘要长度 {len(digest)} 与算法 {self.hash_algorithm} 的 {self.digest_size} 字节不一致")
+        start = index * self.digest_size
+        column[start:start + self.digest_size] = digest
+
+    def _digest_hex(self, column: bytearray, index: int) -> str:
+        start = index * self.digest_size
+        return column[start:start + self.digest_size].hex()
+
+    def memory_usage(self) -> int:
+        """估算占用的内存字节数（列数组和路径表）"""
+        total = sum(sys.getsizeof(column) for column in (
+            self._dir_index, self._names, self._name_offsets, self.sizes, self._devices, self._inodes,
+            self._mtimes, self._durations, self._phashes, self._content_hashes, self._sample_hashes,
+            self._flags, self._dirs))
+        total += sys.getsizeof(self._dir_ids)
+        total += sum(sys.getsizeof(directory) for directory in self._dirs)
+        return total
+
+    @classmethod
+    def from_metadata(cls, items: Iterable[FileMetadata], hash_algorithm: str) -> 'FileMetadataStore':
+        store = cls(hash_algorithm)
+        for metadata in items:
+            store.append_metadata(metadata)
+        return store
@@ -0,0 +1,91 @@
+import os
+import time
+import pickle
+import hashlib
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from .file_metadata_cache import CACHE_DIR_NAME
+
+CHECKPOINT_DIR_NAME = "scan_checkpoints"
+CHECKPOINT_VERSION = 2
+
+# 两次定期保存之间的最短间隔（秒）；阶段切换和中止时总是立即保存
+DEFAULT_CHECKPOINT_INTERVAL = 30.0
+
+
+def default_checkpoint_dir() -> str:
+    """获取默认断点目录 (~/.ToolboxApp/scan_checkpoints)"""
+    checkpoint_dir = os.path.join(os.path.expanduser("~"), CACHE_DIR_NAME, CHECKPOINT_DIR_NAME)
+    try:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+    except OSError:
+        checkpoint_dir = os.path.join(os.getcwd(), CACHE_DIR_NAME, CHECKPOINT_DIR_NAME)
+        os.makedirs(checkpoint_dir, exist_ok=True)
+    return checkpoint_dir
+
+
+def checkpoint_path_for_roots(roots: Iterable[str], checkpoint_dir: Optional[str] = None) -> str:
+    """同一组扫描目录（与顺序、写法无关）对应同一个断点文件"""
+    real_roots = sorted({os.path.normcase(os.path.realpath(root)) for root in roots})
+    digest = hashlib.sha1("\n".join(real_roots).encode('utf-8', 'surrogatepass')).hexdigest()[:16]
+    return os.path.join(checkpoint_dir or default_checkpoint_dir(), f"scan_{digest}.pickle")
+
+
+class ScanCheckpoint:
+    """长时间重复扫描的断点文件
+
+    查找器在各阶段的一致点（遍历完一个目录、提取完一批文件、哈希完一个大小桶、比较完一批文件对）
+    调用 save()，按时间间隔节流后把扫描状态整体写入磁盘；中止时立即保存，扫描完成后删除。
+    文件先写入临时文件再原子替换，崩溃时不会留下半个断点。
+
+    状态使用 pickle 保存，只应加载本机自己写入的断点文件。
+    """
+
+    def __init__(self, path: str, interval: float = DEFAULT_CHECKPOINT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._last_save = time.monotonic()
+
+    @classmethod
+    def for_roots(cls, roots: Iterable[str], interval: float = DEFAULT_CHECKPOINT_INTERVAL) -> 'ScanCheckpoint':
+        return cls(checkpoint_path_for_roots(roots), interval)
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+
+    def load(self, fingerprint: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """读取断点，文件不存在、已损坏或扫描设置不同（fingerprint 不一致）时返回 None"""
+        try:
+            with open(self.path, 'rb') as f:
+                data = pickle.load(f)
+        except Exception:
+            # 不存在、写入中途崩溃留下的损坏文件或旧版本对象，都当作没有断点
+            return None
+        if not isinstance(data, dict) or data.get('version') != CHECKPOINT_VERSION:
+            return None
+        if data.get('fingerprint') != fingerprint:
+            return None
+        return data.get('state')
+
+    def save(self, fingerprint: Dict[str, Any], build_state: Callable[[], Dict[str, Any]], force: bool = False) -> bool:
+        """距上次保存超过间隔（或 force）时调用 build_state() 并写入磁盘，返回是否实际保存"""
+        if not force and time.monotonic() - self._last_save < self.interval:
+            return False
+        data = {'version': CHECKPOINT_VERSION, 'fingerprint': fingerprint, 'saved_at': time.time(),
+                'state': build_state()}
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._last_save = time.monotonic()
+        return True
+
+    def clear(self):
+        """扫描完成或用户放弃断点时删除断点文件"""
+        for path in (self.path, f"{self.path}.tmp"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
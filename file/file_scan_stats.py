@@ -0,0 +1,138 @@
+import json
+import time
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+# 计时的阶段：walk 为列目录，stat 为读取文件信息，hash 为内容/采样哈希，phash 为图片感知哈希，
+# ffprobe 为读取视频时长，compare 为候选对评分，union_find 为合并重复组
+STAGES = ('walk', 'stat', 'hash', 'phash', 'ffprobe', 'compare', 'union_find')
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class ScanStats:
+    """一次重复文件扫描的计时与 I/O 统计
+
+    扫描线程（及其工作线程）在运行中不断更新，其他线程（如界面）随时调用 snapshot() 读取一致的副本。
+    各阶段耗时是累计值：并行提取时为各工作线程耗时之和，串行扫描时等于该阶段的实际耗时。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.monotonic()
+            self.finished_at: Optional[float] = None
+            self.stage_seconds: Dict[str, float] = defaultdict(float)
+            self.bytes_read = 0
+            self.files_walked = 0
+            self.pairs_scored = 0
+            self.ffprobe_latencies: List[float] = []
+            self.ffprobe_timeouts = 0
+            self.phase: Optional[str] = None
+            self.phase_started_at = self.started_at
+            self.phase_done = 0
+            self._phase_start_done = 0
+            self.phase_total: Optional[int] = None
+
+    def add_time(self, stage: str, seconds: float):
+        with self._lock:
+            self.stage_seconds[stage] += seconds
+
+    @contextmanager
+    def timed(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def add_bytes_read(self, num_bytes: int):
+        with self._lock:
+            self.bytes_read += num_bytes
+
+    def record_ffprobe(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.ffprobe_latencies.append(seconds)
+            self.ffprobe_timeouts += timed_out
+            self.stage_seconds['ffprobe'] += seconds
+
+    def set_files_walked(self, count: int):
+        with self._lock:
+            self.files_walked = count
+            if self.phase == 'walk':
+                self.phase_done = count
+
+    def set_pairs_scored(self, count: int):
+        with self._lock:
+            self.pairs_scored = count
+            if self.phase == 'compare':
+                self.phase_done = count
+
+    def begin_phase(self, phase: str, total: Optional[int] = None, done: int = 0):
+        """进入新的进度阶段；total 未知（遍历、比较）时不估算剩余时间"""
+        with self._lock:
+            self.phase = phase
+            self.phase_started_at = time.monotonic()
+            self.phase_done = done
+            self.phase_total = total
+            self._phase_start_done = done
+
+    def advance(self, count: int = 1):
+        with self._lock:
+            self.phase_done += count
+
+    def finish(self):
+        """标记扫描结束（重复调用时保留第一次的结束时间）"""
+        with self._lock:
+            if self.finished_at is None:
+                self.finished_at = time.monotonic()
+            self.phase = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前统计的副本（可直接序列化为 JSON）"""
+        with self._lock:
+            now = self.finished_at or time.monotonic()
+            elapsed = now - self.started_at
+            phase_elapsed = now - self.phase_started_at
+            phase_progress = self.phase_done - self._phase_start_done
+            phase_rate = phase_progress / phase_elapsed if phase_elapsed > 0 and phase_progress > 0 else None
+            eta = None
+            if self.phase_total is not None and phase_rate:
+                eta = max(0, self.phase_total - self.phase_done) / phase_rate
+            latencies = sorted(self.ffprobe_latencies)
+            return {
+                'elapsed_seconds': elapsed,
+                'finished': self.finished_at is not None,
+                'stage_seconds': {stage: self.stage_seconds.get(stage, 0.0) for stage in STAGES},
+                'bytes_read': self.bytes_read,
+                'files_walked': self.files_walked,
+                'files_per_second': self.files_walked / elapsed if elapsed > 0 else None,
+                'pairs_scored': self.pairs_scored,
+                'ffprobe': {
+                    'calls': len(latencies),
+                    'p50_seconds': _percentile(latencies, 0.50),
+                    'p90_seconds': _percentile(latencies, 0.90),
+                    'p99_seconds': _percentile(latencies, 0.99),
+                    'max_seconds': latencies[-1] if latencies else None,
+                    'timeouts': self.ffprobe_timeouts,
+                },
+                'phase': self.phase,
+                'phase_done': self.phase_done,
+                'phase_total': self.phase_total,
+                'phase_items_per_second': phase_rate,
+                'eta_seconds': eta,
+            }
+
+    def dump(self, path: str):
+        """把统计写入 JSON 文件"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
@@ -0,0 +1,207 @@
+import re
+import math
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    from rapidfuzz.distance import Indel
+except ImportError:
+    Indel = None
+
+from .file_similarity_index import phash_to_int
+
+# 感知哈希汉明距离阈值：不超过此值才计入感知哈希相似分
+PERCEPTUAL_HASH_MAX_DISTANCE = 5
+
+# 文件名相似度的两档阈值：不低于 HIGH 为高度相似，不低于 MODERATE 为中度相似
+FILENAME_HIGH_SIMILARITY = 0.9
+FILENAME_MODERATE_SIMILARITY = 0.7
+
+# 标准化文件名时依次移除的重复标记
+_NORMALIZE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'[\s_-]*copy[\s_-]*\d*$',
+    r'[\s_-]*副本[\s_-]*\d*$',
+    r'[\s_-]*\(\d+\)$',
+    r'[\s_-]*\[\d+\]$',
+    r'[\s_-]*_\d+$',
+    r'[\s_-]*-\d+$',
+)]
+_SEPARATORS = re.compile(r'[\s_-]+')
+
+# 复制标记（对小写文件名匹配），合并为一个正则
+_COPY_PATTERN = re.compile(r'(?:copy\d*|副本\d*|\(\d+\)|\[\d+\]|_\d+|-\d+|_copy|-copy)$')
+
+
+def normalize_filename(filepath: str) -> str:
+    """标准化文件名，移除常见的重复标记"""
+    filename = Path(filepath).stem.lower()
+    for pattern in _NORMALIZE_PATTERNS:
+        filename = pattern.sub('', filename)
+    # 移除多余的空格和特殊字符
+    return _SEPARATORS.sub('_', filename).strip('_')
+
+
+def has_copy_pattern(filepath: str) -> bool:
+    """检查文件名是否包含复制模式"""
+    return _COPY_PATTERN.search(Path(filepath).stem.lower()) is not None
+
+
+def _lcs_length(shorter: str, longer: str, min_length: int) -> int:
+    """最长公共子序列长度（位并行算法，每个字符一次大整数运算）
+
+    已经不可能达到 min_length 时提前结束并返回 0。
+    """
+    masks: Dict[str, int] = {}
+    bit = 1
+    for char in longer:
+        masks[char] = masks.get(char, 0) | bit
+        bit <<= 1
+    all_bits = bit - 1
+    row = all_bits  # 为 0 的位数即当前的公共子序列长度
+    remaining = len(shorter)
+    for char in shorter:
+        match = row & masks.get(char, 0)
+        row = ((row + match) | (row - match)) & all_bits
+        remaining -= 1
+        if len(longer) - row.bit_count() + remaining < min_length:
+            return 0
+    return len(longer) - row.bit_count()
+
+
+def filename_similarity(norm1: str, norm2: str, score_cutoff: float = 0.0) -> float:
+    """两个标准化文件名的相似度 (0-1)：2 * 最长公共子序列长度 / 两者长度之和
+
+    与 difflib.SequenceMatcher.ratio() 的公式相同（后者用贪心匹配的字符数近似公共子序列，结果不会更高），
+    0.9/0.7 两档阈值的含义不变。安装了 rapidfuzz 时使用其 C 实现 (Indel 距离)，否则使用纯 Python 的位并行算法；
+    两者结果完全相同。相似度低于 score_cutoff 时可能提前结束，返回 0.0。
+    """
+    if norm1 == norm2:
+        return 1.0
+    total = len(norm1) + len(norm2)
+    # 公共子序列至少要有这么长，相似度才能达到 score_cutoff
+    min_length = max(0, math.ceil(score_cutoff * total / 2 - 1e-9))
+    if min(len(norm1), len(norm2)) < min_length:
+        return 0.0
+    if Indel is not None:
+        distance = Indel.distance(norm1, norm2, score_cutoff=total - 2 * min_length)
+        lcs = (total - distance) // 2 if distance <= total - 2 * min_length else 0
+    else:
+        shorter, longer = sorted((norm1, norm2), key=len)
+        lcs = _lcs_length(shorter, longer, min_length)
+    similarity = 2 * lcs / total
+    return similarity if similarity >= score_cutoff else 0.0
+
+
+class FileFeatures:
+    """评分用的单文件特征，每个文件只计算一次
+
+    比较阶段的每一对文件只读取这些字段，不再重复标准化文件名、匹配正则或解析十六进制哈希。
+    """
+    __slots__ = ('size', 'content_hash', 'sample_hash', 'phash', 'duration', 'name', 'copy_pattern')
+
+    def __init__(self, size: int, content_hash: Optional[str] = None, sample_hash: Optional[str] = None,
+                 phash: Optional[int] = None, duration: Optional[float] = None,
+                 name: str = '', copy_pattern: bool = False):
+        self.size = size
+        self.content_hash = content_hash
+        self.sample_hash = sample_hash
+        self.phash = phash  # 感知哈希（整数）
+        self.duration = duration
+        self.name = name  # 标准化文件名
+        self.copy_pattern = copy_pattern
+
+    @classmethod
+    def from_metadata(cls, metadata) -> 'FileFeatures':
+        """从 FileMetadata 构造特征记录"""
+        return cls(
+            size=metadata.size,
+            content_hash=metadata.content_hash,
+            sample_hash=metadata.sample_hash,
+            phash=phash_to_int(metadata.perceptual_hash),
+            duration=metadata.duration,
+            name=metadata.filename_normalized or normalize_filename(metadata.path),
+            copy_pattern=has_copy_pattern(metadata.path),
+        )
+
+
+def score_features(file1: FileFeatures, file2: FileFeatures,
+                   weights: Dict[str, float]) -> Tuple[float, List[str]]:
+    """计算两个文件特征记录的相似度分数和原因（纯函数，不访问文件系统）"""
+    # 内容哈希匹配（最高优先级），内容哈希相同就是确定重复
+    if file1.content_hash and file1.content_hash == file2.content_hash:
+        return float(weights['content_hash_match']), ["内容哈希完全相同"]
+
+    score = 0.0
+    reasons = []
+
+    # 采样哈希匹配（视频）
+    if file1.sample_hash and file1.sample_hash == file2.sample_hash:
+        score += weights['sample_hash_match']
+        reasons.append("视频采样哈希相同")
+
+    # 感知哈希匹配（图片）
+    if file1.phash is not None and file2.phash is not None:
+        distance = (file1.phash ^ file2.phash).bit_count()
+        if distance <= 2:  # 非常相似
+            score += weights['perceptual_hash_match']
+            reasons.append(f"图片感知哈希相似(距离:{distance})")
+        elif distance <= PERCEPTUAL_HASH_MAX_DISTANCE:  # 比较相似
+            score += weights['perceptual_hash_match'] * 0.7
+            reasons.append(f"图片感知哈希较相似(距离:{distance})")
+
+    # 文件大小匹配
+    if file1.size == file2.size and file1.size > 0:
+        score += weights['size_match']
+        reasons.append("文件大小相同")
+
+    # 视频时长匹配
+    if file1.duration and file2.duration:
+        duration_diff = abs(file1.duration - file2.duration)
+        if duration_diff <= 2.0:  # 2秒误差内
+            score += weights['duration_match']
+            reasons.append(f"视频时长相近(差异:{duration_diff:.1f}秒)")
+        elif duration_diff <= 5.0:  # 5秒误差内
+            score += weights['duration_match'] * 0.7
+            reasons.append(f"视频时长较接近(差异:{duration_diff:.1f}秒)")
+
+    # 文件名相似度
+    similarity = filename_similarity(file1.name, file2.name, FILENAME_MODERATE_SIMILARITY)
+    if similarity >= FILENAME_HIGH_SIMILARITY:
+        score += weights['filename_high_similarity']
+        reasons.append(f"文件名高度相似({similarity:.2f})")
+    elif similarity >= FILENAME_MODERATE_SIMILARITY:
+        score += weights['filename_moderate_similarity']
+        reasons.append(f"文件名中度相似({similarity:.2f})")
+
+    # 复制模式检测
+    if file1.copy_pattern or file2.copy_pattern:
+        score += weights['filename_copy_pattern']
+        reasons.append("文件名包含复制标记")
+
+    return score, reasons
+
+
+def score_pairs(features: Sequence[FileFeatures], weights: Dict[str, float], min_score: float,
+                first: Sequence[int], second: Sequence[int]) -> List[Tuple[int, float, List[str]]]:
+    """对一批候选对 (first[k], second[k]) 评分，只返回分数不低于 min_score 的 (批内序号, 分数, 原因)"""
+    matches = []
+    for k, (i, j) in enumerate(zip(first, second)):
+        score, reasons = score_features(features[i], features[j], weights)
+        if score >= min_score:
+            matches.append((k, score, reasons))
+    return matches
+
+
+# 进程池评分时每个工作进程保存的 (特征列表, 权重, 最低分)，由 init_scoring_worker 设置
+_worker_scoring_state: Optional[tuple] = None
+
+
+def init_scoring_worker(features: List[FileFeatures], weights: Dict[str, float], min_score: float):
+    """进程池初始化函数：特征列表每个工作进程只传递一次，之后每批只传递候选对下标"""
+    global _worker_scoring_state
+    _worker_scoring_state = (features, weights, min_score)
+
+
+def score_pairs_in_worker(first: Sequence[int], second: Sequence[int]) -> List[Tuple[int, float, List[str]]]:
+    """进程池任务：用 init_scoring_worker 设置的特征对一批候选对评分"""
+    return score_pairs(*_worker_scoring_state, first, second)
@@ -0,0 +1,266 @@
+import hashlib
+import operator
+from array import array
+from collections import defaultdict
+from typing import Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+def phash_to_int(hex_hash: Optional[str]) -> Optional[int]:
+    """把十六进制感知哈希转换为整数，便于用异或计算汉明距离"""
+    if not hex_hash:
+        return None
+    try:
+        return int(hex_hash, 16)
+    except ValueError:
+        return None
+
+
+def hamming_distance(hash1: int, hash2: int) -> int:
+    """两个整数哈希之间的汉明距离"""
+    return (hash1 ^ hash2).bit_count()
+
+
+class BKTree:
+    """汉明距离上的 BK 树，用于查找感知哈希相近的图片
+
+    查询"距离不超过 d 的所有哈希"时，只需要访问与查询值距离落在 [k-d, k+d] 内的子树，
+    d 较小时（例如 5）远少于两两比较。相同哈希值共用一个节点。
+    """
+
+    def __init__(self):
+        # 节点: [哈希值, 条目 ID 列表, {距离: 子节点}]
+        self._root: Optional[list] = None
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, value: int, item_id: int):
+        """插入一个哈希值及其条目 ID"""
+        self._size += 1
+        if self._root is None:
+            self._root = [value, [item_id], {}]
+            return
+        node = self._root
+        while True:
+            distance = hamming_distance(value, node[0])
+            if distance == 0:
+                node[1].append(item_id)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, [item_id], {}]
+                return
+            node = child
+
+    def query(self, value: int, max_distance: int) -> List[Tuple[int, int]]:
+        """查找与 value 距离不超过 max_distance 的条目
+
+        Returns:
+            [(条目 ID, 距离), ...]
+        """
+        results = []
+        if self._root is None:
+            return results
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node[0])
+            if distance <= max_distance:
+                results.extend((item_id, distance) for item_id in node[1])
+            low, high = distance - max_distance, distance + max_distance
+            for child_distance, child in node[2].items():
+                if low <= child_distance <= high:
+                    stack.append(child)
+        return results
+
+
+def iter_similar_hash_pairs(hashes: Dict[int, int], max_distance: int) -> Iterator[Tuple[int, int, int]]:
+    """找出所有汉明距离不超过 max_distance 的哈希对
+
+    Args:
+        hashes: {条目 ID: 整数哈希}
+
+    Yields:
+        (较小的条目 ID, 较大的条目 ID, 距离)，每一对只产生一次
+    """
+    tree = BKTree()
+    for item_id, value in hashes.items():
+        tree.add(value, item_id)
+    for item_id, value in hashes.items():
+        for other_id, distance in tree.query(value, max_distance):
+            if other_id > item_id:
+                yield item_id, other_id, distance
+
+
+class BlockingIndex:
+    """分块索引：只有至少共享一个分块键的文件才组成候选对，代替所有文件两两比较
+
+    同一对文件可能同时出现在多个分块中，只在按 key_order 排序的第一个共享分块中产生，
+    因此不需要额外记录已经产生过的文件对。
+    超过大小上限的分块不产生候选对，也不参与去重，其中的文件只通过其他分块键组成候选对。
+    """
+
+    def __init__(self, key_order: Iterable[str], adjacent_keys: Iterable[str] = (),
+                 max_block_sizes: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            key_order: 分块键名称，决定候选对的产生顺序
+            adjacent_keys: 取值为整数的分块键，相邻取值（差为 1）的分块之间也组成候选对，
+                例如按时长分段时，相邻时长段中的视频也可能足够接近
+            max_block_sizes: {分块键名称: 分块的最大条目数}，未列出的分块键不限制；
+                例如相机编号的文件名标准化后全部相同，不加限制时一个分块就会产生 n(n-1)/2 对
+        """
+        self.key_order = list(key_order)
+        self.adjacent_keys = set(adjacent_keys)
+        self.max_block_sizes = dict(max_block_sizes or {})
+        self.oversized_blocks = 0  # iter_pairs 跳过的过大分块数
+        self._oversized: Dict[str, Set[Hashable]] = {}
+        self._blocks: Dict[str, Dict[Hashable, List[int]]] = {name: defaultdict(list) for name in self.key_order}
+        self._item_keys: Dict[int, Dict[str, Hashable]] = defaultdict(dict)
+
+    def add(self, item_id: int, key_name: str, value: Hashable):
+        """为条目登记一个分块键，value 为 None 时忽略"""
+        if value is None:
+            return
+        self._blocks[key_name][value].append(item_id)
+        self._item_keys[item_id][key_name] = value
+
+    def _shares_key(self, id1: int, id2: int, key_names: Iterable[str]) -> bool:
+        keys1, keys2 = self._item_keys.get(id1, {}), self._item_keys.get(id2, {})
+        for name in key_names:
+            if name in keys1 and name in keys2:
+                oversized = self._oversized.get(name, ())
+                if keys1[name] in oversized or keys2[name] in oversized:
+                    continue
+                if keys1[name] == keys2[name]:
+                    return True
+                if name in self.adjacent_keys and abs(keys1[name] - keys2[name]) == 1:
+                    return True
+        return False
+
+    def iter_pairs(self, extra_pairs: Iterable[Tuple[int, int]] = ()) -> Iterator[Tuple[int, int]]:
+        """产生所有候选对 (较小 ID, 较大 ID)，每对只产生一次
+
+        Args:
+            extra_pairs: 其他来源的候选对（例如感知哈希近邻），与分块候选对去重后产生
+        """
+        self._oversized = {name: {value for value, members in self._blocks[name].items() if len(members) > limit}
+                           for name, limit in self.max_block_sizes.items() if name in self._blocks}
+        self.oversized_blocks = sum(len(values) for values in self._oversized.values())
+
+        for position, name in enumerate(self.key_order):
+            earlier = self.key_order[:position]
+            blocks = self._blocks[name]
+            oversized = self._oversized.get(name, ())
+            for value, members in blocks.items():
+                if value in oversized:
+                    continue
+                for a in range(len(members)):
+                    for b in range(a + 1, len(members)):
+                        i, j = members[a], members[b]
+                        if not earlier or not self._shares_key(i, j, earlier):
+                            yield i, j
+                if name in self.adjacent_keys and value + 1 in blocks and value + 1 not in oversized:
+                    for i in members:
+                        for j in blocks[value + 1]:
+                            pair = (i, j) if i < j else (j, i)
+                            if not earlier or not self._shares_key(pair[0], pair[1], earlier):
+                                yield pair
+
+        for i, j in extra_pairs:
+            pair = (i, j) if i < j else (j, i)
+            if not self._shares_key(pair[0], pair[1], self.key_order):
+                yield pair
+
+
+def name_shingles(name: str, size: int = 3) -> Set[str]:
+    """文件名的字符 n-gram 集合（首尾各补一个空格，短名字也至少有一个 n-gram）"""
+    padded = f" {name} "
+    if len(padded) <= size:
+        return {padded}
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+class MinHashLSHIndex:
+    """文件名的 MinHash 局部敏感哈希 (LSH) 索引，以近似线性的代价找出名字相似的条目对
+
+    每个名字取字符 n-gram 集合，计算 num_bands * rows_per_band 个 MinHash（每个 n-gram 用一次 SHAKE-128
+    得到全部哈希值，逐位置取最小值），签名每 rows_per_band 个切成一段，任意一段完全相同的两个条目进入同一个桶。
+    两个名字 n-gram 集合的 Jaccard 相似度为 s 时进入同一个桶的概率为 1 - (1 - s^r)^b，
+    默认 20 段 × 3 行时 s=0.5 约 93%，s=0.7 接近 100%，s=0.2 约 15%。
+    同桶的条目对再用完整签名估计 Jaccard 相似度，低于 min_jaccard 的不产生候选对（它们的文件名相似度几乎不可能达到 0.7）；
+    超过 max_bucket_size 个条目的桶太常见（如大量相机编号文件名），也不产生候选对。
+    """
+
+    def __init__(self, num_bands: int = 20, rows_per_band: int = 3, shingle_size: int = 3,
+                 min_jaccard: float = 0.3, max_bucket_size: int = 1000):
+        self.num_bands = num_bands
+        self.rows_per_band = rows_per_band
+        self.shingle_size = shingle_size
+        self.min_jaccard = min_jaccard
+        self.max_bucket_size = max_bucket_size
+        self._num_hashes = num_bands * rows_per_band
+        self._buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(num_bands)]
+        self._signatures: Dict[int, array] = {}  # 条目 ID -> MinHash 签名
+        self._signatures_by_name: Dict[str, array] = {}  # 相同的名字共用一个签名
+        self.oversized_buckets = 0
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, name: str) -> array:
+        """名字的 MinHash 签名 (num_bands * rows_per_band 个 32 位整数)"""
+        signature = self._signatures_by_name.get(name)
+        if signature is None:
+            digest_size = 4 * self._num_hashes
+            columns = [array('I', hashlib.shake_128(gram.encode('utf-8')).digest(digest_size))
+                       for gram in name_shingles(name, self.shingle_size)]
+            signature = array('I', map(min, *columns)) if len(columns) > 1 else columns[0]
+            self._signatures_by_name[name] = signature
+        return signature
+
+    def _band(self, signature: array, band: int) -> bytes:
+        return signature[band * self.rows_per_band:(band + 1) * self.rows_per_band].tobytes()
+
+    def add(self, item_id: int, name: str):
+        """登记一个条目的名字，空名字忽略"""
+        if not name:
+            return
+        signature = self.signature(name)
+        self._signatures[item_id] = signature
+        for band in range(self.num_bands):
+            self._buckets[band][self._band(signature, band)].append(item_id)
+
+    def estimated_jaccard(self, item1: int, item2: int) -> float:
+        """用签名中相同位置的比例估计两个名字 n-gram 集合的 Jaccard 相似度"""
+        return sum(map(operator.eq, self._signatures[item1], self._signatures[item2])) / self._num_hashes
+
+    def iter_pairs(self) -> Iterator[Tuple[int, int]]:
+        """产生所有候选对 (较小 ID, 较大 ID)，每对只在两者第一个共同的（未超限的）桶中产生一次"""
+        oversized = [{key for key, members in buckets.items() if len(members) > self.max_bucket_size}
+                     for buckets in self._buckets]
+        self.oversized_buckets = sum(len(keys) for keys in oversized)
+        min_equal = self.min_jaccard * self._num_hashes
+
+        def shared_earlier(signature1: array, signature2: array, band: int) -> bool:
+            for earlier in range(band):
+                key = self._band(signature1, earlier)
+                if key == self._band(signature2, earlier) and key not in oversized[earlier]:
+                    return True
+            return False
+
+        for band, buckets in enumerate(self._buckets):
+            for key, members in buckets.items():
+                if len(members) < 2 or key in oversized[band]:
+                    continue
+                for a in range(len(members)):
+                    signature1 = self._signatures[members[a]]
+                    for b in range(a + 1, len(members)):
+                        i, j = members[a], members[b]
+                        signature2 = self._signatures[j]
+                        if sum(map(operator.eq, signature1, signature2)) < min_equal:
+                            continue
+                        if band and shared_earlier(signature1, signature2, band):
+                            continue
+                        yield (i, j) if i < j else (j, i)
@@ -0,0 +1,82 @@
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+
+class ReasonFlags:
+    """重复原因的位标记表：每种原因文本分配一个位，一组的原因集合保存为一个整数
+
+    合并两组时原因按位或即可，不再拼接列表再去重；原因按首次出现的顺序编号，解码结果的顺序是确定的。
+    原因文本的种类有限（评分函数只产生几十到几百种），位标记的长度不随文件对数量增长。
+    """
+
+    def __init__(self):
+        self._bits: Dict[str, int] = {}
+        self._names: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def encode(self, reasons: Iterable[str]) -> int:
+        mask = 0
+        for reason in reasons:
+            bit = self._bits.get(reason)
+            if bit is None:
+                bit = self._bits[reason] = len(self._names)
+                self._names.append(reason)
+            mask |= 1 << bit
+        return mask
+
+    def decode(self, mask: int) -> List[str]:
+        reasons = []
+        while mask:
+            lowest = mask & -mask
+            reasons.append(self._names[lowest.bit_length() - 1])
+            mask ^= lowest
+        return reasons
+
+
+class UnionFind:
+    """整数元素（从 0 开始的连续编号，如候选文件行号）上的并查集
+
+    按秩合并，查找为迭代实现并压缩路径，长链不会触及递归深度限制。
+    父节点和秩保存在 array 中（每个元素 9 字节），按需扩展；内存只与元素个数有关，与合并次数无关。
+    """
+
+    def __init__(self, size: int = 0):
+        self.parent = array('q', range(size))
+        self.rank = array('B', bytes(size))
+
+    def __len__(self) -> int:
+        return len(self.parent)
+
+    def _grow(self, item: int):
+        size = len(self.parent)
+        if item >= size:
+            self.parent.extend(range(size, item + 1))
+            self.rank.extend(bytes(item + 1 - size))
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        if item >= len(parent):
+            return item
+        root = item
+        while parent[root] != root:
+            root = parent[root]
+        while parent[item] != root:
+            parent[item], item = root, parent[item]
+        return root
+
+    def union(self, item1: int, item2: int) -> Tuple[int, int]:
+        """合并两个元素所在的集合，返回 (合并后的根, 被并入的根)；原本就在同一集合时两者相同"""
+        self._grow(max(item1, item2))
+        root1, root2 = self.find(item1), self.find(item2)
+        if root1 == root2:
+            return root1, root1
+        rank = self.rank
+        if rank[root1] < rank[root2]:
+            root1, root2 = root2, root1
+        elif rank[root1] == rank[root2]:
+            # 秩不超过 log2(元素个数)，一个字节足够
+            rank[root1] += 1
+        self.parent[root2] = root1
+        return root1, root2
@@ -6,8 +6,12 @@ import sys
 import datetime
 import threading
 from collections import defaultdict
-from file.file_find_duplicates_enhanced import collect_duplicate_files_info_enhanced, EnhancedDuplicateFinder, DuplicateGroup, FileMetadata, DuplicateLevel
-from file.file_find_duplicates import move_files_to_duplicate_folder
+from file.file_find_duplicates_enhanced import collect_duplicate_files_info_enhanced, EnhancedDuplicateFinder, DuplicateGroup, DuplicateGroupUpdate, FileMetadata, DuplicateLevel
+from file.file_bulk_move import BulkMover, JOURNAL_FILE_NAME
+from file.file_dedup import DedupEngine, LINK_HARDLINK, KEEP_OLDEST
+from file.file_metadata_cache import CACHE_DIR_NAME, MetadataCache
+from file.file_scan_checkpoint import ScanCheckpoint
+from file.folder_size_report import human_readable_size
 import logging
 from typing import Dict, List
 import re
@@ -26,6 +30,17 @@ class ToolPluginFrame(ctk.CTkFrame):
     CONFIG_KEY_DUPLICATES_SUBDIR = "duplicates_subdir_name"
     DEFAULT_DUPLICATES_SUBDIR = "duplicates_found"
     CONFIG_KEY_LAST_FFPROBE_PATH = "last_ffprobe_path"
+    CONFIG_KEY_SCAN_WORKERS = "scan_workers"
+    DEFAULT_SCAN_WORKERS = os.cpu_count() or 1
+    CONFIG_KEY_HASH_ALGORITHM = "hash_algorithm"
+    DEFAULT_HASH_ALGORITHM = "auto"
+    SCAN_STATS_FILE_NAME = "last_scan_stats.json"
+    # 状态栏显示的扫描阶段
+    SCAN_PHASE_NAMES = {'walk': "遍历目录", 'extract': "提取元数据", 'hash': "计算内容哈希", 'compare': "比较候选文件"}
+    CONFIG_KEY_LINK_MODE = "dedup_link_mode"
+    DEFAULT_LINK_MODE = LINK_HARDLINK
+    CONFIG_KEY_KEEP_POLICY = "dedup_keep_policy"
+    DEFAULT_KEEP_POLICY = KEEP_OLDEST
 
     def __init__(self, master):
         super().__init__(master)
@@ -49,6 +64,8 @@ class ToolPluginFrame(ctk.CTkFrame):
         self.ffprobe_path_var = tk.StringVar()
         self.scan_stop_event = None
         self.current_scan_thread = None
+        self.scan_checkpoint = None
+        self.scan_stats = None  # 当前扫描的 ScanStats，扫描线程更新，界面定时读取
 
         folder_frame = ctk.CTkFrame(self)
         folder_frame.grid(row=0, column=0, columnspan=3, padx=10, pady=10, sticky="ew")
@@ -83,6 +100,7 @@ class ToolPluginFrame(ctk.CTkFrame):
         action_frame.grid_columnconfigure(0, weight=0)
         action_frame.grid_columnconfigure(1, weight=0)
         action_frame.grid_columnconfigure(2, weight=0)
+        action_frame.grid_columnconfigure(3, weight=0)
 
         self.find_button = ctk.CTkButton(action_frame, text="1. 查找重复文件", command=self.start_find_duplicates_thread)
         self.find_button.grid(row=0, column=0, padx=5, pady=5)
@@ -90,8 +108,11 @@ class ToolPluginFrame(ctk.CTkFrame):
         self.move_button = ctk.CTkButton(action_frame, text="2. 移动找到的重复项", command=self.move_duplicates_action, state=tk.DISABLED)
         self.move_button.grid(row=0, column=1, padx=5, pady=5)
 
+        self.link_button = ctk.CTkButton(action_frame, text="3. 链接替换确定重复项", command=self.link_duplicates_action, state=tk.DISABLED)
+        self.link_button.grid(row=0, column=2, padx=5, pady=5)
+
         self.stop_button = ctk.CTkButton(action_frame, text="终止扫描", command=self.stop_scan_action, state=tk.DISABLED)
-        self.stop_button.grid(row=0, column=2, padx=5, pady=5)
+        self.stop_button.grid(row=0, column=3, padx=5, pady=5)
 
         results_frame = ctk.CTkFrame(self)
         results_frame.grid(row=3, column=0, columnspan=3, padx=10, pady=(0,5), sticky="nsew")
@@ -294,6 +315,7 @@ class ToolPluginFrame(ctk.CTkFrame):
             self.log_message(f"已选择文件夹: {folder_selected}", clear_log=True)
             self.clear_results()
             self.move_button.configure(state=tk.DISABLED)
+            self.link_button.configure(state=tk.DISABLED)
 
     def browse_ffprobe_path(self):
         initial_dir = self.ffprobe_path_var.get()
@@ -320,10 +342,17 @@ class ToolPluginFrame(ctk.CTkFrame):
             return
 
         self.selected_folder_for_scan = folder_to_scan
-        self.log_message(f"开始在 {folder_to_scan} 中查找重复文件...", clear_log=True)
+        # 上次对同一文件夹的扫描被中止时留下断点，询问是否从断点继续
+        self.scan_checkpoint = ScanCheckpoint.for_roots([folder_to_scan])
+        resume_scan = self.scan_checkpoint.exists() and messagebox.askyesno(
+            "继续扫描", "该文件夹上次的扫描没有完成。\n\n是否从上次的断点继续？选择“否”将重新开始扫描。")
+        if not resume_scan:
+            self.scan_checkpoint.clear()
+        self.log_message(f"{'从断点继续' if resume_scan else '开始'}在 {folder_to_scan} 中查找重复文件...", clear_log=True)
         self.clear_results()
         self.find_button.configure(state=tk.DISABLED, text="正在查找...")
         self.move_button.configure(state=tk.DISABLED)
+        self.link_button.configure(state=tk.DISABLED)
         self.stop_button.configure(state=tk.NORMAL)
         self.update_idletasks()
 
@@ -336,14 +365,29 @@ class ToolPluginFrame(ctk.CTkFrame):
         folder_to_scan = self.selected_folder_for_scan
         ffprobe_path = self.ffprobe_path_var.get()
         finder = None 
+        metadata_cache = None
 
         try:
+            try:
+                metadata_cache = MetadataCache()
+            except Exception as e_cache:
+                self.master.after(0, self.log_message, f"无法打开元数据缓存，将完整扫描所有文件: {e_cache}", "WARNING")
+
             finder = EnhancedDuplicateFinder(
                 ffprobe_path=(ffprobe_path if ffprobe_path and os.path.isfile(ffprobe_path) else None),
                 log_callback=lambda msg, lvl: self.master.after(0, self.log_message, msg, lvl), 
-                stop_event=self.scan_stop_event
+                stop_event=self.scan_stop_event,
+                metadata_cache=metadata_cache,
+                workers=get_setting(ToolPluginFrame.TOOL_NAME, ToolPluginFrame.CONFIG_KEY_SCAN_WORKERS,
+                                    ToolPluginFrame.DEFAULT_SCAN_WORKERS),
+                hash_algorithm=get_setting(ToolPluginFrame.TOOL_NAME, ToolPluginFrame.CONFIG_KEY_HASH_ALGORITHM,
+                                           ToolPluginFrame.DEFAULT_HASH_ALGORITHM),
+                checkpoint=self.scan_checkpoint
             )
 
+            self.scan_stats = finder.stats
+            self.master.after(0, self._poll_scan_stats)
+
             current_ffprobe_in_use = finder.ffprobe_path 
             
             if current_ffprobe_in_use and os.path.isfile(current_ffprobe_in_use):
@@ -360,15 +404,17 @@ class ToolPluginFrame(ctk.CTkFrame):
             
             self.master.after(0, self.log_message, f"线程开始在文件夹 '{folder_to_scan}' 中查找重复文件 (使用核心查找器)...", "INFO")
             
-            # 直接调用核心方法，它返回 Dict[DuplicateLevel, List[DuplicateGroup]]
-            raw_results: Dict[DuplicateLevel, List[DuplicateGroup]] = finder.find_duplicates_in_directory(folder_to_scan)
+            # 流式获取分组：每个组一经确认就显示在列表中，之后有新成员加入或组被合并时原地更新
+            live_groups: Dict[int, DuplicateGroup] = {}
+            for update in finder.iter_duplicate_groups(folder_to_scan):
+                for merged_id in update.merged_ids:
+                    live_groups.pop(merged_id, None)
+                live_groups[update.group_id] = update.group
+                self.master.after(0, self._apply_group_update, update)
+
+            processed_results: List[DuplicateGroup] = [live_groups[group_id] for group_id in sorted(live_groups)]
             
-            # 转换为扁平化的 List[DuplicateGroup] 并按分数排序
-            processed_results: List[DuplicateGroup] = []
-            for level_key in sorted(raw_results.keys(), key=lambda x: x.value): 
-                processed_results.extend(raw_results[level_key])
-            
-            # 按组的最高分数降序排序，确保分数高的组显示在前面
+            # 扫描结束后按组的最高分数降序重新排列，确保分数高的组显示在前面
             processed_results.sort(key=lambda g: g.score, reverse=True)
             
             self.found_duplicate_groups = processed_results # 存储这个丰富的结果
@@ -380,7 +426,12 @@ class ToolPluginFrame(ctk.CTkFrame):
             elif not self.found_duplicate_groups:
                 log_msg = "扫描完成。未找到任何符合当前设置的重复文件组。"
             else:
-                log_msg = f"扫描完成。找到 {len(self.found_duplicate_groups)} 个重复文件组。"
+                reclaimable = sum(group.reclaimable_size for group in self.found_duplicate_groups)
+                log_msg = (f"扫描完成。找到 {len(self.found_duplicate_groups)} 个重复文件组，"
+                           f"每组保留一个可释放 {human_readable_size(reclaimable)}。")
+            if finder.hardlink_sets:
+                self.master.after(0, self.log_message,
+                                  f"另有 {len(finder.hardlink_sets)} 组硬链接（同一文件的多个路径，不占用额外空间），未计入重复文件。", "INFO")
             
             self.master.after(0, self.log_message, log_msg, log_msg_level)
             
@@ -390,19 +441,62 @@ class ToolPluginFrame(ctk.CTkFrame):
                 self.master.after(0, self.log_message, f"当前扫描文件夹 '{folder_to_scan}' 已记录以备下次使用。", "INFO")
 
         except InterruptedError:
-            self.master.after(0, self.log_message, "查找操作被用户中止。", "WARNING")
+            self.master.after(0, self.log_message, "查找操作被用户中止。再次查找同一文件夹时可以从断点继续。", "WARNING")
         except Exception as e:
             import traceback
             tb_str = traceback.format_exc()
             self.master.after(0, self.log_message, f"查找重复文件时发生意外错误: {e}\\n{tb_str}", "ERROR")
         finally:
+            if metadata_cache:
+                metadata_cache.close()
+            if finder:
+                self._dump_scan_stats(finder.stats)
             self.master.after(0, self._finalize_scan_ui_update)
 
+    def _poll_scan_stats(self):
+        """在状态栏显示当前阶段的进度、吞吐量和预计剩余时间，扫描结束前每 0.5 秒刷新一次"""
+        if self.scan_stats is None:
+            return
+        snapshot = self.scan_stats.snapshot()
+        if snapshot['finished']:
+            self.status_label.configure(text=f"扫描用时 {snapshot['elapsed_seconds']:.1f} 秒，共 {snapshot['files_walked']} 个文件，"
+                                             f"读取 {human_readable_size(snapshot['bytes_read'])}")
+            self.scan_stats = None
+            return
+
+        phase = snapshot['phase']
+        text = ToolPluginFrame.SCAN_PHASE_NAMES.get(phase, "准备中")
+        if phase:
+            text += f" {snapshot['phase_done']}" + (f"/{snapshot['phase_total']}" if snapshot['phase_total'] is not None else "")
+        if snapshot['phase_items_per_second']:
+            text += f"（{snapshot['phase_items_per_second']:.0f}/秒）"
+        if snapshot['eta_seconds'] is not None:
+            text += f"，预计剩余 {datetime.timedelta(seconds=round(snapshot['eta_seconds']))}"
+        text += (f" | 已遍历 {snapshot['files_walked']} 个文件，读取 {human_readable_size(snapshot['bytes_read'])}，"
+                 f"用时 {datetime.timedelta(seconds=round(snapshot['elapsed_seconds']))}")
+        self.status_label.configure(text=text)
+        self.after(500, self._poll_scan_stats)
+
+    def _dump_scan_stats(self, stats):
+        """把本次扫描的统计写入 ~/.ToolboxApp/last_scan_stats.json"""
+        stats_path = os.path.join(os.path.expanduser("~"), CACHE_DIR_NAME, ToolPluginFrame.SCAN_STATS_FILE_NAME)
+        try:
+            os.makedirs(os.path.dirname(stats_path), exist_ok=True)
+            stats.dump(stats_path)
+            self.master.after(0, self.log_message, f"扫描统计已保存到 {stats_path}", "DEBUG")
+        except OSError as e:
+            self.master.after(0, self.log_message, f"无法保存扫描统计: {e}", "WARNING")
+
     def _finalize_scan_ui_update(self):
+        if self.scan_stats is not None:
+            # 扫描在开始产生结果前就失败时，统计不会被查找器标记为结束
+            self.scan_stats.finish()
+            self._poll_scan_stats()
         self.find_button.configure(state=tk.NORMAL, text="1. 查找重复文件")
         self.stop_button.configure(state=tk.DISABLED)
         if self.found_duplicate_groups:
              self.move_button.configure(state=tk.NORMAL)
+             self.link_button.configure(state=tk.NORMAL)
         self.scan_stop_event = None 
         self.current_scan_thread = None
 
@@ -412,70 +506,19 @@ class ToolPluginFrame(ctk.CTkFrame):
         if not self.found_duplicate_groups or not isinstance(self.found_duplicate_groups, list):
             self.log_message("没有找到重复文件组，或结果格式不正确，无法填充列表。", "INFO" if not self.found_duplicate_groups else "ERROR")
             self.move_button.configure(state=tk.DISABLED)
+            self.link_button.configure(state=tk.DISABLED)
             return
 
         if self.found_duplicate_groups and not isinstance(self.found_duplicate_groups[0], DuplicateGroup):
              self.log_message(f"结果格式不正确，期望DuplicateGroup列表，实际为 {type(self.found_duplicate_groups[0])}。", "ERROR")
              self.move_button.configure(state=tk.DISABLED)
+             self.link_button.configure(state=tk.DISABLED)
              return
 
         group_display_counter = 0
         for group_data in self.found_duplicate_groups: # self.found_duplicate_groups 现在是 List[DuplicateGroup]
             group_display_counter += 1
-            group_id = f"group_{group_display_counter}"
-            
-            level_str = group_data.level.value if group_data.level else "N/A"
-            score_str = f"{group_data.score:.1f}" if hasattr(group_data, 'score') else "N/A"
-            reasons_str = ", ".join(set(group_data.reasons)) if group_data.reasons else "无特定原因"
-            num_files_str = f"{len(group_data.files)}个文件"
-
-            # 父项: 显示组信息
-            # "item_name", "item_path", "item_size", "item_duration", "group_info"
-            group_item_values = (
-                f"{level_str} ({num_files_str})", # item_name (组的概览，更简洁)
-                "", # item_path (组级别留空)
-                "", # item_size (组级别留空)
-                "", # item_duration (组级别留空)
-                f"评分: {score_str} | {reasons_str[:70]}{'...' if len(reasons_str)>70 else ''}" # group_info, 稍微加长原因显示
-            )
-            parent_item_id = self.tree.insert("", tk.END, iid=group_id, open=True, values=group_item_values, tags=('group_item', 'group_row_tag')) # 添加一个特定的tag用于样式
-
-            # 子项: 显示组内每个文件的详细信息
-            if group_data.files and isinstance(group_data.files[0], FileMetadata):
-                for file_idx, file_meta in enumerate(group_data.files):
-                    file_item_id = f"{group_id}_file_{file_idx}"
-                    
-                    filename = os.path.basename(file_meta.path)
-                    filepath_str = os.path.dirname(file_meta.path)
-                    
-                    filesize_bytes = file_meta.size
-                    if filesize_bytes is None: filesize_str = "N/A"
-                    elif filesize_bytes >= 1024*1024*1024: filesize_str = f"{filesize_bytes / (1024*1024*1024):.2f} GB"
-                    elif filesize_bytes >= 1024*1024: filesize_str = f"{filesize_bytes / (1024*1024):.2f} MB"
-                    elif filesize_bytes >= 1024: filesize_str = f"{filesize_bytes / 1024:.1f} KB"
-                    else: filesize_str = f"{filesize_bytes} B"
-                    
-                    duration_seconds = file_meta.duration
-                    if duration_seconds is None: duration_str = ""
-                    else:
-                        td = datetime.timedelta(seconds=int(duration_seconds))
-                        hours, remainder = divmod(td.seconds, 3600)
-                        minutes, seconds = divmod(remainder, 60)
-                        if td.days > 0: duration_str = f"{td.days}天 {hours:02}:{minutes:02}:{seconds:02}"
-                        elif hours > 0: duration_str = f"{hours:02}:{minutes:02}:{seconds:02}"
-                        else: duration_str = f"{minutes:02}:{seconds:02}"
-                    
-                    file_item_values = (
-                        filename,
-                        filepath_str,
-                        filesize_str,
-                        duration_str,
-                        "" # group_info (文件级别留空)
-                    )
-                    try:
-                        self.tree.insert(parent_item_id, tk.END, iid=file_item_id, values=file_item_values, tags=('file_item',))
-                    except Exception as e_insert:
-                        self.log_message(f"[Tree Populate] FAILED to insert file: {file_item_id}. Error: {e_insert}", "ERROR")
+            self._insert_group_item(f"group_{group_display_counter}", group_data)
 
         self.tree.tag_configure('group_row_tag', background='#E8E8E8') # 默认浅灰色背景，需测试在不同主题下的效果
         # 如果是暗色主题，可能需要不同的颜色
@@ -487,10 +530,83 @@ class ToolPluginFrame(ctk.CTkFrame):
 
         if self.found_duplicate_groups:
             self.move_button.configure(state=tk.NORMAL)
+            self.link_button.configure(state=tk.NORMAL)
         else:
             self.move_button.configure(state=tk.DISABLED)
+            self.link_button.configure(state=tk.DISABLED)
             self.log_message("没有在Treeview中展示任何重复文件组。", "INFO")
-            
+
+    def _apply_group_update(self, update: DuplicateGroupUpdate):
+        """扫描过程中显示新确认的组（主线程中调用）：同一组再次出现时原地替换，已被合并的组删除"""
+        for merged_id in update.merged_ids:
+            if self.tree.exists(f"live_{merged_id}"):
+                self.tree.delete(f"live_{merged_id}")
+
+        group_id = f"live_{update.group_id}"
+        position = tk.END
+        if self.tree.exists(group_id):
+            position = self.tree.index(group_id)
+            self.tree.delete(group_id)
+        self._insert_group_item(group_id, update.group, position)
+        self.tree.tag_configure('group_row_tag', background='#E8E8E8')
+
+    def _insert_group_item(self, group_id: str, group_data: DuplicateGroup, position=tk.END):
+        """插入一个组及其文件子项"""
+        level_str = group_data.level.value if group_data.level else "N/A"
+        score_str = f"{group_data.score:.1f}" if hasattr(group_data, 'score') else "N/A"
+        reasons_str = ", ".join(set(group_data.reasons)) if group_data.reasons else "无特定原因"
+        num_files_str = f"{len(group_data.files)}个文件"
+
+        # 父项: 显示组信息
+        # "item_name", "item_path", "item_size", "item_duration", "group_info"
+        group_item_values = (
+            f"{level_str} ({num_files_str})", # item_name (组的概览，更简洁)
+            "", # item_path (组级别留空)
+            "", # item_size (组级别留空)
+            "", # item_duration (组级别留空)
+            f"评分: {score_str} | {reasons_str[:70]}{'...' if len(reasons_str)>70 else ''}" # group_info, 稍微加长原因显示
+        )
+        parent_item_id = self.tree.insert("", position, iid=group_id, open=True, values=group_item_values, tags=('group_item', 'group_row_tag')) # 添加一个特定的tag用于样式
+
+        # 子项: 显示组内每个文件的详细信息
+        if group_data.files and isinstance(group_data.files[0], FileMetadata):
+            for file_idx, file_meta in enumerate(group_data.files):
+                file_item_id = f"{group_id}_file_{file_idx}"
+                
+                filename = os.path.basename(file_meta.path)
+                filepath_str = os.path.dirname(file_meta.path)
+                
+                filesize_bytes = file_meta.size
+                if filesize_bytes is None: filesize_str = "N/A"
+                elif filesize_bytes >= 1024*1024*1024: filesize_str = f"{filesize_bytes / (1024*1024*1024):.2f} GB"
+                elif filesize_bytes >= 1024*1024: filesize_str = f"{filesize_bytes / (1024*1024):.2f} MB"
+                elif filesize_bytes >= 1024: filesize_str = f"{filesize_bytes / 1024:.1f} KB"
+                else: filesize_str = f"{filesize_bytes} B"
+                
+                duration_seconds = file_meta.duration
+                if duration_seconds is None: duration_str = ""
+                else:
+                    td = datetime.timedelta(seconds=int(duration_seconds))
+                    hours, remainder = divmod(td.seconds, 3600)
+                    minutes, seconds = divmod(remainder, 60)
+                    if td.days > 0: duration_str = f"{td.days}天 {hours:02}:{minutes:02}:{seconds:02}"
+                    elif hours > 0: duration_str = f"{hours:02}:{minutes:02}:{seconds:02}"
+                    else: duration_str = f"{minutes:02}:{seconds:02}"
+                
+                # 同一 inode 的其他路径不占用额外空间，只在重复信息列中列出
+                link_paths = group_data.hardlinks.get(file_meta.path, [])
+                file_item_values = (
+                    filename,
+                    filepath_str,
+                    filesize_str,
+                    duration_str,
+                    f"另有 {len(link_paths)} 个硬链接: {', '.join(link_paths)}" if link_paths else "" # group_info
+                )
+                try:
+                    self.tree.insert(parent_item_id, tk.END, iid=file_item_id, values=file_item_values, tags=('file_item',))
+                except Exception as e_insert:
+                    self.log_message(f"[Tree Populate] FAILED to insert file: {file_item_id}. Error: {e_insert}", "ERROR")
+        
     def move_duplicates_action(self):
         if not self.found_duplicate_groups or not self.selected_folder_for_scan:
             messagebox.showwarning("无操作", "没有找到可移动的重复文件，或者未指定扫描文件夹。")
@@ -504,43 +620,157 @@ class ToolPluginFrame(ctk.CTkFrame):
         target_duplicate_dir = os.path.join(self.selected_folder_for_scan, duplicates_subfolder_name)
 
         confirm_move = messagebox.askyesno("确认移动", 
-            f"确定要将找到的重复文件（每组保留一个）移动到以下子文件夹吗？\n\n{target_duplicate_dir}\n\n如果子文件夹不存在，将会自动创建。此操作不可轻易撤销。",
+            f"确定要将找到的重复文件（每组保留一个）移动到以下子文件夹吗？\n\n{target_duplicate_dir}\n\n如果子文件夹不存在，将会自动创建。每次移动都会记录在该子文件夹的移动日志中，可用 python -m file.file_bulk_move undo <日志文件> 撤销。",
             icon=messagebox.WARNING)
 
         if not confirm_move:
             self.log_message("移动操作已取消。")
             return
 
-        self.log_message(f"开始移动重复文件到 {target_duplicate_dir} ...")
+        mover = BulkMover(os.path.join(target_duplicate_dir, JOURNAL_FILE_NAME),
+                          log_callback=lambda msg, lvl: self.master.after(0, self.log_message, msg, lvl),
+                          stop_event=threading.Event())
+        resume_pending = mover.has_pending() and messagebox.askyesno(
+            "继续上次的移动", "上次移动到该文件夹的操作没有完成，是否先按移动日志完成剩余的移动？")
+
+        moves = []
+        if isinstance(self.found_duplicate_groups, list):
+            for index, group in enumerate(self.found_duplicate_groups, 1):
+                if len(group.files) < 2:
+                    continue
+                group_folder_name = (group.files[0].content_hash or f"group_{index:04d}")[:12]
+                group_folder_path = os.path.join(target_duplicate_dir, group_folder_name)
+                # 每组保留第一个文件
+                moves.extend((file_meta.path, group_folder_path) for file_meta in group.files[1:])
+
+        self.log_message(f"开始移动 {len(moves)} 个重复文件到 {target_duplicate_dir} ...")
         self.move_button.configure(state=tk.DISABLED, text="正在移动...")
+        self.link_button.configure(state=tk.DISABLED)
         self.find_button.configure(state=tk.DISABLED)
+        self.scan_stop_event = mover.stop_event
+        self.stop_button.configure(state=tk.NORMAL)
         self.update_idletasks()
-        
-        moved_count_total = 0
-        error_count_total = 0
-        groups_processed = 0
-
-        for hash_val, paths in list(self.found_duplicate_groups.items()):
-            if len(paths) > 1:
-                files_to_move = paths[1:] 
-                moved_files, error_files = move_files_to_duplicate_folder(files_to_move, target_duplicate_dir, self.selected_folder_for_scan)
-                
-                moved_count_total += len(moved_files)
-                error_count_total += len(error_files)
-                groups_processed += 1
-
-                for f_path in moved_files:
-                    self.log_message(f"已移动: {f_path}")
-                for f_path, err_msg in error_files:
-                    self.log_message(f"移动失败: {f_path} - {err_msg}", is_error=True)
-            
-        self.log_message(f"移动操作完成。总共移动 {moved_count_total} 个文件，处理 {groups_processed} 个重复组，发生 {error_count_total} 个错误。")
+
+        def run_moves():
+            moved_count_total = 0
+            error_count_total = 0
+            interrupted = False
+            try:
+                if resume_pending:
+                    moved_count_total += len(mover.resume().moved)
+                result = mover.move(moves)
+                moved_count_total += len(result.moved)
+                error_count_total += len(result.errors)
+            except InterruptedError:
+                interrupted = True
+            except Exception as e:
+                error_count_total += 1
+                self.master.after(0, self.log_message, f"移动文件时发生错误: {e}", "ERROR")
+            self.master.after(0, self._finish_move_action, moved_count_total, error_count_total, interrupted)
+
+        threading.Thread(target=run_moves, daemon=True).start()
+
+    def _finish_move_action(self, moved_count_total, error_count_total, interrupted):
+        self.scan_stop_event = None
+        self.stop_button.configure(state=tk.DISABLED, text="终止扫描")
+        if interrupted:
+            self.log_message(f"移动已中止，已移动 {moved_count_total} 个文件；再次移动到同一文件夹时可按移动日志继续。", "WARNING")
+            self.move_button.configure(state=tk.NORMAL, text="2. 移动找到的重复项")
+            self.link_button.configure(state=tk.NORMAL)
+            self.find_button.configure(state=tk.NORMAL)
+            return
+
+        self.log_message(f"移动操作完成。总共移动 {moved_count_total} 个文件，发生 {error_count_total} 个错误。")
         messagebox.showinfo("移动完成", f"成功移动 {moved_count_total} 个重复文件。\n发生 {error_count_total} 个错误。\n详情请查看日志。")
-        
-        
+
         self.clear_results()
+        self.found_duplicate_groups = {}
+        self.move_button.configure(text="2. 移动找到的重复项")
         self.find_button.configure(state=tk.NORMAL, text="1. 查找重复文件")
 
+    def link_duplicates_action(self):
+        """用硬链接/reflink 替换确定重复（CERTAIN）组中多余的副本：先演练统计可释放空间，确认后再执行"""
+        if not self.found_duplicate_groups or not isinstance(self.found_duplicate_groups, list):
+            messagebox.showwarning("无操作", "没有找到可替换的重复文件。")
+            return
+
+        certain_groups = [group for group in self.found_duplicate_groups if group.level == DuplicateLevel.CERTAIN]
+        if not certain_groups:
+            messagebox.showinfo("无操作", "没有确定重复的文件组，只有确定重复的文件才会被链接替换。")
+            return
+
+        stop_event = threading.Event()
+        try:
+            engine = DedupEngine(
+                mode=get_setting(ToolPluginFrame.TOOL_NAME, ToolPluginFrame.CONFIG_KEY_LINK_MODE,
+                                 ToolPluginFrame.DEFAULT_LINK_MODE),
+                keep_policy=get_setting(ToolPluginFrame.TOOL_NAME, ToolPluginFrame.CONFIG_KEY_KEEP_POLICY,
+                                        ToolPluginFrame.DEFAULT_KEEP_POLICY),
+                preferred_roots=[self.selected_folder_for_scan] if self.selected_folder_for_scan else None,
+                log_callback=lambda msg, lvl: self.master.after(0, self.log_message, msg, lvl),
+                stop_event=stop_event
+            )
+        except ValueError as e:
+            messagebox.showerror("配置错误", str(e))
+            return
+
+        self.find_button.configure(state=tk.DISABLED)
+        self.move_button.configure(state=tk.DISABLED)
+        self.link_button.configure(state=tk.DISABLED, text="正在校验...")
+        self.scan_stop_event = stop_event
+        self.stop_button.configure(state=tk.NORMAL)
+
+        def dry_run_then_confirm():
+            try:
+                preview = engine.run(certain_groups, dry_run=True)
+            except InterruptedError:
+                self.master.after(0, self._finish_link_action, "链接替换已中止，没有替换任何文件。", "WARNING")
+                return
+            except Exception as e:
+                self.master.after(0, self._finish_link_action, f"演练失败: {e}", "ERROR")
+                return
+            self.master.after(0, confirm_and_apply, preview)
+
+        def confirm_and_apply(preview):
+            if not preview.replaced:
+                self._finish_link_action("没有可以链接替换的文件。", "INFO")
+                return
+            confirm = messagebox.askyesno("确认链接替换",
+                f"将用{'硬链接' if engine.mode == LINK_HARDLINK else 'reflink'}替换 {len(preview.replaced)} 个重复文件，"
+                f"可释放 {human_readable_size(preview.bytes_reclaimed)}。\n\n"
+                f"每组保留一个文件，其余文件的路径保持不变，但会与保留文件共享数据。确定继续吗？",
+                icon=messagebox.WARNING)
+            if not confirm:
+                self._finish_link_action("链接替换已取消。", "INFO")
+                return
+            self.link_button.configure(text="正在替换...")
+            threading.Thread(target=apply, args=(preview,), daemon=True).start()
+
+        def apply(preview):
+            try:
+                # 演练已逐字节校验过，这里只确认文件自校验后没有被修改
+                result = engine.apply(preview)
+            except InterruptedError:
+                self.master.after(0, self._finish_link_action,
+                                  "链接替换已中止，已替换的文件保持链接状态，其余文件未改动。", "WARNING")
+                return
+            except Exception as e:
+                self.master.after(0, self._finish_link_action, f"链接替换失败: {e}", "ERROR")
+                return
+            self.master.after(0, self._finish_link_action,
+                              f"链接替换完成：替换 {len(result.replaced)} 个文件，释放 {human_readable_size(result.bytes_reclaimed)}，"
+                              f"失败 {len(result.errors)} 个。", "INFO")
+
+        threading.Thread(target=dry_run_then_confirm, daemon=True).start()
+
+    def _finish_link_action(self, message, level):
+        self.scan_stop_event = None
+        self.stop_button.configure(state=tk.DISABLED, text="终止扫描")
+        self.log_message(message, level)
+        self.find_button.configure(state=tk.NORMAL)
+        self.move_button.configure(state=tk.NORMAL)
+        self.link_button.configure(state=tk.NORMAL, text="3. 链接替换确定重复项")
+
     def stop_scan_action(self):
         if self.scan_stop_event:
             self.log_message("正在尝试终止扫描...", level="WARNING")
@@ -582,6 +812,8 @@ class ToolPluginFrame(ctk.CTkFrame):
                         parent_values = self.tree.item(parent_iid, "values")
                         if parent_values and len(parent_values) > group_info_column_index:
                             detail_text_to_display = parent_values[group_info_column_index]
+                            if current_item_group_info: # 文件自身的信息（如硬链接路径）
+                                detail_text_to_display += f"\n{current_item_group_info}"
                         else:
                             detail_text_to_display = "父组信息不完整。"
                     else:
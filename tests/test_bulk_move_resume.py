@@ -0,0 +1,22 @@
+"""继续中断的跨设备移动时，只有目标与源文件内容相同才删除源文件"""
+from file.file_bulk_move import OP_DONE, STRATEGY_COPY, BulkMover, MoveTask
+
+
+def _reconcile(tmp_path, source_data: bytes, destination_data: bytes):
+    source, destination = tmp_path / "clip.mp4", tmp_path / "moved" / "clip.mp4"
+    destination.parent.mkdir()
+    source.write_bytes(source_data)
+    destination.write_bytes(destination_data)
+    mover = BulkMover(str(destination.parent / ".move_journal.jsonl"))
+    task = MoveTask(1, str(source), str(destination), STRATEGY_COPY, len(source_data))
+    return mover._reconcile(task), source.exists()
+
+
+def test_finished_copy_removes_source(tmp_path):
+    assert _reconcile(tmp_path, b"a" * 4096, b"a" * 4096) == (OP_DONE, False)
+
+
+def test_same_size_different_content_keeps_source(tmp_path):
+    state, source_exists = _reconcile(tmp_path, b"a" * 4096, b"b" * 4096)
+    assert state == "目标位置已存在同名文件"
+    assert source_exists
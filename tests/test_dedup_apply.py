@@ -0,0 +1,57 @@
+"""执行演练得到的链接替换计划时不再重新校验内容，只确认文件自校验后没有被修改"""
+import os
+
+import pytest
+
+from file import file_dedup
+from file.file_dedup import DedupEngine
+from file.file_find_duplicates_enhanced import DuplicateGroup, DuplicateLevel
+from file.file_metadata_store import FileMetadata
+
+
+def _certain_group(tmp_path, count: int = 3) -> DuplicateGroup:
+    files = []
+    for index in range(count):
+        path = tmp_path / f"copy{index}.bin"
+        path.write_bytes(b"same content" * 1024)
+        os.utime(path, ns=(10 ** 18 + index, 10 ** 18 + index))  # copy0 最早，作为保留文件
+        files.append(FileMetadata(path=str(path), size=path.stat().st_size, content_hash="h"))
+    return DuplicateGroup(level=DuplicateLevel.CERTAIN, score=100, files=files, reasons=["内容哈希相同"])
+
+
+def _refuse_reverify(*args, **kwargs):
+    raise AssertionError("apply 不应重新逐字节校验")
+
+
+def test_apply_reuses_dry_run_plan(tmp_path, monkeypatch):
+    group = _certain_group(tmp_path)
+    engine = DedupEngine()
+    preview = engine.run([group], dry_run=True)
+    assert len(preview.replaced) == 2
+
+    monkeypatch.setattr(file_dedup, "files_identical", _refuse_reverify)
+    result = engine.apply(preview)
+    keep_inode = os.stat(group.files[0].path).st_ino
+    assert [action.target for action in result.replaced] == [f.path for f in group.files[1:]]
+    assert all(os.stat(f.path).st_ino == keep_inode for f in group.files)
+
+
+def test_apply_skips_files_modified_after_dry_run(tmp_path):
+    group = _certain_group(tmp_path)
+    engine = DedupEngine()
+    preview = engine.run([group], dry_run=True)
+    modified = group.files[1].path
+    with open(modified, "r+b") as f:
+        f.write(b"changed")
+
+    result = engine.apply(preview)
+    assert (modified, "校验后文件已被修改") in result.skipped
+    assert os.stat(modified).st_ino != os.stat(group.files[0].path).st_ino
+    assert [action.target for action in result.replaced] == [group.files[2].path]
+
+
+def test_apply_rejects_result_that_is_not_a_dry_run(tmp_path):
+    engine = DedupEngine()
+    result = engine.run([_certain_group(tmp_path)], dry_run=False)
+    with pytest.raises(ValueError):
+        engine.apply(result)
@@ -0,0 +1,66 @@
+"""文件描述符软限制较低时，同步比较退回逐个计算完整哈希，分组结果不变"""
+import os
+
+import pytest
+
+from file.file_hashing import ContentHashEngine, TieredHasher
+
+resource = pytest.importorskip("resource")
+
+FILE_SIZE = 48 * 1024  # 大于两个首尾块，部分哈希相同的文件需要同步比较
+
+
+def _make_bucket(folder, count: int, size: int = FILE_SIZE):
+    """count 个同大小文件：首尾块全部相同，中间内容每 4 个文件一组相同"""
+    folder.mkdir()
+    paths = []
+    for index in range(count):
+        path = folder / f"{index:03d}.bin"
+        middle = bytes([index % 4]) * (size - 2 * 16 * 1024)
+        path.write_bytes(b"h" * 16 * 1024 + middle + b"t" * 16 * 1024)
+        paths.append(str(path))
+    return paths
+
+
+def _groups(full_hashes):
+    groups = {}
+    for path, digest in full_hashes.items():
+        groups.setdefault(digest, set()).add(path)
+    return sorted(sorted(members) for members in groups.values())
+
+
+@pytest.fixture
+def low_fd_limit():
+    """把软限制设为当前已打开的文件数再多 12 个"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if not os.path.isdir("/proc/self/fd"):
+        pytest.skip("需要 /proc/self/fd 统计已打开的文件数")
+
+    def apply():
+        resource.setrlimit(resource.RLIMIT_NOFILE, (len(os.listdir("/proc/self/fd")) + 12, hard))
+
+    yield apply
+    resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+
+
+def test_lockstep_falls_back_when_descriptors_run_out(tmp_path, low_fd_limit):
+    paths = _make_bucket(tmp_path / "bucket", 40)
+    expected = _groups(TieredHasher().hash_bucket(paths, FILE_SIZE))
+    assert len(expected) == 4
+
+    low_fd_limit()
+    assert _groups(TieredHasher().hash_bucket(paths, FILE_SIZE)) == expected
+
+
+def test_engine_splits_lockstep_budget_across_workers(tmp_path, low_fd_limit):
+    entries = []
+    for bucket in range(6):
+        size = FILE_SIZE + bucket
+        entries.extend((path, size) for path in _make_bucket(tmp_path / f"bucket{bucket}", 24, size))
+    expected = _groups(ContentHashEngine(workers=1).hash_files(entries))
+    assert len(expected) == 6 * 4
+
+    low_fd_limit()
+    engine = ContentHashEngine(workers=4)
+    assert engine.hasher_options['max_lockstep_files'] < 24
+    assert _groups(engine.hash_files(entries)) == expected
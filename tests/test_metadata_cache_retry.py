@@ -0,0 +1,91 @@
+"""视频时长读取失败时不写入元数据缓存，下次扫描重新读取"""
+import os
+import sys
+import stat
+import threading
+
+import pytest
+
+from file.file_find_duplicates_enhanced import EnhancedDuplicateFinder
+from file.file_metadata_cache import MetadataCache
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="用 shell 脚本代替 ffprobe")
+
+
+def _fake_ffprobe(path, body: str) -> str:
+    path.write_text("#!/bin/sh\n" + body + "\n")
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    return str(path)
+
+
+def _make_videos(folder):
+    folder.mkdir()
+    paths = []
+    for index in range(2):
+        video = folder / f"clip{index}.mp4"
+        video.write_bytes(bytes([index]) * 4096)  # 大小相同、内容不同，都需要提取元数据
+        paths.append(str(video))
+    return paths
+
+
+def _cached(cache: MetadataCache, finder: EnhancedDuplicateFinder, path: str):
+    st = os.stat(path)
+    return cache.get(os.path.abspath(path), st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, finder.hash_algorithm)
+
+
+def _scan(folder, cache, ffprobe_path, **options):
+    finder = EnhancedDuplicateFinder(ffprobe_path, metadata_cache=cache, **options)
+    finder.find_duplicates(str(folder))
+    cache.flush()
+    return finder
+
+
+def test_failed_probe_is_retried_on_next_scan(tmp_path):
+    videos = _make_videos(tmp_path / "videos")
+    cache = MetadataCache(str(tmp_path / "cache.db"))
+    try:
+        finder = _scan(tmp_path / "videos", cache, _fake_ffprobe(tmp_path / "broken", "exit 1"))
+        for path in videos:
+            record = _cached(cache, finder, path)
+            assert record is None or not record['extracted']
+
+        finder = _scan(tmp_path / "videos", cache, _fake_ffprobe(tmp_path / "ffprobe", "echo 12.5"))
+        assert finder.stats.snapshot()['ffprobe']['calls'] == len(videos)
+        for path in videos:
+            record = _cached(cache, finder, path)
+            assert record['extracted'] and record['duration'] == 12.5
+    finally:
+        cache.close()
+
+
+def test_timed_out_probe_is_not_cached(tmp_path):
+    videos = _make_videos(tmp_path / "videos")
+    cache = MetadataCache(str(tmp_path / "cache.db"))
+    try:
+        finder = _scan(tmp_path / "videos", cache, _fake_ffprobe(tmp_path / "hang", "exec sleep 5"),
+                       probe_timeout=0.2)
+        assert finder.stats.snapshot()['ffprobe']['timeouts'] == len(videos)
+        for path in videos:
+            record = _cached(cache, finder, path)
+            assert record is None or not record['extracted']
+    finally:
+        cache.close()
+
+
+def test_cancelled_probe_is_not_cached(tmp_path):
+    videos = _make_videos(tmp_path / "videos")
+    cache = MetadataCache(str(tmp_path / "cache.db"))
+    stop_event = threading.Event()
+    timer = threading.Timer(0.3, stop_event.set)
+    try:
+        timer.start()
+        with pytest.raises(InterruptedError):
+            _scan(tmp_path / "videos", cache, _fake_ffprobe(tmp_path / "hang", "exec sleep 5"),
+                  stop_event=stop_event)
+        finder = EnhancedDuplicateFinder(None, metadata_cache=cache)
+        for path in videos:
+            record = _cached(cache, finder, path)
+            assert record is None or not record['extracted']
+    finally:
+        timer.cancel()
+        cache.close()